@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Benchmark of input DataFrame building: per-value parsing with astype vs precompiled input schema
+vs typed numeric arrays (binary columns requests)
+Example of usage: python benchmarks/benchmark_build_df.py --columns 100 --rows 1 100
+"""
+
+import argparse
+import timeit
+
+import legion.model.types as types
+import numpy as np
+import pandas as pd
+
+
+def legacy_build_df(columns_map, input_values):
+    """
+    Build pandas.DataFrame with per-value parsing and astype (implementation before InputSchema)
+
+    :param columns_map: information about columns
+    :type columns_map: dict[str, :py:class:`legion.types.ColumnInformation`]
+    :param input_values: input values
+    :type input_values: dict[str, union[str, bytes]]
+    :return: :py:class:`pandas.DataFrame`
+    """
+    values = {}
+    column_types = {}
+
+    for column_name, column_information in columns_map.items():
+        values[column_name] = column_information.representation_type.parse(input_values[column_name])
+        column_types[column_name] = column_information.numpy_type
+
+    return pd.DataFrame([values]).astype(column_types)
+
+
+def build_columns(count):
+    """
+    Build columns map with equal count of Integer, Float, Bool and String columns
+
+    :param count: count of columns
+    :type count: int
+    :return: tuple[dict, dict] -- columns map and input row
+    """
+    samples = (
+        (types.Integer, np.int64, '42'),
+        (types.Float, np.float64, '3.14'),
+        (types.Bool, np.bool_, 'true'),
+        (types.String, np.object, 'value'),
+    )
+
+    columns_map = {}
+    row = {}
+    for index in range(count):
+        representation_type, numpy_type, value = samples[index % len(samples)]
+        columns_map['c%d' % index] = types.ColumnInformation(representation_type, numpy_type)
+        row['c%d' % index] = value
+
+    return columns_map, row
+
+
+def run(columns, rows_counts, repeat):
+    """
+    Run benchmark and print results
+
+    :param columns: count of columns
+    :type columns: int
+    :param rows_counts: counts of rows in one request
+    :type rows_counts: list[int]
+    :param repeat: count of requests
+    :type repeat: int
+    :return: None
+    """
+    columns_map, row = build_columns(columns)
+    schema = types.InputSchema(columns_map)
+
+    for rows in rows_counts:
+        input_columns = {column_name: [value] * rows for column_name, value in row.items()}
+
+        typed_columns = {column_name: np.asarray(schema.build_batch_df(input_columns)[column_name].values)
+                         for column_name in input_columns}
+        typed_columns = {column_name: values for column_name, values in typed_columns.items()
+                         if values.dtype.kind in 'biuf'}
+        numeric_columns_map = {column_name: columns_map[column_name] for column_name in typed_columns}
+        numeric_columns = {column_name: input_columns[column_name] for column_name in typed_columns}
+        numeric_schema = types.InputSchema(numeric_columns_map)
+
+        legacy = timeit.timeit(lambda: [legacy_build_df(columns_map, row) for _ in range(rows)], number=repeat)
+        fast = timeit.timeit(lambda: schema.build_batch_df(input_columns), number=repeat)
+        strings = timeit.timeit(lambda: numeric_schema.build_batch_df(numeric_columns), number=repeat)
+        typed = timeit.timeit(lambda: numeric_schema.build_batch_df(typed_columns), number=repeat)
+
+        print('columns: %4d rows: %5d legacy: %8.3f ms/request schema: %8.3f ms/request speedup: %6.1fx'
+              % (columns, rows, legacy * 1000 / repeat, fast * 1000 / repeat, legacy / fast))
+        print('numeric columns: %4d rows: %5d strings: %8.3f ms/request typed arrays: %8.3f ms/request '
+              'speedup: %6.1fx' % (len(typed_columns), rows, strings * 1000 / repeat, typed * 1000 / repeat,
+                                   strings / typed))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='build_df benchmark')
+    parser.add_argument('--columns', type=int, default=20, help='count of columns')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 100], help='counts of rows in one request')
+    parser.add_argument('--repeat', type=int, default=100, help='count of requests')
+    args = parser.parse_args()
+
+    run(args.columns, args.rows, args.repeat)
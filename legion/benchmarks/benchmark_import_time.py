@@ -0,0 +1,118 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Benchmark of cold start import time of CLI and serving entry points (based on python -X importtime)
+Example of usage: python benchmarks/benchmark_import_time.py --max-ms cli=300 serving=1500
+Exits with code 1 if limit is exceeded or if entry point imports forbidden module
+"""
+
+import argparse
+import subprocess
+import sys
+
+# Entry point name => (imported module, modules that should not be imported)
+ENTRY_POINTS = {
+    'cli': ('legion.edi.deploy',
+            ('docker', 'kubernetes', 'consul', 'flask', 'pandas', 'numpy', 'dill', 'PIL.Image', 'aiohttp')),
+    'serving': ('legion.serving.pyserve',
+                ('docker', 'kubernetes', 'consul', 'PIL.Image', 'aiohttp')),
+    'aio-serving': ('legion.serving.aio',
+                    ('docker', 'kubernetes', 'consul', 'PIL.Image')),
+}
+
+
+def measure_import(module):
+    """
+    Import module in new interpreter with -X importtime
+
+    :param module: name of module
+    :type module: str
+    :return: tuple[float, dict[str, float]] -- cumulative time of module import in ms and self times of modules in ms
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+    self_times = {}
+    total = 0.0
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_time, cumulative_time, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        self_times[name] = int(self_time) / 1000
+        if name == module:
+            total = int(cumulative_time) / 1000
+
+    return total, self_times
+
+
+def run(repeat, limits, top):
+    """
+    Run benchmark and print results
+
+    :param repeat: count of measurements (min is used)
+    :type repeat: int
+    :param limits: entry point name => max import time in ms
+    :type limits: dict[str, float]
+    :param top: count of slowest modules to print
+    :type top: int
+    :return: bool -- True if all checks are passed
+    """
+    passed = True
+
+    for entry_point, (module, forbidden_modules) in sorted(ENTRY_POINTS.items()):
+        measurements = [measure_import(module) for _ in range(repeat)]
+        total, self_times = min(measurements, key=lambda measurement: measurement[0])
+        forbidden = sorted(name for name in forbidden_modules if name in self_times)
+
+        print('%-12s %-28s %8.1f ms' % (entry_point, module, total))
+        for name, self_time in sorted(self_times.items(), key=lambda item: -item[1])[:top]:
+            print('    %8.1f ms  %s' % (self_time, name))
+
+        if forbidden:
+            print('    FAIL: imports %s' % ', '.join(forbidden))
+            passed = False
+        if entry_point in limits and total > limits[entry_point]:
+            print('    FAIL: import time is greater than %.1f ms' % limits[entry_point])
+            passed = False
+
+    return passed
+
+
+def parse_limit(value):
+    """
+    Parse limit argument
+
+    :param value: limit in format <entry point>=<ms>
+    :type value: str
+    :return: tuple[str, float] -- entry point name and limit in ms
+    """
+    entry_point, _, limit = value.partition('=')
+    if entry_point not in ENTRY_POINTS or not limit:
+        raise argparse.ArgumentTypeError('Invalid limit %r. Format: <%s>=<ms>' % (value, '|'.join(ENTRY_POINTS)))
+    return entry_point, float(limit)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='import time benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='count of measurements for each entry point')
+    parser.add_argument('--max-ms', type=parse_limit, nargs='*', default=[], help='limits, for example cli=300')
+    parser.add_argument('--top', type=int, default=5, help='count of slowest modules to print')
+    args = parser.parse_args()
+
+    if not run(args.repeat, dict(args.max_ms), args.top):
+        sys.exit(1)
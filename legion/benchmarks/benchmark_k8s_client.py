@@ -0,0 +1,226 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Benchmark of EDI kubernetes operations latency with new client for each operation (before)
+and with process-wide client (after). By default local fake API server is used,
+real cluster is used with --kubeconfig (deployment of --model-id should exist for scale)
+Example of usage: python benchmarks/benchmark_k8s_client.py --iterations 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import kubernetes  # noqa: E402
+
+import legion.config  # noqa: E402
+import legion.containers.k8s  # noqa: E402
+import legion.containers.k8s_index  # noqa: E402
+
+FAKE_MODEL_ID = 'benchmark-model'
+FAKE_DEPLOYMENT = {
+    'apiVersion': 'extensions/v1beta1',
+    'kind': 'Deployment',
+    'metadata': {
+        'name': 'model.benchmark-model.1-0.deployment',
+        'namespace': 'default',
+        'resourceVersion': '1',
+        'labels': {
+            legion.containers.k8s_index.MODEL_TYPE_LABEL: 'model',
+            legion.containers.k8s_index.MODEL_ID_LABEL: FAKE_MODEL_ID,
+            legion.containers.k8s_index.MODEL_VERSION_LABEL: '1.0',
+        },
+    },
+    'spec': {
+        'replicas': 1,
+        'template': {'spec': {'containers': [{'name': 'model', 'image': 'benchmark-model:1.0'}]}},
+    },
+    'status': {'replicas': 1, 'readyReplicas': 1},
+}
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """
+    Fake kubernetes API server: version, list, create and patch of deployments (keep-alive connections)
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately: without it keep-alive responses are delayed by delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self, data):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/version'):
+            self._answer({'major': '1', 'minor': '9', 'gitVersion': 'v1.9.0', 'gitCommit': '', 'gitTreeState': 'clean',
+                          'buildDate': '', 'goVersion': 'go1.9', 'compiler': 'gc', 'platform': 'linux/amd64'})
+        else:
+            self._answer({'kind': 'DeploymentList', 'apiVersion': 'extensions/v1beta1',
+                          'metadata': {'resourceVersion': '1'}, 'items': [FAKE_DEPLOYMENT]})
+
+    def do_POST(self):
+        self._answer(FAKE_DEPLOYMENT)
+
+    def do_PATCH(self):
+        self._answer(FAKE_DEPLOYMENT)
+
+
+def start_fake_api_server(directory):
+    """
+    Start fake API server and write kube config for it
+
+    :param directory: directory for kube config
+    :type directory: str
+    :return: tuple[:py:class:`http.server.HTTPServer`, str] -- server and path to kube config
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    path = os.path.join(directory, 'kubeconfig')
+    with open(path, 'w') as stream:
+        json.dump({
+            'apiVersion': 'v1',
+            'kind': 'Config',
+            'clusters': [{'name': 'fake', 'cluster': {'server': 'http://127.0.0.1:%d' % server.server_address[1]}}],
+            'users': [{'name': 'fake', 'user': {'token': 'fake-token'}}],
+            'contexts': [{'name': 'fake', 'context': {'cluster': 'fake', 'user': 'fake'}}],
+            'current-context': 'fake',
+        }, stream)
+
+    return server, path
+
+
+def build_operations(namespace, model_id):
+    """
+    Build benchmarked operations
+
+    :param namespace: namespace
+    :type namespace: str
+    :param model_id: model id for scale
+    :type model_id: str
+    :return: dict[str, Callable[[], None]] -- operation name => operation
+    """
+    def version():
+        kubernetes.client.VersionApi(legion.containers.k8s.get_client()).get_code()
+
+    def scale():
+        legion.containers.k8s.scale(None, None, namespace, model_id, 1)
+
+    def deploy_request():
+        # Kubernetes part of EDI deploy (deployment creation without image pull and grafana)
+        api = kubernetes.client.ExtensionsV1beta1Api(legion.containers.k8s.get_client())
+        api.create_namespaced_deployment(namespace=namespace, body=FAKE_DEPLOYMENT)
+
+    return {'version': version, 'scale': scale, 'deploy-request': deploy_request}
+
+
+def measure(operation, iterations, shared_client):
+    """
+    Measure latencies of operation
+
+    :param operation: operation
+    :type operation: Callable[[], None]
+    :param iterations: count of calls
+    :type iterations: int
+    :param shared_client: use process-wide client (otherwise it is rebuilt before each call, as before)
+    :type shared_client: bool
+    :return: list[float] -- latencies in ms
+    """
+    latencies = []
+    for _ in range(iterations):
+        if not shared_client:
+            legion.containers.k8s.reset_client()
+
+        started = time.perf_counter()
+        operation()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return latencies
+
+
+def run(iterations, namespace, model_id):
+    """
+    Run benchmark and print results
+
+    :param iterations: count of calls of each operation
+    :type iterations: int
+    :param namespace: namespace
+    :type namespace: str
+    :param model_id: model id for scale
+    :type model_id: str
+    :return: None
+    """
+    print('%-16s %-10s %10s %10s %10s' % ('operation', 'client', 'mean ms', 'p50 ms', 'p99 ms'))
+    for name, operation in build_operations(namespace, model_id).items():
+        try:
+            operation()
+        except AttributeError as missing_api:
+            # API group is not available in installed version of kubernetes client
+            print('%-16s skipped: %s' % (name, missing_api))
+            continue
+
+        for shared_client in (False, True):
+            latencies = sorted(measure(operation, iterations, shared_client))
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print('%-16s %-10s %10.2f %10.2f %10.2f' % (name, 'shared' if shared_client else 'new',
+                                                        statistics.mean(latencies), p50, p99))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='kubernetes client benchmark')
+    parser.add_argument('--iterations', type=int, default=100, help='count of calls of each operation')
+    parser.add_argument('--kubeconfig', help='kube config of real cluster (default: local fake API server)')
+    parser.add_argument('--namespace', default='default', help='namespace')
+    parser.add_argument('--model-id', default=FAKE_MODEL_ID, help='id of deployed model for scale')
+    args = parser.parse_args()
+
+    os.environ[legion.config.K8S_CLIENT_REFRESH_PERIOD[0]] = str(sys.float_info.max)
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        if args.kubeconfig:
+            kube_config = args.kubeconfig
+        else:
+            fake_server, kube_config = start_fake_api_server(temp_directory)
+
+        kubernetes.config.kube_config.KUBE_CONFIG_DEFAULT_LOCATION = kube_config
+        run(args.iterations, args.namespace, args.model_id)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Benchmark of model response encoding: json with .tolist() vs NumPy-aware JSON vs binary columns format
+Example of usage: python benchmarks/benchmark_response_encoding.py --sizes 10 1000 100000
+"""
+
+import argparse
+import json
+import timeit
+
+import legion.encoding
+import numpy as np
+
+
+def legacy_encode(result):
+    """
+    Encode result as model author had to do it before NumPy-aware encoder (convert arrays with tolist)
+
+    :param result: column name => array
+    :type result: dict[str, :py:class:`numpy.ndarray`]
+    :return: bytes -- JSON
+    """
+    return json.dumps({name: value.tolist() for name, value in result.items()}).encode('utf-8')
+
+
+def run(sizes, repeat):
+    """
+    Run benchmark and print results
+
+    :param sizes: sizes of float64 vector in result
+    :type sizes: list[int]
+    :param repeat: count of encodings
+    :type repeat: int
+    :return: None
+    """
+    print('JSON encoder: %s' % ('orjson' if legion.encoding.orjson else 'json'))
+
+    for size in sizes:
+        result = {'scores': np.random.rand(size), 'labels': np.arange(size)}
+
+        timings = (
+            ('tolist', legacy_encode),
+            ('json', legion.encoding.encode_json),
+            ('columns', lambda data: legion.encoding.encode_columns(legion.encoding.to_columns(data))),
+        )
+
+        line = 'size: %7d' % size
+        for name, encode in timings:
+            seconds = timeit.timeit(lambda: encode(result), number=repeat)
+            line += ' %s: %9.3f ms (%8d bytes)' % (name, seconds * 1000 / repeat, len(encode(result)))
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='response encoding benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000], help='sizes of result vectors')
+    parser.add_argument('--repeat', type=int, default=20, help='count of encodings')
+    args = parser.parse_args()
+
+    run(args.sizes, args.repeat)
@@ -29,6 +29,9 @@ JOB_NAME = 'JOB_NAME', None
 NODE_NAME = 'NODE_NAME', None
 
 MODEL_SERVER_URL = 'MODEL_SERVER_URL', 'http://edge'
+MODEL_CLIENT_POOL_SIZE = 'MODEL_CLIENT_POOL_SIZE', 10
+MODEL_CLIENT_RETRIES = 'MODEL_CLIENT_RETRIES', 3
+MODEL_CLIENT_TIMEOUT = 'MODEL_CLIENT_TIMEOUT', 30.0
 MODEL_ID = 'MODEL_ID', None
 MODEL_FILE = 'MODEL_FILE', None
 
@@ -50,6 +53,12 @@ GRAPHITE_HOST = 'GRAPHITE_HOST', 'graphite'
 GRAPHITE_PORT = 'GRAPHITE_PORT', 2003
 GRAPHITE_NAMESPACE = 'GRAPHITE_NAMESPACE', 'stats.legion.model'
 
+METRICS_MODE = 'METRICS_MODE', 'graphite'
+METRICS_FLUSH_INTERVAL = 'METRICS_FLUSH_INTERVAL', 1.0
+METRICS_BUFFER_SIZE = 'METRICS_BUFFER_SIZE', 10000
+METRICS_AGGREGATION_INTERVAL = 'METRICS_AGGREGATION_INTERVAL', 10.0
+METRICS_RESERVOIR_SIZE = 'METRICS_RESERVOIR_SIZE', 1024
+
 GRAFANA_URL = 'GRAFANA_URL', 'http://grafana:3000/'
 GRAFANA_USER = 'GRAFANA_USER', 'admin'
 GRAFANA_PASSWORD = 'GRAFANA_PASSWORD', 'admin'
@@ -65,6 +74,14 @@ EXTERNAL_RESOURCE_PROTOCOL = 'EXTERNAL_RESOURCE_PROTOCOL', 'https'
 EXTERNAL_RESOURCE_HOST = 'EXTERNAL_RESOURCE_HOST', 'localhost'
 EXTERNAL_RESOURCE_USER = 'EXTERNAL_RESOURCE_USER', None
 EXTERNAL_RESOURCE_PASSWORD = 'EXTERNAL_RESOURCE_PASSWORD', None
+EXTERNAL_RESOURCE_CACHE_DIR = 'EXTERNAL_RESOURCE_CACHE_DIR', ''
+EXTERNAL_RESOURCE_CACHE_SIZE = 'EXTERNAL_RESOURCE_CACHE_SIZE', 10 * 1024 ** 3
+EXTERNAL_RESOURCE_DOWNLOAD_THREADS = 'EXTERNAL_RESOURCE_DOWNLOAD_THREADS', 4
+EXTERNAL_RESOURCE_DOWNLOAD_CHUNK_SIZE = 'EXTERNAL_RESOURCE_DOWNLOAD_CHUNK_SIZE', 8 * 1024 ** 2
+EXTERNAL_RESOURCE_DOWNLOAD_RETRIES = 'EXTERNAL_RESOURCE_DOWNLOAD_RETRIES', 3
+EXTERNAL_RESOURCE_UPLOAD_PART_SIZE = 'EXTERNAL_RESOURCE_UPLOAD_PART_SIZE', 0
+EXTERNAL_RESOURCE_UPLOAD_THREADS = 'EXTERNAL_RESOURCE_UPLOAD_THREADS', 4
+EXTERNAL_RESOURCE_UPLOAD_RETRIES = 'EXTERNAL_RESOURCE_UPLOAD_RETRIES', 3
 
 DOCKER_REGISTRY_USER = 'DOCKER_REGISTRY_USER', None
 DOCKER_REGISTRY_PASSWORD = 'DOCKER_REGISTRY_PASSWORD', None
@@ -73,9 +90,39 @@ MODEL_NAMING_UID_ENV = 'JUPYTERHUB_USER', 'NB_USER', 'BUILD_ID'
 DEBUG = 'DEBUG', 'false'
 REGISTER_ON_CONSUL = 'REGISTER_ON_CONSUL', 'true'
 REGISTER_ON_GRAFANA = 'REGISTER_ON_GRAFANA', 'true'
+MICRO_BATCHING_ENABLED = 'MICRO_BATCHING_ENABLED', 'false'
+MICRO_BATCHING_MAX_SIZE = 'MICRO_BATCHING_MAX_SIZE', 32
+MICRO_BATCHING_MAX_DELAY = 'MICRO_BATCHING_MAX_DELAY', 0.005
+AIO_EXECUTOR_TYPE = 'AIO_EXECUTOR_TYPE', 'thread'
+AIO_EXECUTOR_WORKERS = 'AIO_EXECUTOR_WORKERS', 4
+WARM_UP_ENABLED = 'WARM_UP_ENABLED', 'true'
+WARM_UP_MIN_ITERATIONS = 'WARM_UP_MIN_ITERATIONS', 3
+WARM_UP_MAX_ITERATIONS = 'WARM_UP_MAX_ITERATIONS', 50
+WARM_UP_SETTLE_RATIO = 'WARM_UP_SETTLE_RATIO', 1.5
+PREDICTION_CACHE_ENABLED = 'PREDICTION_CACHE_ENABLED', 'false'
+PREDICTION_CACHE_MAX_ENTRIES = 'PREDICTION_CACHE_MAX_ENTRIES', 10000
+PREDICTION_CACHE_TTL = 'PREDICTION_CACHE_TTL', 300.0
+PREDICTION_CACHE_MAX_MEMORY = 'PREDICTION_CACHE_MAX_MEMORY', 64 * 1024 * 1024
+PREDICTION_CACHE_SHARED_FILE = 'PREDICTION_CACHE_SHARED_FILE', ''
+PREDICTION_CACHE_SLOT_SIZE = 'PREDICTION_CACHE_SLOT_SIZE', 4096
+REQUEST_LOG_SAMPLE_RATE = 'REQUEST_LOG_SAMPLE_RATE', 0.0
+REQUEST_LOG_MAX_PAYLOAD_SIZE = 'REQUEST_LOG_MAX_PAYLOAD_SIZE', 1024
+REQUEST_LOG_QUEUE_SIZE = 'REQUEST_LOG_QUEUE_SIZE', 1000
+SERVING_METRICS_ENABLED = 'SERVING_METRICS_ENABLED', 'true'
+PROFILING_ENABLED = 'PROFILING_ENABLED', 'false'
+PROFILING_SAMPLE_EVERY = 'PROFILING_SAMPLE_EVERY', 0
+PROFILING_WINDOW = 'PROFILING_WINDOW', 300.0
+PROFILING_MAX_STACKS = 'PROFILING_MAX_STACKS', 10000
 FLASK_APP_SETTINGS_FILES = 'FLASK_APP_SETTINGS_FILES', None
 
 DEPLOYMENT = 'DEPLOYMENT', 'legion'
 NAMESPACE = 'NAMESPACE', 'default'
 CLUSTER_CONFIG_PATH = 'CLUSTER_CONFIG_PATH', None
 CLUSTER_SECRETS_PATH = 'CLUSTER_SECRETS_PATH', None
+INSPECT_PROBE_THREADS = 'INSPECT_PROBE_THREADS', 16
+INSPECT_PROBE_TIMEOUT = 'INSPECT_PROBE_TIMEOUT', 5.0
+MODEL_STARTUP_TIMEOUT = 'MODEL_STARTUP_TIMEOUT', 600
+DEPLOYMENT_INDEX_ENABLED = 'DEPLOYMENT_INDEX_ENABLED', 'true'
+DEPLOYMENT_INDEX_RESYNC_PERIOD = 'DEPLOYMENT_INDEX_RESYNC_PERIOD', 300.0
+K8S_CLIENT_POOL_SIZE = 'K8S_CLIENT_POOL_SIZE', 16
+K8S_CLIENT_REFRESH_PERIOD = 'K8S_CLIENT_REFRESH_PERIOD', 600.0
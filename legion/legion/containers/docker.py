@@ -20,16 +20,21 @@ import logging
 import os
 import shutil
 
-import docker
-import docker.errors
 import legion
 import legion.config
 import legion.containers.headers
-import legion.io
 import legion.utils
+from legion.utils import lazy_import
+
+docker = lazy_import('docker')
+legion_io = lazy_import('legion.io')
 
 LOGGER = logging.getLogger('docker')
-VALID_SERVING_WORKERS = 'uwsgi', 'gunicorn'
+VALID_SERVING_WORKERS = 'uwsgi', 'gunicorn', 'aiohttp'
+DEFAULT_GUNICORN_WORKER_PATH = 'legion.serving.wsgi_aio:aioapp'
+GUNICORN_WORKER_PATHS = {
+    'aiohttp': 'legion.serving.aio_server:aioapp'
+}
 
 
 def build_docker_client(args=None):
@@ -117,7 +122,8 @@ def build_docker_image(client, base_image, model_id, model_file, labels,
             'MODEL_FILE': model_filename,
             'PIP_INSTALL_TARGET': install_target,
             'PIP_REPOSITORY': source_repository,
-            'PIP_CUSTOM_TARGET': wheel_target
+            'PIP_CUSTOM_TARGET': wheel_target,
+            'GUNICORN_WORKER_PATH': GUNICORN_WORKER_PATHS.get(serving, DEFAULT_GUNICORN_WORKER_PATH)
         })
 
         labels = {k: str(v) if v else None for (k, v) in labels.items()}
@@ -157,12 +163,13 @@ def generate_docker_labels_for_image(model_file, model_id, args):
     :type args: :py:class:`argparse.Namespace`
     :return: dict[str, str] of labels
     """
-    with legion.io.ModelContainer(model_file, do_not_load_model=True) as container:
+    with legion_io.ModelContainer(model_file, do_not_load_model=True) as container:
         base = {
             'com.epam.legion.model.id': model_id,
             'com.epam.legion.model.version': container.get('model.version', 'undefined'),
             'com.epam.legion.class': 'pyserve',
-            'com.epam.legion.container_type': 'model'
+            'com.epam.legion.container_type': 'model',
+            legion.containers.headers.DOMAIN_READINESS_CHECK: 'true'
         }
         for key, value in container.items():
             base['com.epam.' + key] = value
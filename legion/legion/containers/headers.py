@@ -29,3 +29,5 @@ DOMAIN_CLASS = 'com.epam.legion.class'
 DOMAIN_CONTAINER_TYPE = 'com.epam.legion.container_type'
 DOMAIN_CONTAINER_DESCRIPTION = 'com.epam.legion.container_description'
 DOMAIN_CONTAINER_REQUIRED = 'com.epam.legion.container_required'
+# Model server of image has readiness endpoint (/ready), older images have /healthcheck only
+DOMAIN_READINESS_CHECK = 'com.epam.legion.readiness_check'
@@ -16,27 +16,27 @@
 """
 legion k8s functions
 """
+import concurrent.futures
 import os
 import os.path
+import threading
+import time
 import typing
 
 import legion
 import legion.containers.docker
 import legion.containers.headers
+import legion.containers.k8s_index
 import legion.config
 import legion.external.grafana
 from legion.model import ModelClient
+from legion.model.client import build_session
+from legion.utils import normalize_name, lazy_import
 
-import docker
-import docker.errors
-import kubernetes
-import kubernetes.client
-import kubernetes.config
-import kubernetes.config.config_exception
-import urllib3
-import urllib3.exceptions
-import yaml
-from legion.utils import normalize_name
+docker = lazy_import('docker')
+kubernetes = lazy_import('kubernetes')
+urllib3 = lazy_import('urllib3')
+yaml = lazy_import('yaml')
 
 ModelDeploymentDescription = typing.NamedTuple('ModelDeploymentDescription', [
     ('status', str),
@@ -51,22 +51,95 @@ ModelDeploymentDescription = typing.NamedTuple('ModelDeploymentDescription', [
     ('model_api_info', dict),
 ])
 
+# Namespace (None for all namespaces) => model deployments index
+_deployment_indexes = {}
+_deployment_indexes_lock = threading.Lock()
 
-def build_client():
+_client = None
+_client_created = 0.0
+_client_lock = threading.Lock()
+
+
+def build_client(pool_size=None):
     """
-    Configure and returns kubernetes client
+    Configure and returns new kubernetes client
 
-    :return: :py:module:`kubernetes.client`
+    :param pool_size: max count of kept connections to API server (default: from ENV)
+    :type pool_size: int or None
+    :return: :py:class:`kubernetes.client.ApiClient`
     """
+    if pool_size is None:
+        pool_size = int(os.environ.get(*legion.config.K8S_CLIENT_POOL_SIZE))
+
+    configuration = kubernetes.client.Configuration()
     try:
-        kubernetes.config.load_incluster_config()
-    except kubernetes.config.config_exception.ConfigException:
-        kubernetes.config.load_kube_config()
+        # Service account token is re-read by client when it expires
+        kubernetes.config.load_incluster_config(client_configuration=configuration)
+    except kubernetes.config.ConfigException:
+        kubernetes.config.load_kube_config(client_configuration=configuration)
+
+    configuration.connection_pool_maxsize = pool_size
 
     # Disable SSL warning for self-signed certificates
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-    return kubernetes.client.ApiClient()
+    return kubernetes.client.ApiClient(configuration)
+
+
+def get_client():
+    """
+    Get process-wide kubernetes client with keep-alive connections to API server.
+    Client is rebuilt (with reload of credentials) when it is older than refresh period
+
+    :return: :py:class:`kubernetes.client.ApiClient`
+    """
+    global _client, _client_created
+
+    refresh_period = float(os.environ.get(*legion.config.K8S_CLIENT_REFRESH_PERIOD))
+    replaced_client = None
+
+    with _client_lock:
+        if _client is None or time.monotonic() - _client_created > refresh_period:
+            replaced_client = _client
+            _client = build_client()
+            _client_created = time.monotonic()
+        client = _client
+
+    if replaced_client is not None:
+        _close_client(replaced_client)
+    return client
+
+
+def _close_client(client):
+    """
+    Close connection pool of replaced kubernetes client.
+    Requests in progress are finished, their connections are not returned to pool
+
+    :param client: client
+    :type client: :py:class:`kubernetes.client.ApiClient`
+    :return: None
+    """
+    close = getattr(client, 'close', None)
+    if close is not None:
+        close()
+    else:
+        # Old versions of kubernetes package
+        client.rest_client.pool_manager.clear()
+
+
+def reset_client():
+    """
+    Drop process-wide kubernetes client (it will be rebuilt on next get_client call)
+
+    :return: None
+    """
+    global _client
+
+    with _client_lock:
+        replaced_client, _client = _client, None
+
+    if replaced_client is not None:
+        _close_client(replaced_client)
 
 
 def load_config(path_to_config):
@@ -120,6 +193,60 @@ def load_secrets(path_to_secrets):
     return secrets
 
 
+def start_deployment_index(namespace=None, resync_period=None, source=None):
+    """
+    Start in-memory index of model deployments of namespace (kubernetes watch in background thread).
+    Index is started once per namespace, lookups use it after first resync
+
+    :param namespace: namespace or None for all namespaces
+    :type namespace: str or None
+    :param resync_period: period of full resync in seconds (default: from ENV)
+    :type resync_period: float or None
+    :param source: source of deployments (default: kubernetes API)
+    :type source: :py:class:`legion.containers.k8s_index.KubernetesDeploymentSource` or compatible
+    :return: :py:class:`legion.containers.k8s_index.ModelDeploymentIndex` -- index
+    """
+    if resync_period is None:
+        resync_period = float(os.environ.get(*legion.config.DEPLOYMENT_INDEX_RESYNC_PERIOD))
+    if source is None:
+        source = legion.containers.k8s_index.KubernetesDeploymentSource(namespace)
+
+    with _deployment_indexes_lock:
+        if namespace not in _deployment_indexes:
+            index = legion.containers.k8s_index.ModelDeploymentIndex(source, resync_period)
+            _deployment_indexes[namespace] = index.start()
+        return _deployment_indexes[namespace]
+
+
+def stop_deployment_indexes():
+    """
+    Stop all started indexes of model deployments
+
+    :return: None
+    """
+    with _deployment_indexes_lock:
+        indexes = list(_deployment_indexes.values())
+        _deployment_indexes.clear()
+
+    for index in indexes:
+        index.stop()
+
+
+def get_deployment_index(namespace=None):
+    """
+    Get synced index of model deployments of namespace
+
+    :param namespace: namespace or None for all namespaces
+    :type namespace: str or None
+    :return: :py:class:`legion.containers.k8s_index.ModelDeploymentIndex` or None -- index or None if it
+    has not been started or synced
+    """
+    index = _deployment_indexes.get(namespace)
+    if index is not None and index.synced:
+        return index
+    return None
+
+
 def find_model_deployment(model_id, namespace='default'):
     """
     Find model deployment by model id
@@ -130,7 +257,14 @@ def find_model_deployment(model_id, namespace='default'):
     :type namespace: str
     :return: :py:class:`kubernetes.client.models.extensions_v1beta1_deployment.ExtensionsV1beta1Deployment`
     """
-    client = build_client()
+    index = get_deployment_index(namespace)
+    if index is not None:
+        deployment = index.get(model_id, namespace=namespace)
+        if deployment is not None:
+            return deployment
+        # Deployment can be created after last watch event (for example, scale right after deploy)
+
+    client = get_client()
 
     extension_api = kubernetes.client.ExtensionsV1beta1Api(client)
     all_deployments = extension_api.list_namespaced_deployment(namespace)
@@ -157,7 +291,11 @@ def find_all_models_deployments(namespace='default'):
     :type namespace: str or none for all
     :return: list[:py:class:`kubernetes.client.models.extensions_v1beta1_deployment.ExtensionsV1beta1Deployment`]
     """
-    client = build_client()
+    index = get_deployment_index(namespace)
+    if index is not None:
+        return index.get_all()
+
+    client = get_client()
 
     extension_api = kubernetes.client.ExtensionsV1beta1Api(client)
     if namespace:
@@ -189,12 +327,12 @@ def scale_deployment(deployment, new_scale, namespace='default'):
     :type namespace: str
     :return: None
     """
-    client = build_client()
+    client = get_client()
 
     extension_api = kubernetes.client.ExtensionsV1beta1Api(client)
 
-    body = deployment
-    deployment.spec.replicas = new_scale
+    # Only replicas are patched: deployment may be a cached copy with outdated resource version
+    body = {'spec': {'replicas': new_scale}}
 
     extension_api.patch_namespaced_deployment(deployment.metadata.name, namespace, body)
 
@@ -214,7 +352,7 @@ def remove_deployment(deployment, namespace='default', grace_period=0):
     :type grace_period: int
     :return: None
     """
-    client = build_client()
+    client = get_client()
 
     api_instance = kubernetes.client.AppsV1beta1Api(client)
 
@@ -224,8 +362,39 @@ def remove_deployment(deployment, namespace='default', grace_period=0):
                                               grace_period_seconds=grace_period)
 
 
+def build_model_probes(image_labels, startup_timeout=None):
+    """
+    Build liveness and readiness probes of model container.
+    Liveness probe starts after startup timeout (loading of big model is not treated as hang),
+    readiness probe uses /ready endpoint if image has it (older images have /healthcheck only)
+
+    :param image_labels: labels of model image in DNS-1123 format
+    :type image_labels: dict[str, str]
+    :param startup_timeout: max time of model loading in seconds (default: from ENV)
+    :type startup_timeout: int or None
+    :return: tuple[:py:class:`kubernetes.client.V1Probe`, :py:class:`kubernetes.client.V1Probe`] -- liveness
+             and readiness probes
+    """
+    if startup_timeout is None:
+        startup_timeout = int(os.getenv(*legion.config.MODEL_STARTUP_TIMEOUT))
+
+    has_readiness_check = image_labels.get(normalize_name(legion.containers.headers.DOMAIN_READINESS_CHECK)) == 'true'
+
+    liveness_probe = kubernetes.client.V1Probe(
+        http_get=kubernetes.client.V1HTTPGetAction(path='/healthcheck', port=5000),
+        initial_delay_seconds=int(startup_timeout),
+        period_seconds=10
+    )
+    readiness_probe = kubernetes.client.V1Probe(
+        http_get=kubernetes.client.V1HTTPGetAction(path='/ready' if has_readiness_check else '/healthcheck',
+                                                   port=5000),
+        period_seconds=2
+    )
+    return liveness_probe, readiness_probe
+
+
 def deploy(cluster_config, cluster_secrets, namespace,
-           deployment, image, k8s_image=None, count=1, register_on_grafana=True):
+           deployment, image, k8s_image=None, count=1, register_on_grafana=True, startup_timeout=None):
     """
     Deploy model to kubernetes
 
@@ -245,19 +414,19 @@ def deploy(cluster_config, cluster_secrets, namespace,
     :type count: int
     :param register_on_grafana: register model in grafana (create dashboard)
     :type register_on_grafana: bool
+    :param startup_timeout: max time of model loading in seconds (default: from ENV)
+    :type startup_timeout: int or None
     :return: :py:class:`docker.model.Container` new instance
     """
     client = kubernetes.client
 
-    # TODO: Question. What do?
-    build_client()
-
     if k8s_image:
         kubernetes_image = k8s_image
     else:
         kubernetes_image = image
 
     deployment_name, compatible_labels, model_id, model_version = get_meta_from_docker_image(image)
+    liveness_probe, readiness_probe = build_model_probes(compatible_labels, startup_timeout)
 
     if register_on_grafana:
         grafana_url = 'http://%s:%d' % (cluster_config['grafana']['domain'], cluster_config['grafana']['port'])
@@ -282,7 +451,9 @@ def deploy(cluster_config, cluster_secrets, namespace,
             client.V1EnvVar(name=k, value=v)
             for k, v in container_env_variables.items()
         ],
-        ports=[client.V1ContainerPort(container_port=5000, name='api', protocol='TCP')])
+        ports=[client.V1ContainerPort(container_port=5000, name='api', protocol='TCP')],
+        liveness_probe=liveness_probe,
+        readiness_probe=readiness_probe)
 
     template = client.V1PodTemplateSpec(
         metadata=client.V1ObjectMeta(labels=compatible_labels),
@@ -298,7 +469,7 @@ def deploy(cluster_config, cluster_secrets, namespace,
         metadata=client.V1ObjectMeta(name=deployment_name, labels=compatible_labels),
         spec=deployment_spec)
 
-    extensions_v1beta1 = client.ExtensionsV1beta1Api()
+    extensions_v1beta1 = client.ExtensionsV1beta1Api(get_client())
 
     api_response = extensions_v1beta1.create_namespaced_deployment(
         body=deployment,
@@ -307,15 +478,125 @@ def deploy(cluster_config, cluster_secrets, namespace,
     return api_response
 
 
-def inspect(cluster_config, cluster_secrets, namespace=None):
+def probe_model_api(model_id, edge_url, timeout, http_client=None):
+    """
+    Get model API information through the edge (without retries)
+
+    :param model_id: model id
+    :type model_id: str
+    :param edge_url: edge URL
+    :type edge_url: str
+    :param timeout: timeout of request in seconds
+    :type timeout: float
+    :param http_client: HTTP client (default: pooled requests session)
+    :type http_client: python class that implements requests-like post & get methods
+    :return: tuple[bool, dict] -- is model API ok and model API information
+    """
+    model_api_info = {
+        'host': edge_url
+    }
+
+    try:
+        model_client = ModelClient(model_id, host=edge_url, http_client=http_client, retries=0, timeout=timeout)
+        model_api_info['result'] = model_client.info()
+        return True, model_api_info
+    except Exception as model_api_exception:
+        model_api_info['exception'] = str(model_api_exception)
+        return False, model_api_info
+
+
+def probe_models_api(model_ids, edge_url, threads=None, timeout=None):
+    """
+    Get API information of models concurrently (in bounded thread pool).
+    Probes that are not finished in timeout after their start are reported as failed,
+    other results are returned as is. Probes that wait for free thread longer than all waves of probes
+    (timeout for each wave of pool size) are reported as failed too
+
+    :param model_ids: model ids
+    :type model_ids: list[str]
+    :param edge_url: edge URL
+    :type edge_url: str
+    :param threads: max count of concurrent probes (default: from ENV)
+    :type threads: int or None
+    :param timeout: timeout of probe in seconds (default: from ENV)
+    :type timeout: float or None
+    :return: list[tuple[bool, dict]] -- is model API ok and model API information for each model id
+    """
+    if not model_ids:
+        return []
+
+    if threads is None:
+        threads = int(os.environ.get(*legion.config.INSPECT_PROBE_THREADS))
+    if timeout is None:
+        timeout = float(os.environ.get(*legion.config.INSPECT_PROBE_TIMEOUT))
+
+    threads = max(1, min(threads, len(model_ids)))
+    waves = (len(model_ids) + threads - 1) // threads
+    start_deadline = time.monotonic() + timeout * waves
+
+    session = build_session(threads)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads, thread_name_prefix='model-api-probe')
+    started = {}
+
+    def run_probe(index):
+        started[index] = time.monotonic()
+        return probe_model_api(model_ids[index], edge_url, timeout, session)
+
+    try:
+        futures = [executor.submit(run_probe, index) for index in range(len(model_ids))]
+    finally:
+        # Hung probes are not awaited: they are finished by request timeout in background
+        executor.shutdown(wait=False)
+
+    # Session is closed when all probes are finished or cancelled
+    unfinished = [len(futures)]
+    unfinished_lock = threading.Lock()
+
+    def release_session(future):
+        with unfinished_lock:
+            unfinished[0] -= 1
+            if unfinished[0]:
+                return
+        session.close()
+
+    for future in futures:
+        future.add_done_callback(release_session)
+
+    results = []
+    for index, future in enumerate(futures):
+        while not future.done():
+            if index in started:
+                remaining = started[index] + timeout - time.monotonic()
+            else:
+                # Probe waits for free thread, its own deadline is known after start
+                remaining = min(start_deadline - time.monotonic(), 0.05)
+            if remaining <= 0:
+                break
+            concurrent.futures.wait([future], timeout=remaining)
+
+        if future.done():
+            results.append(future.result())
+        else:
+            future.cancel()
+            results.append((False, {'host': edge_url,
+                                    'exception': 'Model API has not answered in %.1f seconds' % timeout}))
+
+    return results
+
+
+def inspect(cluster_config, cluster_secrets, namespace=None, probe_threads=None, probe_timeout=None):
     """
-    Get model deployments information
+    Get model deployments information. Model APIs are probed concurrently
 
     :param cluster_config: cluster configuration
     :type cluster_config: dict
     :param cluster_secrets: secrets with credentials
     :type cluster_secrets: dict[str, str]
     :param namespace:
+    :param probe_threads: max count of concurrent model API probes (default: from ENV)
+    :type probe_threads: int or None
+    :param probe_timeout: timeout of model API probe in seconds (default: from ENV)
+    :type probe_timeout: float or None
     :return: list[:py:class:`legion.containers.k8s.ModelDeploymentDescription`]
     """
     deployments = find_all_models_deployments(namespace)
@@ -323,7 +604,13 @@ def inspect(cluster_config, cluster_secrets, namespace=None):
 
     edge_url = 'http://%s:%d' % (cluster_config['edge']['domain'], cluster_config['edge']['port'])
 
-    for deployment in deployments:
+    model_names = [
+        deployment.metadata.labels.get(normalize_name(legion.containers.headers.DOMAIN_MODEL_ID), '?')
+        for deployment in deployments
+    ]
+    probes = probe_models_api(model_names, edge_url, probe_threads, probe_timeout)
+
+    for deployment, model_name, (model_api_ok, model_api_info) in zip(deployments, model_names, probes):
         ready_replicas = deployment.status.ready_replicas
         if not ready_replicas:
             ready_replicas = 0
@@ -339,25 +626,10 @@ def inspect(cluster_config, cluster_secrets, namespace=None):
 
         container_image = deployment.spec.template.spec.containers[0].image
 
-        model_name = deployment.metadata.labels.get(
-            normalize_name(legion.containers.headers.DOMAIN_MODEL_ID), '?'
-        )
         model_version = deployment.metadata.labels.get(
             normalize_name(legion.containers.headers.DOMAIN_MODEL_VERSION), '?'
         )
 
-        model_api_info = {
-            'host': edge_url
-        }
-
-        try:
-            model_client = ModelClient(model_name, host=edge_url)
-            model_api_info['result'] = model_client.info()
-            model_api_ok = True
-        except Exception as model_api_exception:
-            model_api_info['exception'] = str(model_api_exception)
-            model_api_ok = False
-
         model_information = ModelDeploymentDescription(
             status=status,
             model=model_name,
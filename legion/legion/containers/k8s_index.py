@@ -0,0 +1,351 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+In-memory index of model deployments fed by kubernetes watch stream
+"""
+import logging
+import threading
+
+import legion.containers.headers
+from legion.utils import normalize_name, lazy_import
+
+kubernetes = lazy_import('kubernetes')
+
+LOGGER = logging.getLogger(__name__)
+
+EVENT_ADDED = 'ADDED'
+EVENT_MODIFIED = 'MODIFIED'
+EVENT_DELETED = 'DELETED'
+EVENT_ERROR = 'ERROR'
+
+MODEL_TYPE_LABEL = normalize_name(legion.containers.headers.DOMAIN_CONTAINER_TYPE)
+MODEL_ID_LABEL = normalize_name(legion.containers.headers.DOMAIN_MODEL_ID)
+MODEL_VERSION_LABEL = normalize_name(legion.containers.headers.DOMAIN_MODEL_VERSION)
+
+
+class KubernetesDeploymentSource:
+    """
+    Source of model deployments: list and watch requests to kubernetes API (filtered by model type label)
+    """
+
+    def __init__(self, namespace=None, client_builder=None):
+        """
+        Build source
+
+        :param namespace: namespace or None for all namespaces
+        :type namespace: str or None
+        :param client_builder: function that builds kubernetes API client (default: legion.containers.k8s.get_client)
+        :type client_builder: Callable[[], :py:class:`kubernetes.client.ApiClient`] or None
+        """
+        self._namespace = namespace
+        self._client_builder = client_builder
+        self._watch = None
+
+    @property
+    def api(self):
+        """
+        Get extensions API (client is requested on each call to follow its refreshes)
+
+        :return: :py:class:`kubernetes.client.ExtensionsV1beta1Api`
+        """
+        client_builder = self._client_builder
+        if client_builder is None:
+            import legion.containers.k8s
+            client_builder = legion.containers.k8s.get_client
+        return kubernetes.client.ExtensionsV1beta1Api(client_builder())
+
+    def _list_arguments(self):
+        """
+        Build list function and its arguments
+
+        :return: tuple[Callable, list, dict] -- list function, positional and keyword arguments
+        """
+        arguments = {'label_selector': '%s=model' % MODEL_TYPE_LABEL}
+        if self._namespace:
+            return self.api.list_namespaced_deployment, [self._namespace], arguments
+        return self.api.list_deployment_for_all_namespaces, [], arguments
+
+    def list(self):
+        """
+        List model deployments
+
+        :return: tuple[list, str] -- deployments and resource version of list
+        """
+        function, args, kwargs = self._list_arguments()
+        deployments = function(*args, **kwargs)
+        return deployments.items, deployments.metadata.resource_version
+
+    def watch(self, resource_version, timeout):
+        """
+        Watch changes of model deployments
+
+        :param resource_version: resource version to start from
+        :type resource_version: str
+        :param timeout: max duration of watch in seconds
+        :type timeout: int
+        :return: Iterator[tuple[str, object]] -- event type and deployment
+        """
+        function, args, kwargs = self._list_arguments()
+        self._watch = kubernetes.watch.Watch()
+        for event in self._watch.stream(function, *args, resource_version=resource_version,
+                                        timeout_seconds=int(timeout), **kwargs):
+            yield event['type'], event['object']
+
+    def stop(self):
+        """
+        Stop current watch
+
+        :return: None
+        """
+        if self._watch is not None:
+            self._watch.stop()
+
+
+class ModelDeploymentIndex:
+    """
+    Index of model deployments keyed by namespace, model id and version (normalized label values).
+    Index is filled by full list (resync) and then updated by watch events in background thread.
+    Full resync is done every resync_period seconds and after watch errors
+    """
+
+    def __init__(self, source, resync_period=300.0, retry_delay=1.0):
+        """
+        Build index
+
+        :param source: source of deployments with list() and watch(resource_version, timeout) methods
+        :type source: :py:class:`legion.containers.k8s_index.KubernetesDeploymentSource` or compatible
+        :param resync_period: period of full resync in seconds
+        :type resync_period: float
+        :param retry_delay: delay before resync after error in seconds
+        :type retry_delay: float
+        """
+        self._source = source
+        self._resync_period = resync_period
+        self._retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        # (namespace, model id, version) => deployment
+        self._deployments = {}
+        # model id => {(namespace, version) => deployment}
+        self._models = {}
+        # (namespace, name) => (namespace, model id, version)
+        self._names = {}
+        self.resource_version = None
+        self.resyncs = 0
+        self.events = 0
+
+    @staticmethod
+    def _get_keys(deployment):
+        """
+        Get keys of deployment
+
+        :param deployment: deployment
+        :return: tuple[tuple[str, str], tuple[str, str, str]] -- name key (namespace, name)
+                 and model key (namespace, id, version)
+        """
+        labels = deployment.metadata.labels or {}
+        namespace = deployment.metadata.namespace
+        name_key = namespace, deployment.metadata.name
+        if labels.get(MODEL_TYPE_LABEL) != 'model':
+            return name_key, None
+        return name_key, (namespace, labels.get(MODEL_ID_LABEL, '?'), labels.get(MODEL_VERSION_LABEL, '?'))
+
+    def _remove(self, name_key):
+        """
+        Remove deployment from index (lock should be acquired)
+
+        :param name_key: namespace and name of deployment
+        :type name_key: tuple[str, str]
+        :return: None
+        """
+        model_key = self._names.pop(name_key, None)
+        if model_key is None:
+            return
+
+        namespace, model_id, model_version = model_key
+        self._deployments.pop(model_key, None)
+        versions = self._models.get(model_id)
+        if versions is not None:
+            versions.pop((namespace, model_version), None)
+            if not versions:
+                del self._models[model_id]
+
+    def _add(self, deployment):
+        """
+        Add or replace deployment in index (lock should be acquired)
+
+        :param deployment: deployment
+        :return: None
+        """
+        name_key, model_key = self._get_keys(deployment)
+        self._remove(name_key)
+        if model_key is None:
+            return
+
+        namespace, model_id, model_version = model_key
+        self._names[name_key] = model_key
+        self._deployments[model_key] = deployment
+        self._models.setdefault(model_id, {})[(namespace, model_version)] = deployment
+
+    def resync(self):
+        """
+        Replace index content with full list of deployments
+
+        :return: None
+        """
+        deployments, resource_version = self._source.list()
+        with self._lock:
+            self._deployments = {}
+            self._models = {}
+            self._names = {}
+            for deployment in deployments:
+                self._add(deployment)
+            self.resource_version = resource_version
+            self.resyncs += 1
+        self._synced.set()
+
+    def apply_event(self, event_type, deployment):
+        """
+        Apply watch event to index
+
+        :param event_type: type of event (ADDED, MODIFIED, DELETED)
+        :type event_type: str
+        :param deployment: deployment
+        :return: None
+        """
+        with self._lock:
+            if event_type == EVENT_DELETED:
+                self._remove(self._get_keys(deployment)[0])
+            elif event_type in (EVENT_ADDED, EVENT_MODIFIED):
+                self._add(deployment)
+            else:
+                return
+
+            resource_version = getattr(deployment.metadata, 'resource_version', None)
+            if resource_version:
+                self.resource_version = resource_version
+            self.events += 1
+
+    def _watch(self):
+        """
+        Apply watch events until end of resync period or watch error
+
+        :return: bool -- False if watch has been finished by error
+        """
+        for event_type, deployment in self._source.watch(self.resource_version, self._resync_period):
+            if self._stopped.is_set():
+                break
+            if event_type == EVENT_ERROR:
+                # Resource version is too old (410 Gone) or other watch error: full resync is required
+                LOGGER.warning('Model deployments watch error: %s', deployment)
+                return False
+            self.apply_event(event_type, deployment)
+
+        return True
+
+    def run(self):
+        """
+        Keep index up to date (blocks until stop)
+
+        :return: None
+        """
+        while not self._stopped.is_set():
+            try:
+                self.resync()
+                if not self._watch():
+                    self._stopped.wait(self._retry_delay)
+            except Exception as index_exception:
+                LOGGER.warning('Model deployments index update failed: %s', index_exception)
+                self._stopped.wait(self._retry_delay)
+
+    def start(self):
+        """
+        Run index updates in background thread
+
+        :return: :py:class:`legion.containers.k8s_index.ModelDeploymentIndex` -- self
+        """
+        self._thread = threading.Thread(target=self.run, name='model-deployments-index', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stop background updates
+
+        :param timeout: timeout of thread join in seconds
+        :type timeout: float or None
+        :return: None
+        """
+        self._stopped.set()
+        if hasattr(self._source, 'stop'):
+            self._source.stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def synced(self):
+        """
+        Check that index has been filled by full list
+
+        :return: bool -- check result
+        """
+        return self._synced.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for first resync
+
+        :param timeout: timeout in seconds or None
+        :type timeout: float or None
+        :return: bool -- is index synced
+        """
+        return self._synced.wait(timeout)
+
+    def get(self, model_id, model_version=None, namespace=None):
+        """
+        Find model deployment
+
+        :param model_id: model id
+        :type model_id: str
+        :param model_version: model version or None for any version
+        :type model_version: str or None
+        :param namespace: namespace or None for any namespace
+        :type namespace: str or None
+        :return: deployment or None
+        """
+        model_id = normalize_name(model_id)
+        if model_version is not None:
+            model_version = normalize_name(model_version)
+
+        with self._lock:
+            if model_version is not None and namespace is not None:
+                return self._deployments.get((namespace, model_id, model_version))
+
+            for (deployment_namespace, deployment_version), deployment in self._models.get(model_id, {}).items():
+                if namespace in (None, deployment_namespace) and model_version in (None, deployment_version):
+                    return deployment
+            return None
+
+    def get_all(self):
+        """
+        Get all model deployments
+
+        :return: list -- deployments
+        """
+        with self._lock:
+            return list(self._deployments.values())
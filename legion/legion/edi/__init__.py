@@ -16,3 +16,9 @@
 """
 Remote api server and client
 """
+
+EDI_VERSION = '1.0'
+EDI_DEPLOY = '/api/{version}/deploy'
+EDI_UNDEPLOY = '/api/{version}/undeploy'
+EDI_SCALE = '/api/{version}/scale'
+EDI_INSPECT = '/api/{version}/inspect'
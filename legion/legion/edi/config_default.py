@@ -35,3 +35,11 @@ REGISTER_ON_GRAFANA = True
 
 CLUSTER_CONFIG_PATH = '/opt/legion/state/cluster.yaml'
 CLUSTER_SECRETS_PATH = '/opt/legion/secrets'
+
+INSPECT_PROBE_THREADS = 16
+INSPECT_PROBE_TIMEOUT = 5.0
+
+MODEL_STARTUP_TIMEOUT = 600
+
+DEPLOYMENT_INDEX_ENABLED = True
+DEPLOYMENT_INDEX_RESYNC_PERIOD = 300.0
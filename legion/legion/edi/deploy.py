@@ -22,17 +22,17 @@ import os
 import time
 import re
 
-import docker
-import docker.errors
 import legion.config
 import legion.containers.docker
 import legion.containers.headers
 import legion.containers.k8s
 import legion.external.edi
 import legion.external.grafana
-import legion.io
 import legion.utils
-from legion.utils import Colors, ExternalFileReader
+from legion.utils import Colors, ExternalFileReader, lazy_import
+
+docker = lazy_import('docker')
+legion_io = lazy_import('legion.io')
 
 LOGGER = logging.getLogger('deploy')
 VALID_SERVING_WORKERS = legion.containers.docker.VALID_SERVING_WORKERS
@@ -56,7 +56,7 @@ def build_model(args):
         if not os.path.exists(external_reader.path):
             raise Exception('Cannot find model file: %s' % external_reader.path)
 
-        with legion.io.ModelContainer(external_reader.path, do_not_load_model=True) as container:
+        with legion_io.ModelContainer(external_reader.path, do_not_load_model=True) as container:
             model_id = container.get('model.id', None)
             if args.model_id:
                 model_id = args.model_id
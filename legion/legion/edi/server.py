@@ -24,18 +24,13 @@ import legion.containers.k8s
 import legion.external.grafana
 import legion.http
 import legion.io
+from legion.edi import EDI_VERSION, EDI_DEPLOY, EDI_UNDEPLOY, EDI_SCALE, EDI_INSPECT
 from flask import Flask, Blueprint
 from flask import current_app as app
 
 LOGGER = logging.getLogger(__name__)
 blueprint = Blueprint('apiserver', __name__)
 
-EDI_VERSION = '1.0'
-EDI_DEPLOY = '/api/{version}/deploy'
-EDI_UNDEPLOY = '/api/{version}/undeploy'
-EDI_SCALE = '/api/{version}/scale'
-EDI_INSPECT = '/api/{version}/inspect'
-
 
 def build_blueprint_url(endpoint_url_template):
     """
@@ -92,7 +87,7 @@ def deploy(image, count=1, k8s_image=None):
     register_on_grafana = app.config['REGISTER_ON_GRAFANA']
     legion.containers.k8s.deploy(app.config['CLUSTER_STATE'], app.config['CLUSTER_SECRETS'],
                                  app.config['NAMESPACE'], app.config['DEPLOYMENT'], image, k8s_image, count,
-                                 register_on_grafana)
+                                 register_on_grafana, app.config['MODEL_STARTUP_TIMEOUT'])
     return True
 
 
@@ -148,7 +143,9 @@ def inspect():
     :return: dict -- state of cluster models
     """
     model_deployments = legion.containers.k8s.inspect(app.config['CLUSTER_STATE'], app.config['CLUSTER_SECRETS'],
-                                                      app.config['NAMESPACE'])
+                                                      app.config['NAMESPACE'],
+                                                      probe_threads=app.config['INSPECT_PROBE_THREADS'],
+                                                      probe_timeout=app.config['INSPECT_PROBE_TIMEOUT'])
     # TODO: Change transform to dict algorithm
     return [{f: getattr(x, f) for f in x._fields} for x in model_deployments]
 
@@ -193,6 +190,10 @@ def init_application(args=None):
     legion.http.configure_application(application, args)
     load_cluster_config(application)
 
+    if application.config['DEPLOYMENT_INDEX_ENABLED']:
+        legion.containers.k8s.start_deployment_index(application.config['NAMESPACE'],
+                                                     application.config['DEPLOYMENT_INDEX_RESYNC_PERIOD'])
+
     return application
 
 
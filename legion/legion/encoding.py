@@ -0,0 +1,335 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Encoding of model inputs and results: NumPy-aware JSON and binary columns format
+"""
+
+import datetime
+import json
+import math
+import struct
+
+from legion.utils import lazy_import
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+np = lazy_import('numpy')
+
+JSON_MIME_TYPE = 'application/json'
+COLUMNS_MIME_TYPE = 'application/x-legion-columns'
+
+# Binary columns format: magic, little-endian uint32 size of JSON header, JSON header, padding and column buffers.
+# JSON header is a list of columns: {"name": str, "dtype": numpy dtype string, "shape": list[int], "offset": int}
+# Offsets are relative to the end of header padding, each buffer is aligned to COLUMNS_ALIGNMENT bytes
+COLUMNS_MAGIC = b'LGNCOLS1'
+COLUMNS_ALIGNMENT = 8
+COLUMNS_KINDS = 'biufc'
+DEFAULT_COLUMN_NAME = 'result'
+
+_COLUMNS_PREFIX = struct.Struct('<8sI')
+
+
+def _aligned(size):
+    """
+    Round size up to COLUMNS_ALIGNMENT
+
+    :param size: size in bytes
+    :type size: int
+    :return: int -- aligned size
+    """
+    return (size + COLUMNS_ALIGNMENT - 1) // COLUMNS_ALIGNMENT * COLUMNS_ALIGNMENT
+
+
+def _is_pandas_object(value):
+    """
+    Check that value is pandas object (without import of pandas)
+
+    :param value: value
+    :type value: any
+    :return: bool -- check result
+    """
+    return type(value).__module__.partition('.')[0] == 'pandas'
+
+
+def _default(value):
+    """
+    Convert value that is not supported by JSON encoder
+
+    :param value: value
+    :type value: any
+    :return: value supported by JSON encoder
+    """
+    if isinstance(value, datetime.datetime):
+        # Subclasses (pandas Timestamp) as datetime, with microseconds like NumPy datetimes of orjson
+        return datetime.datetime.isoformat(value)
+    elif isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    elif isinstance(value, np.generic):
+        return value.item()
+    elif isinstance(value, np.ndarray):
+        # orjson serializes only C-contiguous arrays of numeric types
+        if orjson is not None and value.dtype.kind in COLUMNS_KINDS and not value.flags.c_contiguous:
+            return np.ascontiguousarray(value)
+        return value.tolist()
+    elif _is_pandas_object(value):
+        if hasattr(value, 'columns'):
+            return {str(name): value[name].values for name in value.columns}
+        elif hasattr(value, 'values'):
+            return value.values
+
+    raise TypeError('Object of type %s is not JSON serializable' % type(value).__name__)
+
+
+def _to_json_types(value):
+    """
+    Convert data to types of standard json module the same way as orjson serializes them:
+    NaN and infinity to null, NumPy datetimes (with microseconds) and other dates to ISO 8601 strings,
+    float32 and float16 values to shortest decimal representation
+
+    :param value: value
+    :type value: any
+    :return: value of JSON type
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    elif value is None or isinstance(value, (str, int)):
+        return value
+    elif isinstance(value, dict):
+        return {key: _to_json_types(item) for key, item in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [_to_json_types(item) for item in value]
+    elif isinstance(value, (np.ndarray, np.generic)):
+        if value.dtype.kind == 'M':
+            # NaT is converted to None
+            value = value.astype('datetime64[us]')
+        elif value.dtype.kind == 'f' and value.dtype.itemsize < 8:
+            value = value.astype(str).astype(np.float64)
+        return _to_json_types(value.tolist() if isinstance(value, np.ndarray) else value.item())
+
+    return _to_json_types(_default(value))
+
+
+def encode_json_stdlib(data):
+    """
+    Encode data to compact JSON with standard json module (NumPy and pandas objects are supported).
+    Output is the same as output of orjson
+
+    :param data: data
+    :type data: any
+    :return: bytes -- JSON
+    """
+    return json.dumps(_to_json_types(data), allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_json(data):
+    """
+    Encode data to compact JSON. NumPy arrays, NumPy scalars, pandas Series (as lists)
+    and DataFrames (as dicts of column lists) are supported.
+    orjson is used if it is installed (arrays are serialized without building of Python lists).
+    NaN and infinity are encoded as null, dates and times as ISO 8601 strings
+
+    :param data: data
+    :type data: any
+    :return: bytes -- JSON
+    """
+    if orjson is None:
+        return encode_json_stdlib(data)
+
+    try:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    except orjson.JSONEncodeError:
+        # Values that are not supported by orjson (NaT in NumPy arrays, integers larger than 64 bit)
+        return encode_json_stdlib(data)
+
+
+def _to_column(value):
+    """
+    Convert value to array for binary columns format
+
+    :param value: value
+    :type value: any
+    :return: :py:class:`numpy.ndarray` or None -- array or None if value can not be encoded
+    """
+    if _is_pandas_object(value) and hasattr(value, 'values') and not hasattr(value, 'columns'):
+        value = value.values
+
+    if isinstance(value, (np.ndarray, np.generic, int, float, bool, list, tuple)):
+        array = np.asarray(value)
+        if array.dtype.kind in COLUMNS_KINDS:
+            return array
+
+    return None
+
+
+def to_columns(data):
+    """
+    Convert model result to columns for binary columns format
+
+    :param data: model result: dict of arrays, Series, lists and numbers, DataFrame, Series or array
+    :type data: any
+    :return: dict[str, :py:class:`numpy.ndarray`] or None -- columns or None if data can not be encoded
+    """
+    if _is_pandas_object(data) and hasattr(data, 'columns'):
+        data = {name: data[name] for name in data.columns}
+    elif not isinstance(data, dict):
+        data = {DEFAULT_COLUMN_NAME: data}
+
+    columns = {}
+    for name, value in data.items():
+        column = _to_column(value)
+        if column is None:
+            return None
+        columns[str(name)] = column
+
+    return columns
+
+
+def encode_columns(columns):
+    """
+    Encode arrays to binary columns format (raw little-endian buffers)
+
+    :param columns: column name => array
+    :type columns: dict[str, :py:class:`numpy.ndarray`]
+    :return: bytes -- encoded columns
+    """
+    header = []
+    buffers = []
+    offset = 0
+
+    for name, column in columns.items():
+        column = np.asarray(column)
+        if column.dtype.kind not in COLUMNS_KINDS:
+            raise Exception('Column %s has unsupported type %s' % (name, column.dtype))
+
+        column = np.ascontiguousarray(column, dtype=column.dtype.newbyteorder('<'))
+        header.append({'name': name, 'dtype': column.dtype.str, 'shape': list(column.shape), 'offset': offset})
+        buffers.append((offset, column))
+        offset = _aligned(offset + column.nbytes)
+
+    header_data = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    data_start = _aligned(_COLUMNS_PREFIX.size + len(header_data))
+
+    result = bytearray(data_start + offset)
+    _COLUMNS_PREFIX.pack_into(result, 0, COLUMNS_MAGIC, len(header_data))
+    result[_COLUMNS_PREFIX.size:_COLUMNS_PREFIX.size + len(header_data)] = header_data
+    for buffer_offset, column in buffers:
+        start = data_start + buffer_offset
+        result[start:start + column.nbytes] = column.reshape(-1).view(np.uint8).data
+
+    return bytes(result)
+
+
+def decode_columns(data):
+    """
+    Decode binary columns format. Arrays are read-only views of data (without copy)
+
+    :param data: encoded columns
+    :type data: bytes
+    :return: dict[str, :py:class:`numpy.ndarray`] -- column name => array
+    """
+    if len(data) < _COLUMNS_PREFIX.size:
+        raise Exception('Invalid binary columns data: too short')
+
+    magic, header_size = _COLUMNS_PREFIX.unpack_from(data, 0)
+    if magic != COLUMNS_MAGIC:
+        raise Exception('Invalid binary columns data: wrong magic')
+
+    header = json.loads(bytes(data[_COLUMNS_PREFIX.size:_COLUMNS_PREFIX.size + header_size]).decode('utf-8'))
+    data_start = _aligned(_COLUMNS_PREFIX.size + header_size)
+
+    columns = {}
+    for column in header:
+        dtype = np.dtype(column['dtype'])
+        if dtype.kind not in COLUMNS_KINDS:
+            raise Exception('Column %s has unsupported type %s' % (column['name'], dtype))
+
+        count = 1
+        for dimension in column['shape']:
+            count *= dimension
+
+        start = data_start + column['offset']
+        if start + count * dtype.itemsize > len(data):
+            raise Exception('Invalid binary columns data: column %s is out of data' % column['name'])
+
+        columns[column['name']] = np.frombuffer(data, dtype=dtype, count=count, offset=start).reshape(column['shape'])
+
+    return columns
+
+
+def decode_columns_row(data):
+    """
+    Decode binary columns format with one value in each column (input of invoke request)
+
+    :param data: encoded columns
+    :type data: bytes
+    :return: dict[str, :py:class:`numpy.generic`] -- column name => typed value
+    """
+    row = {}
+    for name, column in decode_columns(data).items():
+        if column.size != 1:
+            raise Exception('Column %s should have one value, not %d' % (name, column.size))
+        row[name] = column.reshape(-1)[0]
+
+    return row
+
+
+def decode_columns_batch(data):
+    """
+    Decode binary columns format with one-dimensional columns of equal length (input of batch request)
+
+    :param data: encoded columns
+    :type data: bytes
+    :return: dict[str, :py:class:`numpy.ndarray`] -- column name => typed values
+    """
+    columns = decode_columns(data)
+    for name, column in columns.items():
+        if column.ndim != 1:
+            raise Exception('Column %s should be one-dimensional, not %d-dimensional' % (name, column.ndim))
+
+    return columns
+
+
+def accepts_columns(accept):
+    """
+    Check that client accepts binary columns format
+
+    :param accept: value of Accept header
+    :type accept: str or None
+    :return: bool -- check result
+    """
+    return bool(accept) and COLUMNS_MIME_TYPE in accept
+
+
+def encode_response(data, accept=None):
+    """
+    Encode model result for HTTP response: binary columns format if it is accepted by client
+    and result consists of numeric arrays and numbers, JSON otherwise
+
+    :param data: model result
+    :type data: any
+    :param accept: value of Accept header
+    :type accept: str or None
+    :return: tuple[bytes, str] -- body and its MIME type
+    """
+    if accepts_columns(accept):
+        columns = to_columns(data)
+        if columns is not None:
+            return encode_columns(columns), COLUMNS_MIME_TYPE
+
+    return encode_json(data), JSON_MIME_TYPE
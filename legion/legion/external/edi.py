@@ -22,10 +22,11 @@ import logging
 import os
 
 import legion.containers.k8s
-import legion.edi.server
+import legion.edi
 import legion.config
-import requests
-import requests.exceptions
+from legion.utils import lazy_import
+
+requests = lazy_import('requests')
 
 LOGGER = logging.getLogger(__name__)
 
@@ -52,7 +53,7 @@ class EdiClient:
         self._user = user
         self._password = password
         self._token = token
-        self._version = legion.edi.server.EDI_VERSION
+        self._version = legion.edi.EDI_VERSION
 
     def _query(self, url_template, payload=None, action='GET'):
         """
@@ -106,7 +107,7 @@ class EdiClient:
 
         :return: list[:py:class:`legion.containers.k8s.ModelDeploymentDescription`]
         """
-        answer = self._query(legion.edi.server.EDI_INSPECT)
+        answer = self._query(legion.edi.EDI_INSPECT)
         return [legion.containers.k8s.ModelDeploymentDescription(**x) for x in answer]
 
     def deploy(self, image, count=1, k8s_image=None):
@@ -129,7 +130,7 @@ class EdiClient:
         if k8s_image:
             payload['k8s_image'] = k8s_image
 
-        return self._query(legion.edi.server.EDI_DEPLOY, action='POST', payload=payload)['status']
+        return self._query(legion.edi.EDI_DEPLOY, action='POST', payload=payload)['status']
 
     def undeploy(self, model, grace_period=0):
         """
@@ -147,7 +148,7 @@ class EdiClient:
         if grace_period:
             payload['grace_period'] = grace_period
 
-        return self._query(legion.edi.server.EDI_UNDEPLOY, action='POST', payload=payload)['status']
+        return self._query(legion.edi.EDI_UNDEPLOY, action='POST', payload=payload)['status']
 
     def scale(self, model, count):
         """
@@ -163,7 +164,7 @@ class EdiClient:
             'model': model,
             'count': count
         }
-        return self._query(legion.edi.server.EDI_SCALE, action='POST', payload=payload)['status']
+        return self._query(legion.edi.EDI_SCALE, action='POST', payload=payload)['status']
 
 
 def build_client(args):
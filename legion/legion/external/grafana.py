@@ -21,9 +21,9 @@ import json
 import os
 
 import legion.config
-from legion.utils import render_template
+from legion.utils import render_template, lazy_import
 
-import requests
+requests = lazy_import('requests')
 
 
 class GrafanaClient:
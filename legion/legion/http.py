@@ -20,6 +20,7 @@ import functools
 import os
 
 import legion.config
+import legion.encoding
 import legion.utils
 
 import flask
@@ -28,11 +29,15 @@ import flask
 def parse_request(input_request):
     """
     Produce a input dictionary from HTTP request (GET/POST fields, and Files)
+    or from body in binary columns format (typed values are not parsed)
 
     :param input_request: request object
     :type input_request: :py:class:`Flask.request`
     :return: dict with requested fields
     """
+    if input_request.mimetype == legion.encoding.COLUMNS_MIME_TYPE:
+        return legion.encoding.decode_columns_row(input_request.get_data())
+
     result = {}
 
     # TODO: Add array handl
@@ -52,15 +57,57 @@ def parse_request(input_request):
     return result
 
 
-def prepare_response(response):
+def parse_batch_data(data):
+    """
+    Produce a columnar input dictionary from decoded JSON batch: an array of rows (objects)
+    or an object of columns (arrays)
+
+    :param data: decoded JSON
+    :type data: list[dict] or dict[str, list]
+    :return: dict[str, list] -- column name => list of values
+    """
+    if isinstance(data, dict):
+        if not all(isinstance(values, list) for values in data.values()):
+            raise Exception('Invalid batch request: all columns should be arrays')
+        return data
+
+    if isinstance(data, list):
+        if not all(isinstance(row, dict) for row in data):
+            raise Exception('Invalid batch request: all rows should be objects')
+
+        columns = {column for row in data for column in row}
+        return {column: [row.get(column) for row in data] for column in columns}
+
+    raise Exception('Invalid batch request: JSON array of rows or JSON object of columns expected')
+
+
+def parse_batch_request(input_request):
     """
-    Produce an HTTP response from dict
+    Produce a columnar input dictionary from HTTP request with JSON body or body in binary columns format
 
-    :param response: dict with data
-    :type response: dict[str, any]
-    :return: bytes
+    :param input_request: request object
+    :type input_request: :py:class:`Flask.request`
+    :return: dict[str, union[list, :py:class:`numpy.ndarray`]] -- column name => list of values or typed array
     """
-    return flask.jsonify(response)
+    if input_request.mimetype == legion.encoding.COLUMNS_MIME_TYPE:
+        return legion.encoding.decode_columns_batch(input_request.get_data())
+
+    return parse_batch_data(input_request.get_json(force=True, silent=True))
+
+
+def prepare_response(response, accept=None):
+    """
+    Produce an HTTP response from data: JSON (NumPy and pandas objects are supported)
+    or binary columns format if it is accepted by client
+
+    :param response: data
+    :type response: any
+    :param accept: value of Accept header of request
+    :type accept: str or None
+    :return: :py:class:`Flask.Response`
+    """
+    body, mime_type = legion.encoding.encode_response(response, accept)
+    return flask.Response(body, mimetype=mime_type)
 
 
 def provide_json_response(method):
@@ -232,6 +279,30 @@ def apply_env_args(application):
     apply_env_argument(application, legion.config.DEBUG[0], legion.utils.string_to_bool)
     apply_env_argument(application, legion.config.REGISTER_ON_CONSUL[0], legion.utils.string_to_bool)
 
+    apply_env_argument(application, legion.config.MICRO_BATCHING_ENABLED[0], legion.utils.string_to_bool)
+    apply_env_argument(application, legion.config.MICRO_BATCHING_MAX_SIZE[0], cast=int)
+    apply_env_argument(application, legion.config.MICRO_BATCHING_MAX_DELAY[0], cast=float)
+    apply_env_argument(application, legion.config.AIO_EXECUTOR_TYPE[0])
+    apply_env_argument(application, legion.config.AIO_EXECUTOR_WORKERS[0], cast=int)
+    apply_env_argument(application, legion.config.WARM_UP_ENABLED[0], legion.utils.string_to_bool)
+    apply_env_argument(application, legion.config.WARM_UP_MIN_ITERATIONS[0], cast=int)
+    apply_env_argument(application, legion.config.WARM_UP_MAX_ITERATIONS[0], cast=int)
+    apply_env_argument(application, legion.config.WARM_UP_SETTLE_RATIO[0], cast=float)
+    apply_env_argument(application, legion.config.PREDICTION_CACHE_ENABLED[0], legion.utils.string_to_bool)
+    apply_env_argument(application, legion.config.PREDICTION_CACHE_MAX_ENTRIES[0], cast=int)
+    apply_env_argument(application, legion.config.PREDICTION_CACHE_TTL[0], cast=float)
+    apply_env_argument(application, legion.config.PREDICTION_CACHE_MAX_MEMORY[0], cast=int)
+    apply_env_argument(application, legion.config.PREDICTION_CACHE_SHARED_FILE[0])
+    apply_env_argument(application, legion.config.PREDICTION_CACHE_SLOT_SIZE[0], cast=int)
+    apply_env_argument(application, legion.config.REQUEST_LOG_SAMPLE_RATE[0], cast=float)
+    apply_env_argument(application, legion.config.REQUEST_LOG_MAX_PAYLOAD_SIZE[0], cast=int)
+    apply_env_argument(application, legion.config.REQUEST_LOG_QUEUE_SIZE[0], cast=int)
+    apply_env_argument(application, legion.config.SERVING_METRICS_ENABLED[0], legion.utils.string_to_bool)
+    apply_env_argument(application, legion.config.PROFILING_ENABLED[0], legion.utils.string_to_bool)
+    apply_env_argument(application, legion.config.PROFILING_SAMPLE_EVERY[0], cast=int)
+    apply_env_argument(application, legion.config.PROFILING_WINDOW[0], cast=float)
+    apply_env_argument(application, legion.config.PROFILING_MAX_STACKS[0], cast=int)
+
     apply_env_argument(application, legion.config.DEPLOYMENT[0])
     apply_env_argument(application, legion.config.NAMESPACE[0])
 
@@ -241,6 +312,12 @@ def apply_env_args(application):
     apply_env_argument(application, legion.config.CLUSTER_CONFIG_PATH[0])
     apply_env_argument(application, legion.config.CLUSTER_SECRETS_PATH[0])
 
+    apply_env_argument(application, legion.config.INSPECT_PROBE_THREADS[0], cast=int)
+    apply_env_argument(application, legion.config.INSPECT_PROBE_TIMEOUT[0], cast=float)
+    apply_env_argument(application, legion.config.MODEL_STARTUP_TIMEOUT[0], cast=int)
+    apply_env_argument(application, legion.config.DEPLOYMENT_INDEX_ENABLED[0], legion.utils.string_to_bool)
+    apply_env_argument(application, legion.config.DEPLOYMENT_INDEX_RESYNC_PERIOD[0], cast=float)
+
 
 def configure_application(application, args):
     """
@@ -19,8 +19,12 @@ legion model export / load
 
 import datetime
 import getpass
+import io
 import json
+import mmap
 import os
+import pickle
+import struct
 import sys
 import tempfile
 import zipfile
@@ -35,8 +39,15 @@ from legion.model.model_id import get_model_id, is_model_id_auto_deduced
 from legion.model.types import ColumnInformation
 from legion.model.types import deduct_types_on_pandas_df
 from legion.utils import TemporaryFolder, send_header_to_stderr, save_file, get_git_revision, string_to_bool
+from legion.utils import is_local_resource, open_external_file
+import numpy
 from pandas import DataFrame
 
+# Size of zip64 extra field added by zipfile to local headers of members larger than zipfile.ZIP64_LIMIT
+ZIP64_LOCAL_EXTRA_SIZE = 20
+# Header ID of padding extra field (same as used by Android zipalign)
+ZIP_ALIGNMENT_EXTRA_ID = 0xD935
+
 
 def _get_column_types(param_types):
     """
@@ -64,6 +75,128 @@ def _get_column_types(param_types):
     return deduct_types_on_pandas_df(data_frame=pandas_df_sample, extra_columns=custom_props)
 
 
+def _get_member_data_offset(file, info):
+    """
+    Get offset of archive member data (after local file header)
+
+    :param file: archive file with seek and read methods
+    :type file: file-like object
+    :param info: archive member information
+    :type info: :py:class:`zipfile.ZipInfo`
+    :return: int -- offset of data in archive
+    """
+    file.seek(info.header_offset)
+    header = file.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader:
+        raise zipfile.BadZipFile('Truncated local file header of %s' % info.filename)
+
+    signature, *_, filename_length, extra_field_length = struct.unpack(zipfile.structFileHeader, header)
+    if signature != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile('Bad magic number for local file header of %s' % info.filename)
+
+    return info.header_offset + zipfile.sizeFileHeader + filename_length + extra_field_length
+
+
+def _build_alignment_extra(offset, filename, size, alignment):
+    """
+    Build padding extra field that aligns data of archive member written at offset
+
+    :param offset: offset of member local file header in archive
+    :type offset: int
+    :param filename: name of member
+    :type filename: str
+    :param size: size of member data
+    :type size: int
+    :param alignment: required alignment of member data
+    :type alignment: int
+    :return: bytes -- extra field
+    """
+    header_size = zipfile.sizeFileHeader + len(filename.encode('utf-8')) + struct.calcsize('<HH')
+    if size * 1.05 > zipfile.ZIP64_LIMIT:
+        header_size += ZIP64_LOCAL_EXTRA_SIZE
+
+    padding = -(offset + header_size) % alignment
+    return struct.pack('<HH', ZIP_ALIGNMENT_EXTRA_ID, padding) + b'\0' * padding
+
+
+class _ModelPickler(dill.Pickler):
+    """
+    Model pickler that moves data of large NumPy arrays out of pickle stream (to list of arrays)
+    """
+
+    def __init__(self, file, min_buffer_size, *args, **kwargs):
+        """
+        Build pickler
+
+        :param file: target file
+        :type file: file-like object
+        :param min_buffer_size: min size in bytes of array that is stored out of pickle stream
+        :type min_buffer_size: int
+        """
+        super().__init__(file, *args, **kwargs)
+        self._min_buffer_size = min_buffer_size
+        self._buffer_indexes = {}
+        self.buffers = []
+
+    def persistent_id(self, obj):
+        """
+        Get reference to out of band buffer for large contiguous arrays of plain data
+
+        :param obj: object that is being pickled
+        :type obj: any
+        :return: tuple(int, :py:class:`numpy.dtype`, tuple, str) or None -- buffer reference
+        """
+        if type(obj) is not numpy.ndarray or obj.nbytes < self._min_buffer_size or obj.dtype.hasobject:
+            return None
+
+        if obj.flags.c_contiguous:
+            order = 'C'
+        elif obj.flags.f_contiguous:
+            order = 'F'
+        else:
+            return None
+
+        index = self._buffer_indexes.get(id(obj))
+        if index is None:
+            index = len(self.buffers)
+            self._buffer_indexes[id(obj)] = index
+            self.buffers.append(obj)
+
+        return index, obj.dtype, obj.shape, order
+
+
+class _ModelUnpickler(dill.Unpickler):
+    """
+    Model unpickler that builds NumPy arrays on out of band buffers (without copying)
+    """
+
+    def __init__(self, file, buffers, *args, **kwargs):
+        """
+        Build unpickler
+
+        :param file: source file
+        :type file: file-like object
+        :param buffers: data of out of band buffers (writable)
+        :type buffers: list[bytearray or memoryview]
+        """
+        super().__init__(file, *args, **kwargs)
+        self._buffers = buffers
+
+    def persistent_load(self, pid):
+        """
+        Build array on out of band buffer
+
+        :param pid: buffer reference
+        :type pid: tuple(int, :py:class:`numpy.dtype`, tuple, str)
+        :return: :py:class:`numpy.ndarray` -- array
+        """
+        index, dtype, shape, order = pid
+        if index >= len(self._buffers):
+            raise pickle.UnpicklingError('Model refers to missing buffer #%d' % index)
+
+        return numpy.frombuffer(self._buffers[index], dtype=dtype).reshape(shape, order=order)
+
+
 class ModelContainer:
     """
     Archive representation of model with meta information (properties, str => str)
@@ -72,12 +205,18 @@ class ModelContainer:
     ZIP_COMPRESSION = zipfile.ZIP_STORED
     ZIP_FILE_MODEL = 'model'
     ZIP_FILE_INFO = 'info.json'
+    ZIP_BUFFERS_PREFIX = 'buffers/'
+
+    # Revision 2: large arrays are stored in separate aligned members ZIP_BUFFERS_PREFIX + index
+    CONTAINER_FORMAT = 2
+    BUFFER_MIN_SIZE = 64 * 1024
+    BUFFER_ALIGNMENT = 64
 
     def __init__(self, file, is_write=False, do_not_load_model=False):
         """
         Create model container (archive) from existing (when is_write=False) or from empty (when is_write=True)
 
-        :param file: path to file for load or save in future
+        :param file: path to file for load or save in future (or to external resource for meta information loading)
         :type file: str
         :param is_write: flag for create empty container (not read)
         :type is_write: bool
@@ -95,31 +234,127 @@ class ModelContainer:
 
     def _load(self):
         """
-        Load from file
+        Load from file (without extraction of archive members to disk).
+        Meta information of file on external resource is loaded using HTTP range requests
 
         :return: None
         """
-        if not os.path.exists(self._file):
+        if not is_local_resource(self._file):
+            if not self._do_not_load_model:
+                raise Exception('Only meta information can be loaded from external resource: %s' % (self._file,))
+        elif not os.path.exists(self._file):
             raise Exception('File not existed: %s' % (self._file,))
 
         try:
-            with TemporaryFolder('legion-model-save') as temp_directory:
-                with zipfile.ZipFile(self._file, 'r') as stream:
-                    model_path = stream.extract(self.ZIP_FILE_MODEL,
-                                                os.path.join(temp_directory.path, self.ZIP_FILE_MODEL))
-                    info_path = stream.extract(self.ZIP_FILE_INFO,
-                                               os.path.join(temp_directory.path, self.ZIP_FILE_INFO))
+            with open_external_file(self._file) as file, zipfile.ZipFile(file, 'r') as stream:
+                with stream.open(self.ZIP_FILE_INFO) as info_file:
+                    self._load_info(io.TextIOWrapper(info_file, encoding='utf-8'))
 
                 if not self._do_not_load_model:
-                    with open(model_path, 'rb') as file:
-                        self._model = dill.load(file)
-
-                with open(info_path, 'r') as file:
-                    self._load_info(file)
+                    self._check_format()
+                    self._model = self._load_model(file, stream)
         except zipfile.BadZipFile:
+            if not is_local_resource(self._file):
+                raise Exception('Model files is not a zip file: %s' % (self._file,))
             raise Exception('Model files is not a zip file: %s (size: %dKb)' %
                             (self._file, os.path.getsize(self._file) / 1024))
 
+    def _check_format(self):
+        """
+        Check that format revision of loaded container is supported
+
+        :return: None
+        """
+        container_format = self._properties.get('legion.container_format', '1')
+        try:
+            container_format = int(container_format)
+        except (TypeError, ValueError):
+            raise Exception('Invalid container format %r of model file %s' % (container_format, self._file))
+
+        if container_format > self.CONTAINER_FORMAT:
+            raise Exception('Model file %s has container format %d (saved by legion %s), this legion %s supports '
+                            'formats up to %d. Please upgrade legion' %
+                            (self._file, container_format, self._properties.get('legion.version', 'unknown'),
+                             legion.__version__, self.CONTAINER_FORMAT))
+
+    def _load_model(self, file, stream):
+        """
+        Unpickle model directly from archive. Stored (uncompressed) members are read from memory-mapped archive,
+        arrays stored in separate members stay backed by mapped pages: pages are shared between processes
+        until array is changed (copy-on-write mapping, arrays are writable)
+
+        :param file: opened archive file
+        :type file: file-like object
+        :param stream: opened archive
+        :type stream: :py:class:`zipfile.ZipFile`
+        :return: :py:class:`legion.model.IMLModel` -- instance of model
+        """
+        info = stream.getinfo(self.ZIP_FILE_MODEL)
+        memory = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        buffers = []
+
+        try:
+            buffer_names = [name for name in stream.namelist() if name.startswith(self.ZIP_BUFFERS_PREFIX)]
+            buffer_names.sort(key=lambda name: int(name[len(self.ZIP_BUFFERS_PREFIX):]))
+            buffers = [self._get_member_data(stream, memory, name) for name in buffer_names]
+
+            if info.compress_type != zipfile.ZIP_STORED or info.file_size == 0:
+                with stream.open(info) as model_file:
+                    model = _ModelUnpickler(model_file, buffers).load()
+            else:
+                memory.seek(_get_member_data_offset(memory, info))
+                model = _ModelUnpickler(memory, buffers).load()
+        except BaseException:
+            # Arrays built before failure are released with unpickler, so views of memory can be released
+            self._close_memory(memory, buffers)
+            raise
+
+        # Memory with buffers is released with the last array using it
+        if not buffers:
+            memory.close()
+
+        return model
+
+    @staticmethod
+    def _close_memory(memory, buffers):
+        """
+        Release views of memory-mapped archive and close it (with its file descriptor)
+
+        :param memory: memory-mapped archive
+        :type memory: :py:class:`mmap.mmap`
+        :param buffers: data of out of band buffers
+        :type buffers: list[bytearray or memoryview]
+        :return: None
+        """
+        try:
+            for buffer in buffers:
+                if isinstance(buffer, memoryview):
+                    buffer.release()
+            memory.close()
+        except BufferError:
+            # Memory is still used by arrays, it is released with the last of them
+            pass
+
+    @staticmethod
+    def _get_member_data(stream, memory, name):
+        """
+        Get data of archive member. Data of stored (uncompressed) member is returned without copying
+
+        :param stream: opened archive
+        :type stream: :py:class:`zipfile.ZipFile`
+        :param memory: memory-mapped archive
+        :type memory: :py:class:`mmap.mmap`
+        :param name: name of member
+        :type name: str
+        :return: bytearray or memoryview -- writable member data
+        """
+        info = stream.getinfo(name)
+        if info.compress_type != zipfile.ZIP_STORED:
+            return bytearray(stream.read(info))
+
+        offset = _get_member_data_offset(memory, info)
+        return memoryview(memory)[offset:offset + info.file_size]
+
     def _load_info(self, file):
         """
         Read properties from file-like object (using .read)
@@ -153,6 +388,7 @@ class ModelContainer:
         self['model.id'] = model_id
         self['model.version'] = self._model.version
         self['legion.version'] = legion.__version__
+        self['legion.container_format'] = str(self.CONTAINER_FORMAT)
 
         self['jenkins.build_number'] = os.environ.get(*legion.config.BUILD_NUMBER)
         self['jenkins.build_id'] = os.environ.get(*legion.config.BUILD_ID)
@@ -190,7 +426,8 @@ class ModelContainer:
 
         with TemporaryFolder('legion-model-save') as temp_directory:
             with open(os.path.join(temp_directory.path, self.ZIP_FILE_MODEL), 'wb') as file:
-                dill.dump(model_instance, file, recurse=True)
+                pickler = _ModelPickler(file, self.BUFFER_MIN_SIZE, recurse=True)
+                pickler.dump(model_instance)
             with open(os.path.join(temp_directory.path, self.ZIP_FILE_INFO), 'wt') as file:
                 self._write_info(file)
 
@@ -198,6 +435,30 @@ class ModelContainer:
                 stream.write(os.path.join(temp_directory.path, self.ZIP_FILE_MODEL), self.ZIP_FILE_MODEL)
                 stream.write(os.path.join(temp_directory.path, self.ZIP_FILE_INFO), self.ZIP_FILE_INFO)
 
+                for index, array in enumerate(pickler.buffers):
+                    self._write_buffer(stream, self.ZIP_BUFFERS_PREFIX + str(index), array)
+
+    def _write_buffer(self, stream, name, array):
+        """
+        Write array data to separate stored member aligned to BUFFER_ALIGNMENT
+
+        :param stream: archive opened for writing
+        :type stream: :py:class:`zipfile.ZipFile`
+        :param name: name of member
+        :type name: str
+        :param array: C or Fortran contiguous array
+        :type array: :py:class:`numpy.ndarray`
+        :return: None
+        """
+        data = memoryview(array.reshape(-1, order='A').view(numpy.uint8))
+
+        info = zipfile.ZipInfo(name, date_time=datetime.datetime.now().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        info.external_attr = 0o644 << 16
+        info.extra = _build_alignment_extra(stream.fp.tell(), name, len(data), self.BUFFER_ALIGNMENT)
+
+        stream.writestr(info, data)
+
     def __enter__(self):
         """
         Return self on context enter
@@ -391,7 +652,7 @@ def deduce_model_file_name(version=None):
 def export(filename=None,
            apply_func=None, prepare_func=None,
            param_types=None, input_data_frame=None,
-           version=None, use_df=True):
+           version=None, use_df=True, deterministic=False, vectorized=False):
     """
     Export simple Pandas based model as a bundle
 
@@ -409,6 +670,10 @@ def export(filename=None,
     :type use_df: bool
     :param version: of version
     :type version: str
+    :param deterministic: model returns same result for same input, allows caching of results in serving
+    :type deterministic: bool
+    :param vectorized: apply function returns one result per input row, allows micro batching in serving
+    :type vectorized: bool
     :return: :py:class:`legion.model.ScipyModel` -- model instance
     """
     if prepare_func is None:
@@ -449,7 +714,9 @@ def export(filename=None,
                        column_types=column_types,
                        prepare_func=prepare_func,
                        version=version,
-                       use_df=use_df)
+                       use_df=use_df,
+                       deterministic=deterministic,
+                       vectorized=vectorized)
 
     temp_file = tempfile.mktemp('model-temp')
     with ModelContainer(temp_file, is_write=True) as container:
@@ -16,8 +16,14 @@
 """
 Model metrics
 """
+import atexit
+import collections
+import contextlib
+import logging
 import os
+import random
 import socket
+import threading
 import time
 from enum import Enum
 
@@ -25,6 +31,24 @@ import legion.config
 from legion.model.model_id import get_model_id, init
 from legion.utils import normalize_name
 
+LOGGER = logging.getLogger(__name__)
+
+# Modes of metrics sending: direct (new TCP connection for each value), buffered Graphite client, StatsD client
+MODE_DIRECT = 'direct'
+MODE_GRAPHITE = 'graphite'
+MODE_STATSD = 'statsd'
+VALID_MODES = MODE_DIRECT, MODE_GRAPHITE, MODE_STATSD
+
+# Max size of StatsD UDP packet (fits to Ethernet MTU without fragmentation)
+STATSD_MAX_PACKET_SIZE = 1432
+
+# Percentiles of histograms and timers sent on aggregation flush
+PERCENTILES = 50, 90, 99
+
+_clients = {}
+_clients_lock = threading.Lock()
+_aggregator = None
+
 
 class Metric(Enum):
     """
@@ -105,12 +129,11 @@ def send_udp(host, port, message):
     :type message: str or bytes
     :return: None
     """
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
     if isinstance(message, str):
         message = message.encode('utf-8')
 
-    sock.sendto(message, (host, port))
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto(message, (host, port))
 
 
 def send_tcp(host, port, message):
@@ -125,19 +148,772 @@ def send_tcp(host, port, message):
     :type message: str or bytes
     :return: None
     """
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.connect((host, port))
-
     if isinstance(message, str):
         message = message.encode('utf-8')
 
-    sock.send(message)
-    sock.close()
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall(message)
+
+
+class BufferedMetricsClient:
+    """
+    Base class of metrics clients that buffer values and send them in batches
+    from background thread every flush_interval seconds (and on flush call)
+    """
+
+    def __init__(self, host, port, flush_interval=1.0):
+        """
+        Build client
+
+        :param host: target host
+        :type host: str or None
+        :param port: target port
+        :type port: int or None
+        :param flush_interval: interval of sending in seconds
+        :type flush_interval: float
+        """
+        self.host = host
+        self.port = port
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._socket = None
+        self._pid = os.getpid()
+        self.sent = 0
+        self.dropped = 0
+
+    def _check_process(self):
+        """
+        Reset thread and connection inherited from parent process (after fork)
+
+        :return: None
+        """
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            self._send_lock = threading.Lock()
+            self._thread = None
+            self._close_socket()
+
+    def _start(self):
+        """
+        Start sending thread if it is not alive
+
+        :return: None
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='metrics-sender', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """
+        Flush buffer every flush interval (or on wake up) until stop
+
+        :return: None
+        """
+        while not self._stopped.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _close_socket(self):
+        """
+        Close connection (it will be opened on next sending)
+
+        :return: None
+        """
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+    def _drain(self):
+        """
+        Take buffered values (lock is acquired)
+
+        :return: payload for _write or None if buffer is empty
+        """
+        raise NotImplementedError()
+
+    def _restore(self, payload):
+        """
+        Return payload that has not been sent to buffer (lock is acquired)
+
+        :param payload: payload from _drain
+        :return: None
+        """
+        pass
+
+    def _write(self, payload):
+        """
+        Send payload to server
+
+        :param payload: payload from _drain
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def flush(self):
+        """
+        Send all buffered values now (in current thread)
+
+        :return: bool -- are values sent
+        """
+        self._check_process()
+        with self._send_lock:
+            with self._lock:
+                payload = self._drain()
+            if payload is None:
+                return True
+
+            try:
+                self._write(payload)
+                return True
+            except OSError as send_exception:
+                LOGGER.warning('Cannot send metrics to %s:%s: %s', self.host, self.port, send_exception)
+                with self._lock:
+                    self._restore(payload)
+                return False
+
+    def close(self):
+        """
+        Stop sending thread, send buffered values and close connection
+
+        :return: None
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(self._flush_interval + 1)
+        self.flush()
+        self._close_socket()
+
+
+class GraphiteClient(BufferedMetricsClient):
+    """
+    Graphite plaintext protocol client with buffer and persistent TCP connection (reconnects on errors).
+    Values are kept in buffer while server is unavailable (oldest values are dropped on buffer overflow)
+    """
+
+    def __init__(self, host, port, flush_interval=1.0, max_buffer_size=10000, timeout=5.0):
+        """
+        Build client
+
+        :param host: Graphite host
+        :type host: str
+        :param port: Graphite plaintext protocol port
+        :type port: int
+        :param flush_interval: interval of sending in seconds
+        :type flush_interval: float
+        :param max_buffer_size: max count of buffered values
+        :type max_buffer_size: int
+        :param timeout: timeout of connection and sending in seconds
+        :type timeout: float
+        """
+        super(GraphiteClient, self).__init__(host, port, flush_interval)
+        self._timeout = timeout
+        self._max_buffer_size = max_buffer_size
+        self._buffer = collections.deque()
+
+    def send(self, name, value, timestamp=None):
+        """
+        Buffer value
+
+        :param name: full metric name
+        :type name: str
+        :param value: value
+        :type value: float or int
+        :param timestamp: UNIX timestamp (default: now)
+        :type timestamp: int or None
+        :return: None
+        """
+        self._check_process()
+        line = '%s %s %d\n' % (name, _format_value(value), int(time.time() if timestamp is None else timestamp))
+        with self._lock:
+            if len(self._buffer) >= self._max_buffer_size:
+                self._buffer.popleft()
+                self.dropped += 1
+            self._buffer.append(line)
+            buffer_size = len(self._buffer)
+
+        self._start()
+        if buffer_size >= self._max_buffer_size // 2:
+            self._wakeup.set()
+
+    def _drain(self):
+        """
+        Take buffered lines (lock is acquired)
+
+        :return: list[str] or None -- lines
+        """
+        if not self._buffer:
+            return None
+
+        lines = list(self._buffer)
+        self._buffer.clear()
+        return lines
+
+    def _restore(self, payload):
+        """
+        Return lines that have not been sent to buffer head (lock is acquired)
+
+        :param payload: lines
+        :type payload: list[str]
+        :return: None
+        """
+        lines = payload + list(self._buffer)
+        overflow = max(0, len(lines) - self._max_buffer_size)
+        self.dropped += overflow
+        self._buffer = collections.deque(lines[overflow:])
+
+    def _write(self, payload):
+        """
+        Send lines through persistent connection (with one reconnect on error)
+
+        :param payload: lines
+        :type payload: list[str]
+        :return: None
+        """
+        data = ''.join(payload).encode('utf-8')
+        for attempt in range(2):
+            try:
+                if self._socket is None:
+                    self._socket = socket.create_connection((self.host, self.port), self._timeout)
+                self._socket.sendall(data)
+                self.sent += len(payload)
+                return
+            except OSError:
+                self._close_socket()
+                if attempt:
+                    raise
+
+
+def _format_value(value):
+    """
+    Format metric value for Graphite and StatsD without loss of precision
+
+    :param value: value
+    :type value: float or int
+    :return: str -- formatted value
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    return repr(float(value))
+
+
+class StatsdClient(BufferedMetricsClient):
+    """
+    StatsD client that aggregates values in flush interval (last value of gauge, sum of counter)
+    and sends them in UDP packets not bigger than max_packet_size
+    """
+
+    def __init__(self, host, port, flush_interval=1.0, max_packet_size=STATSD_MAX_PACKET_SIZE):
+        """
+        Build client
+
+        :param host: StatsD host
+        :type host: str
+        :param port: StatsD port
+        :type port: int
+        :param flush_interval: interval of sending in seconds
+        :type flush_interval: float
+        :param max_packet_size: max size of UDP packet in bytes
+        :type max_packet_size: int
+        """
+        super(StatsdClient, self).__init__(host, port, flush_interval)
+        self._max_packet_size = max_packet_size
+        self._gauges = {}
+        self._counters = {}
+        self._timers = []
+
+    def gauge(self, name, value):
+        """
+        Set gauge value (last value in flush interval is sent)
+
+        :param name: full metric name
+        :type name: str
+        :param value: value
+        :type value: float or int
+        :return: None
+        """
+        self._check_process()
+        with self._lock:
+            self._gauges[name] = value
+        self._start()
+
+    def increment(self, name, value=1):
+        """
+        Increment counter (sum of increments in flush interval is sent)
+
+        :param name: full metric name
+        :type name: str
+        :param value: increment
+        :type value: float or int
+        :return: None
+        """
+        self._check_process()
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        self._start()
+
+    def timing(self, name, milliseconds):
+        """
+        Add timer value (all values are sent)
+
+        :param name: full metric name
+        :type name: str
+        :param milliseconds: duration in milliseconds
+        :type milliseconds: float
+        :return: None
+        """
+        self._check_process()
+        with self._lock:
+            self._timers.append((name, milliseconds))
+        self._start()
+
+    def send(self, name, value, timestamp=None):
+        """
+        Send value as gauge (StatsD does not support timestamps)
+
+        :param name: full metric name
+        :type name: str
+        :param value: value
+        :type value: float or int
+        :param timestamp: ignored
+        :type timestamp: int or None
+        :return: None
+        """
+        self.gauge(name, value)
+
+    def _drain(self):
+        """
+        Take aggregated values as StatsD lines (lock is acquired).
+        Signed gauge value is a delta in StatsD, so negative gauge is sent as reset to 0 and delta
+        (in one line of payload to be sent in one packet)
+
+        :return: list[str] or None -- lines
+        """
+        lines = []
+        for name, value in self._gauges.items():
+            value = _format_value(value)
+            if value.startswith('-'):
+                lines.append('%s:0|g\n%s:%s|g' % (name, name, value))
+            else:
+                lines.append('%s:%s|g' % (name, value))
+        lines.extend('%s:%s|c' % (name, _format_value(value)) for name, value in self._counters.items())
+        lines.extend('%s:%s|ms' % (name, _format_value(value)) for name, value in self._timers)
+        self._gauges = {}
+        self._counters = {}
+        self._timers = []
+        return lines or None
+
+    def _write(self, payload):
+        """
+        Send lines in UDP packets (values of failed packets are dropped)
+
+        :param payload: lines
+        :type payload: list[str]
+        :return: None
+        """
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        packets = []
+        packet = b''
+        for line in payload:
+            line = line.encode('utf-8')
+            if packet and len(packet) + 1 + len(line) > self._max_packet_size:
+                packets.append(packet)
+                packet = b''
+            packet = packet + b'\n' + line if packet else line
+        packets.append(packet)
+
+        for packet in packets:
+            self._socket.sendto(packet, (self.host, self.port))
+        self.sent += len(payload)
+
+
+def get_metrics_mode():
+    """
+    Get mode of metrics sending from ENV
+
+    :return: str -- one of VALID_MODES
+    """
+    mode = os.getenv(*legion.config.METRICS_MODE)
+    if mode not in VALID_MODES:
+        raise Exception('Unknown metrics mode %s. Should be one of %s' % (mode, ', '.join(VALID_MODES)))
+    return mode
+
+
+def get_metrics_client(mode=None):
+    """
+    Get process-wide metrics client (built on first call, values are flushed on interpreter exit)
+
+    :param mode: MODE_GRAPHITE or MODE_STATSD (default: from ENV)
+    :type mode: str or None
+    :return: :py:class:`legion.metrics.GraphiteClient` or :py:class:`legion.metrics.StatsdClient`
+    """
+    if mode is None:
+        mode = get_metrics_mode()
+
+    with _clients_lock:
+        client = _clients.get(mode)
+        if client is None:
+            flush_interval = float(os.getenv(*legion.config.METRICS_FLUSH_INTERVAL))
+            if mode == MODE_GRAPHITE:
+                host, port, _ = get_metric_endpoint()
+                client = GraphiteClient(host, port, flush_interval,
+                                        int(os.getenv(*legion.config.METRICS_BUFFER_SIZE)))
+            elif mode == MODE_STATSD:
+                client = StatsdClient(os.getenv(*legion.config.STATSD_HOST),
+                                      int(os.getenv(*legion.config.STATSD_PORT)), flush_interval)
+            else:
+                raise Exception('Metrics mode %s has no client' % mode)
+
+            atexit.register(client.close)
+            _clients[mode] = client
+
+        return client
+
+
+def _nearest_rank(ordered, percent):
+    """
+    Get percentile of sorted values by nearest rank
+
+    :param ordered: sorted values (not empty)
+    :type ordered: list[float]
+    :param percent: percent from 0 to 100
+    :type percent: float
+    :return: float -- percentile
+    """
+    return ordered[min(len(ordered) - 1, max(0, int(round(percent / 100.0 * len(ordered))) - 1))]
+
+
+class Distribution:
+    """
+    Distribution of values in aggregation interval: exact count, sum, min and max,
+    percentiles are estimated from uniform reservoir sample of bounded size
+    """
+
+    __slots__ = ('count', 'total', 'min', 'max', '_reservoir', '_reservoir_size')
+
+    def __init__(self, reservoir_size=1024):
+        """
+        Build distribution
+
+        :param reservoir_size: max count of values kept for percentiles
+        :type reservoir_size: int
+        """
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._reservoir = []
+        self._reservoir_size = reservoir_size
+
+    def add(self, value):
+        """
+        Add value
+
+        :param value: value
+        :type value: float
+        :return: None
+        """
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if len(self._reservoir) < self._reservoir_size:
+            self._reservoir.append(value)
+        else:
+            index = random.randrange(self.count)
+            if index < self._reservoir_size:
+                self._reservoir[index] = value
+
+    def percentile(self, percent):
+        """
+        Get percentile of values (nearest rank in reservoir sample)
+
+        :param percent: percent from 0 to 100
+        :type percent: float
+        :return: float or None -- percentile or None if there are no values
+        """
+        if not self._reservoir:
+            return None
+
+        return _nearest_rank(sorted(self._reservoir), percent)
+
+    def summary(self, percentiles=PERCENTILES):
+        """
+        Get summary values
+
+        :param percentiles: percentiles to calculate
+        :type percentiles: tuple[int]
+        :return: list[tuple[str, float]] -- suffix and value (count, mean, min, max and percentiles)
+        """
+        values = [('count', self.count)]
+        if self.count:
+            values.extend((('mean', self.total / self.count), ('min', self.min), ('max', self.max)))
+            ordered = sorted(self._reservoir)
+            values.extend(('p%d' % percent, _nearest_rank(ordered, percent)) for percent in percentiles)
+        return values
+
+
+class MetricsAggregator(BufferedMetricsClient):
+    """
+    Client-side rollup of high-frequency values (timers, histograms and counters).
+    Values are aggregated in memory and summaries are passed to sink every flush_interval seconds:
+    for timers and histograms - count, mean, min, max and percentiles, for counters - count and rate per second
+    """
+
+    def __init__(self, sink, name_builder=None, flush_interval=10.0, reservoir_size=1024, percentiles=PERCENTILES):
+        """
+        Build aggregator
+
+        :param sink: function that sends summaries: sink(list of (name, value), timestamp)
+        :type sink: Callable[[list[tuple[str, float]], int], None]
+        :param name_builder: function that builds full name of metric (default: str)
+        :type name_builder: Callable[[:py:class:`legion.metrics.Metric` or str], str] or None
+        :param flush_interval: aggregation interval in seconds
+        :type flush_interval: float
+        :param reservoir_size: max count of values kept for percentiles of each metric in interval
+        :type reservoir_size: int
+        :param percentiles: percentiles to send
+        :type percentiles: tuple[int]
+        """
+        super(MetricsAggregator, self).__init__(None, None, flush_interval)
+        self._sink = sink
+        self._name_builder = name_builder or str
+        self._reservoir_size = reservoir_size
+        self._percentiles = tuple(percentiles)
+        self._names = {}
+        self._distributions = {}
+        self._counters = {}
+        self._interval_started = time.time()
+
+    def _get_name(self, metric):
+        """
+        Get full name of metric (names are built once)
+
+        :param metric: metric type or metric name
+        :type metric: :py:class:`legion.metrics.Metric` or str
+        :return: str -- full name
+        """
+        name = self._names.get(metric)
+        if name is None:
+            name = self._names[metric] = self._name_builder(metric)
+        return name
+
+    def observe(self, metric, value):
+        """
+        Add value to histogram of metric
+
+        :param metric: metric type or metric name
+        :type metric: :py:class:`legion.metrics.Metric` or str
+        :param value: value
+        :type value: float or int
+        :return: None
+        """
+        name = self._get_name(metric)
+        self._check_process()
+        with self._lock:
+            distribution = self._distributions.get(name)
+            if distribution is None:
+                distribution = self._distributions[name] = Distribution(self._reservoir_size)
+            distribution.add(value)
+        self._start()
+
+    def increment(self, metric, value=1):
+        """
+        Increment counter of metric (count and rate per second are sent)
+
+        :param metric: metric type or metric name
+        :type metric: :py:class:`legion.metrics.Metric` or str
+        :param value: increment
+        :type value: float or int
+        :return: None
+        """
+        name = self._get_name(metric)
+        self._check_process()
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        self._start()
+
+    @contextlib.contextmanager
+    def timer(self, metric):
+        """
+        Measure duration of block (or decorated function) in milliseconds and add it to histogram of metric
+
+        :param metric: metric type or metric name
+        :type metric: :py:class:`legion.metrics.Metric` or str
+        :return: None
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(metric, (time.perf_counter() - started) * 1000)
+
+    def _drain(self):
+        """
+        Build summaries of interval and start new interval (lock is acquired)
+
+        :return: tuple[list[tuple[str, float]], int] or None -- summaries and timestamp
+        """
+        now = time.time()
+        elapsed = max(now - self._interval_started, 1e-9)
+        self._interval_started = now
+        if not self._distributions and not self._counters:
+            return None
+
+        values = []
+        for name, distribution in self._distributions.items():
+            values.extend(('%s.%s' % (name, suffix), value)
+                          for suffix, value in distribution.summary(self._percentiles))
+        for name, count in self._counters.items():
+            values.append(('%s.count' % name, count))
+            values.append(('%s.rate' % name, count / elapsed))
+
+        self._distributions = {}
+        self._counters = {}
+        return values, int(now)
+
+    def _write(self, payload):
+        """
+        Pass summaries to sink
+
+        :param payload: summaries and timestamp
+        :type payload: tuple[list[tuple[str, float]], int]
+        :return: None
+        """
+        values, timestamp = payload
+        self._sink(values, timestamp)
+        self.sent += len(values)
+
+
+def _build_aggregator_sink(mode):
+    """
+    Build sink of aggregated values for mode of metrics sending
+
+    :param mode: one of VALID_MODES
+    :type mode: str
+    :return: Callable[[list[tuple[str, float]], int], None] -- sink
+    """
+    if mode == MODE_DIRECT:
+        host, port, _ = get_metric_endpoint()
+
+        def sink(values, timestamp):
+            send_tcp(host, port, ''.join('%s %s %d\n' % (name, _format_value(value), timestamp)
+                                         for name, value in values))
+    else:
+        client = get_metrics_client(mode)
+
+        def sink(values, timestamp):
+            for name, value in values:
+                client.send(name, value, timestamp)
+
+    return sink
+
+
+def get_aggregator():
+    """
+    Get process-wide metrics aggregator (built on first call, values are flushed on interpreter exit)
+
+    :return: :py:class:`legion.metrics.MetricsAggregator`
+    """
+    global _aggregator
+
+    if _aggregator is not None:
+        return _aggregator
+
+    mode = get_metrics_mode()
+    # Sink client is built first: exit handlers are called in reverse order, so aggregator is flushed before it
+    sink = _build_aggregator_sink(mode)
+    namespace = os.getenv(*legion.config.STATSD_NAMESPACE) if mode == MODE_STATSD else get_metric_endpoint()[2]
+
+    with _clients_lock:
+        if _aggregator is None:
+            aggregator = MetricsAggregator(sink, lambda metric: '%s.%s' % (namespace, get_metric_name(metric)),
+                                           float(os.getenv(*legion.config.METRICS_AGGREGATION_INTERVAL)),
+                                           int(os.getenv(*legion.config.METRICS_RESERVOIR_SIZE)))
+            atexit.register(aggregator.close)
+            _aggregator = aggregator
+
+    return _aggregator
+
+
+def timer(metric):
+    """
+    Measure duration of block in milliseconds. Count, mean, min, max and percentiles of durations
+    are sent every aggregation interval. Can be used as decorator too:
+
+        with legion.metrics.timer('epoch'):
+            model.fit(x, y)
+
+    :param metric: metric type or metric name
+    :type metric: :py:class:`legion.metrics.Metric` or str
+    :return: context manager
+    """
+    return get_aggregator().timer(metric)
+
+
+def observe(metric, value):
+    """
+    Add value to histogram of metric. Count, mean, min, max and percentiles of values
+    are sent every aggregation interval
+
+    :param metric: metric type or metric name
+    :type metric: :py:class:`legion.metrics.Metric` or str
+    :param value: value
+    :type value: float or int
+    :return: None
+    """
+    get_aggregator().observe(metric, value)
+
+
+def increment(metric, value=1):
+    """
+    Increment counter of metric. Count and rate per second are sent every aggregation interval
+
+    :param metric: metric type or metric name
+    :type metric: :py:class:`legion.metrics.Metric` or str
+    :param value: increment
+    :type value: float or int
+    :return: None
+    """
+    get_aggregator().increment(metric, value)
+
+
+def flush_metrics():
+    """
+    Send all aggregated and buffered metric values now
+
+    :return: bool -- are all values sent
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+        aggregator = _aggregator
+
+    aggregated = aggregator.flush() if aggregator is not None else True
+    return all([client.flush() for client in clients]) and aggregated
 
 
 def send_metric(metric, value):
     """
-    Send metric value
+    Send metric value. Value is buffered and sent in background by metrics client
+    (in direct mode it is sent immediately through new TCP connection)
 
     :param metric: metric type or metric name
     :type metric: :py:class:`legion.metrics.Metric` or str
@@ -145,13 +921,21 @@ def send_metric(metric, value):
     :type value: float or int
     :return: None
     """
+    mode = get_metrics_mode()
     host, port, namespace = get_metric_endpoint()
+    if mode == MODE_STATSD:
+        namespace = os.getenv(*legion.config.STATSD_NAMESPACE)
 
     metric_name = '%s.%s' % (namespace, get_metric_name(metric))
-    message = "%s %f %d\n" % (metric_name, float(value), int(time.time()))
-    send_tcp(host, port, message)
-
     build_no = get_build_number()
-    metric_name = '%s.%s' % (namespace, get_metric_name('build'))
-    message = "%s %f %d\n" % (metric_name, build_no, int(time.time()))
-    send_tcp(host, port, message)
+    build_metric_name = '%s.%s' % (namespace, get_metric_name('build'))
+    timestamp = int(time.time())
+
+    if mode == MODE_DIRECT:
+        send_tcp(host, port, "%s %s %d\n" % (metric_name, _format_value(value), timestamp))
+        send_tcp(host, port, "%s %s %d\n" % (build_metric_name, _format_value(build_no), timestamp))
+        return
+
+    client = get_metrics_client(mode)
+    client.send(metric_name, value, timestamp)
+    client.send(build_metric_name, build_no, timestamp)
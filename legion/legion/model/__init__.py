@@ -16,5 +16,5 @@
 """
 Model functionality
 """
-from .client import ModelClient, load_image
+from .client import ModelClient, AsyncModelClient, load_image
 from .model_id import init
@@ -19,12 +19,24 @@ Model HTTP API client and utils
 
 import os
 import json
-import requests
+import threading
+import time
 
 import legion.config
-from legion.utils import normalize_name
+import legion.encoding
+from legion.utils import normalize_name, lazy_import
 
-from PIL import Image as PYTHON_Image
+PYTHON_Image = lazy_import('PIL.Image')
+requests = lazy_import('requests')
+aiohttp = lazy_import('aiohttp')
+asyncio = lazy_import('asyncio')
+
+# Responses with these statuses (and connection errors) are retried
+RETRY_STATUSES = 502, 503, 504
+RETRY_DELAY = 0.1
+
+_session = None
+_session_lock = threading.Lock()
 
 
 def load_image(path):
@@ -43,12 +55,103 @@ def load_image(path):
             return stream.read()
 
 
-class ModelClient:
+def build_session(pool_size=None):
+    """
+    Build requests session with keep-alive connection pool
+
+    :param pool_size: max count of kept connections per host (default: from ENV)
+    :type pool_size: int or None
+    :return: :py:class:`requests.Session` -- session
+    """
+    if pool_size is None:
+        pool_size = int(os.environ.get(*legion.config.MODEL_CLIENT_POOL_SIZE))
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session():
+    """
+    Get process-wide session of model clients (built on first call)
+
+    :return: :py:class:`requests.Session` -- session
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+def _get_retries(retries):
+    """
+    Get count of retries
+
+    :param retries: count of retries or None (from ENV)
+    :type retries: int or None
+    :return: int -- count of retries
+    """
+    return int(os.environ.get(*legion.config.MODEL_CLIENT_RETRIES)) if retries is None else retries
+
+
+def _parse_response_data(status_code, content_type, data, url):
     """
-    Model HTTP client
+    Parse model response data
+
+    :param status_code: HTTP status code
+    :type status_code: int
+    :param content_type: value of Content-Type header
+    :type content_type: str
+    :param data: response body
+    :type data: bytes or str
+    :param url: URL of request
+    :type url: str
+    :return: dict -- parsed response (column name => array for responses in binary columns format)
+    """
+    if not 200 <= status_code < 400:
+        raise Exception('Wrong status code returned: {}. Data: {}. URL: {}'.format(status_code, data, url))
+
+    if content_type.startswith(legion.encoding.COLUMNS_MIME_TYPE):
+        return legion.encoding.decode_columns(data)
+
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+
+    return json.loads(data)
+
+
+def _split_parameters(parameters):
     """
+    Split invoke parameters on form fields and files
+
+    :param parameters: parameters for model
+    :type parameters: dict[str, object]
+    :return: tuple[dict, dict] -- fields and files (bytes values)
+    """
+    post_fields = {k: v for (k, v) in parameters.items() if not isinstance(v, bytes)}
+    post_files = {k: v for (k, v) in parameters.items() if isinstance(v, bytes)}
+    return post_fields, post_files
+
 
-    def __init__(self, model_id, host=None, http_client=None, use_relative_url=False):
+BINARY_HEADERS = {
+    'Content-Type': legion.encoding.COLUMNS_MIME_TYPE,
+    'Accept': '%s, %s' % (legion.encoding.COLUMNS_MIME_TYPE, legion.encoding.JSON_MIME_TYPE)
+}
+BATCH_HEADERS = {
+    'Content-Type': legion.encoding.JSON_MIME_TYPE
+}
+
+
+class BaseModelClient:
+    """
+    Base of model HTTP clients (URLs of model API)
+    """
+
+    def __init__(self, model_id, host=None, use_relative_url=False):
         """
         Build client
 
@@ -56,27 +159,15 @@ class ModelClient:
         :type model_id: str
         :param host: host that server model HTTP requests (default: from ENV)
         :type host: str or None
-        :param http_client: HTTP client (default: requests)
-        :type http_client: python class that implements requests-like post & get methods
         :param use_relative_url: use non-full get/post requests (useful for locust)
         :type use_relative_url: bool
         """
         self._model_id = normalize_name(model_id)
 
-        if host:
-            self._host = host
-        else:
-            self._host = os.environ.get(*legion.config.MODEL_SERVER_URL)
-
-        if http_client:
-            self._http_client = http_client
-        else:
-            self._http_client = requests
-
         if use_relative_url:
             self._host = ''
         else:
-            self._host = self._host.rstrip('/')
+            self._host = (host or os.environ.get(*legion.config.MODEL_SERVER_URL)).rstrip('/')
 
     @property
     def api_url(self):
@@ -96,6 +187,15 @@ class ModelClient:
         """
         return self.api_url + '/invoke'
 
+    @property
+    def batch_url(self):
+        """
+        Build API batch URL
+
+        :return: str -- batch url
+        """
+        return self.api_url + '/batch'
+
     @property
     def info_url(self):
         """
@@ -105,24 +205,83 @@ class ModelClient:
         """
         return self.api_url + '/info'
 
+
+class ModelClient(BaseModelClient):
+    """
+    Model HTTP client. By default requests are sent through process-wide session with keep-alive connections
+    """
+
+    def __init__(self, model_id, host=None, http_client=None, use_relative_url=False, retries=None, timeout=None):
+        """
+        Build client
+
+        :param model_id: model id
+        :type model_id: str
+        :param host: host that server model HTTP requests (default: from ENV)
+        :type host: str or None
+        :param http_client: HTTP client (default: pooled requests session)
+        :type http_client: python class that implements requests-like post & get methods
+        :param use_relative_url: use non-full get/post requests (useful for locust)
+        :type use_relative_url: bool
+        :param retries: count of retries of requests on connection errors and 502, 503, 504 statuses
+        (default: from ENV)
+        :type retries: int or None
+        :param timeout: timeout of request in seconds (default: from ENV if http_client is not set)
+        :type timeout: float or None
+        """
+        super(ModelClient, self).__init__(model_id, host, use_relative_url)
+
+        if http_client:
+            self._http_client = http_client
+        else:
+            self._http_client = get_session()
+            if timeout is None:
+                timeout = float(os.environ.get(*legion.config.MODEL_CLIENT_TIMEOUT))
+
+        self._retries = _get_retries(retries)
+        self._request_arguments = {'timeout': timeout} if timeout else {}
+
     @staticmethod
     def _parse_response(response):
         """
         Parse model response
 
         :param response: model response
-        :return: dict -- parsed response
+        :return: dict -- parsed response (column name => array for responses in binary columns format)
         """
-        if not 200 <= response.status_code < 400:
-            raise Exception('Wrong status code returned: {}. Data: {}. URL: {}'
-                            .format(response.status_code, response.text, response.url))
+        content_type = response.headers.get('Content-Type', '') if hasattr(response, 'headers') else ''
+        if content_type.startswith(legion.encoding.COLUMNS_MIME_TYPE):
+            data = response.content
+        else:
+            data = response.text
+
+        return _parse_response_data(response.status_code, content_type, data, response.url)
 
-        data = response.text
+    def _request(self, method, url, **kwargs):
+        """
+        Send request, retry on connection errors and 502, 503, 504 statuses
 
-        if isinstance(data, bytes):
-            data = data.decode('utf-8')
+        :param method: name of HTTP client method (get or post)
+        :type method: str
+        :param url: URL
+        :type url: str
+        :param kwargs: arguments of HTTP client method
+        :return: dict -- parsed model response
+        """
+        kwargs.update(self._request_arguments)
 
-        return json.loads(data)
+        for attempt in range(self._retries + 1):
+            try:
+                response = getattr(self._http_client, method)(url, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt == self._retries:
+                    break
+            except requests.exceptions.ConnectionError:
+                if attempt == self._retries:
+                    raise
+
+            time.sleep(RETRY_DELAY * 2 ** attempt)
+
+        return self._parse_response(response)
 
     def invoke(self, **parameters):
         """
@@ -132,11 +291,31 @@ class ModelClient:
         :type parameters: dict[str, object] -- dictionary with parameters
         :return: dict -- parsed model response
         """
-        post_fields = {k: v for (k, v) in parameters.items() if not isinstance(v, bytes)}
-        post_files = {k: v for (k, v) in parameters.items() if isinstance(v, bytes)}
-        response = self._http_client.post(self.invoke_url, data=post_fields, files=post_files)
+        post_fields, post_files = _split_parameters(parameters)
+        return self._request('post', self.invoke_url, data=post_fields, files=post_files)
 
-        return self._parse_response(response)
+    def invoke_binary(self, **parameters):
+        """
+        Invoke model with numeric parameters sent in binary columns format (values are not parsed by server).
+        Results that consist of numeric arrays and numbers are returned in binary columns format too
+
+        :param parameters: numeric parameters for model (numbers or numpy scalars)
+        :type parameters: dict[str, union[int, float, bool, :py:class:`numpy.generic`]]
+        :return: dict -- parsed model response
+        """
+        data = legion.encoding.encode_columns(parameters)
+        return self._request('post', self.invoke_url, data=data, headers=BINARY_HEADERS)
+
+    def invoke_batch(self, rows):
+        """
+        Invoke model for many rows in one request
+
+        :param rows: list of rows (dicts of parameters) or dict of columns (lists of parameters)
+        :type rows: list[dict[str, object]] or dict[str, list]
+        :return: parsed model response
+        """
+        data = legion.encoding.encode_json(rows)
+        return self._request('post', self.batch_url, data=data, headers=BATCH_HEADERS)
 
     def info(self):
         """
@@ -144,6 +323,165 @@ class ModelClient:
 
         :return: dict -- parsed model info
         """
-        response = self._http_client.get(self.info_url)
+        return self._request('get', self.info_url)
 
-        return self._parse_response(response)
+
+class AsyncModelClient(BaseModelClient):
+    """
+    Asyncio model HTTP client (aiohttp) with keep-alive connection pool.
+    Many invocations are sent concurrently with invoke_many
+    """
+
+    def __init__(self, model_id, host=None, pool_size=None, retries=None, timeout=None):
+        """
+        Build client
+
+        :param model_id: model id
+        :type model_id: str
+        :param host: host that server model HTTP requests (default: from ENV)
+        :type host: str or None
+        :param pool_size: max count of connections and concurrent requests (default: from ENV)
+        :type pool_size: int or None
+        :param retries: count of retries of requests on connection errors and 502, 503, 504 statuses
+        (default: from ENV)
+        :type retries: int or None
+        :param timeout: timeout of request in seconds (default: from ENV)
+        :type timeout: float or None
+        """
+        super(AsyncModelClient, self).__init__(model_id, host)
+        self._pool_size = int(os.environ.get(*legion.config.MODEL_CLIENT_POOL_SIZE)) \
+            if pool_size is None else pool_size
+        self._retries = _get_retries(retries)
+        self._timeout = float(os.environ.get(*legion.config.MODEL_CLIENT_TIMEOUT)) if timeout is None else timeout
+        self._session = None
+
+    def _get_session(self):
+        """
+        Get session (built on first call in running event loop)
+
+        :return: :py:class:`aiohttp.ClientSession` -- session
+        """
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self._pool_size),
+                                                  timeout=aiohttp.ClientTimeout(total=self._timeout or None))
+        return self._session
+
+    async def _request(self, method, url, build_data=None, headers=None):
+        """
+        Send request, retry on connection errors and 502, 503, 504 statuses
+
+        :param method: HTTP method
+        :type method: str
+        :param url: URL
+        :type url: str
+        :param build_data: function that builds request body (called for each attempt)
+        :type build_data: Callable[[], any] or None
+        :param headers: request headers
+        :type headers: dict[str, str] or None
+        :return: dict -- parsed model response
+        """
+        session = self._get_session()
+
+        for attempt in range(self._retries + 1):
+            try:
+                data = build_data() if build_data else None
+                async with session.request(method, url, data=data, headers=headers) as response:
+                    if response.status not in RETRY_STATUSES or attempt == self._retries:
+                        return _parse_response_data(response.status, response.headers.get('Content-Type', ''),
+                                                    await response.read(), url)
+            except aiohttp.ClientConnectionError:
+                if attempt == self._retries:
+                    raise
+
+            await asyncio.sleep(RETRY_DELAY * 2 ** attempt)
+
+    async def invoke(self, **parameters):
+        """
+        Invoke model with parameters
+
+        :param parameters: parameters for model
+        :type parameters: dict[str, object] -- dictionary with parameters
+        :return: dict -- parsed model response
+        """
+        post_fields, post_files = _split_parameters(parameters)
+
+        def build_data():
+            form = aiohttp.FormData({k: str(v) for (k, v) in post_fields.items()})
+            for k, v in post_files.items():
+                form.add_field(k, v, filename=k)
+            return form
+
+        return await self._request('POST', self.invoke_url, build_data)
+
+    async def invoke_binary(self, **parameters):
+        """
+        Invoke model with numeric parameters sent in binary columns format
+
+        :param parameters: numeric parameters for model (numbers or numpy scalars)
+        :type parameters: dict[str, union[int, float, bool, :py:class:`numpy.generic`]]
+        :return: dict -- parsed model response
+        """
+        data = legion.encoding.encode_columns(parameters)
+        return await self._request('POST', self.invoke_url, lambda: data, BINARY_HEADERS)
+
+    async def invoke_batch(self, rows):
+        """
+        Invoke model for many rows in one request
+
+        :param rows: list of rows (dicts of parameters) or dict of columns (lists of parameters)
+        :type rows: list[dict[str, object]] or dict[str, list]
+        :return: parsed model response
+        """
+        data = legion.encoding.encode_json(rows)
+        return await self._request('POST', self.batch_url, lambda: data, BATCH_HEADERS)
+
+    async def invoke_many(self, parameters_list):
+        """
+        Invoke model for each parameters concurrently (no more than pool size requests at once)
+
+        :param parameters_list: list of parameters for model
+        :type parameters_list: list[dict[str, object]]
+        :return: list -- parsed model responses (in order of parameters)
+        """
+        semaphore = asyncio.Semaphore(self._pool_size)
+
+        async def invoke(parameters):
+            async with semaphore:
+                return await self.invoke(**parameters)
+
+        return await asyncio.gather(*[invoke(parameters) for parameters in parameters_list])
+
+    async def info(self):
+        """
+        Get model info
+
+        :return: dict -- parsed model info
+        """
+        return await self._request('GET', self.info_url)
+
+    async def close(self):
+        """
+        Close connections
+
+        :return: None
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        """
+        Enter into context
+
+        :return: self
+        """
+        return self
+
+    async def __aexit__(self, *args):
+        """
+        Exit from context with closing of connections
+
+        :param args: list of arguments
+        :return: None
+        """
+        await self.close()
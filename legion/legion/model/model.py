@@ -18,8 +18,9 @@ Models (base, interfaces and proxies)
 """
 
 import logging
+import time
 
-from legion.model.types import build_df
+from legion.model.types import InputSchema
 
 from interface import Interface, implements
 
@@ -49,6 +50,15 @@ class IMLModel(Interface):
         """
         pass
 
+    def apply_batch(self, input_columns):  # pragma: no cover
+        """
+        Apply the model to the batch of input vectors
+
+        :param input_columns: the input vectors, column name => list of values
+        :return: an arbitrary JSON serializable object
+        """
+        pass
+
     @property
     def version_string(self):  # pragma: no cover
         """
@@ -65,7 +75,17 @@ class ScipyModel(implements(IMLModel)):
     Useful for Sklearn/Scipy based model export
     """
 
-    def __init__(self, apply_func, prepare_func, column_types, version='Unknown', use_df=True):
+    # Default for models that have been saved before deterministic flag was introduced
+    deterministic = False
+
+    # Default for models that have been saved before vectorized flag was introduced
+    vectorized = False
+
+    # Function that gets name of stage (build_df, prepare, apply) and its duration in seconds, set by model server
+    stage_observer = None
+
+    def __init__(self, apply_func, prepare_func, column_types, version='Unknown', use_df=True, deterministic=False,
+                 vectorized=False):
         """
         Build simple SciPy model
 
@@ -79,6 +99,10 @@ class ScipyModel(implements(IMLModel)):
         :param use_df: use pandas DF for prepare and apply function
         :type use_df: bool
         :type version: str
+        :param deterministic: model returns same result for same input (results can be cached)
+        :type deterministic: bool
+        :param vectorized: apply function returns one result per input row (invocations can be coalesced)
+        :type vectorized: bool
         """
         assert apply_func is not None
         assert prepare_func is not None
@@ -89,6 +113,8 @@ class ScipyModel(implements(IMLModel)):
         self.prepare_func = prepare_func
         self.version = version
         self.use_df = use_df
+        self.deterministic = deterministic
+        self.vectorized = vectorized
 
     def apply(self, input_vector):
         """
@@ -98,14 +124,88 @@ class ScipyModel(implements(IMLModel)):
         :type input_vector: dict[str, union[str, Image]]
         :return: dict -- output data
         """
-        LOGGER.info('Input vector: %r' % input_vector)
-        data_frame = build_df(self.column_types, input_vector, not self.use_df)
+        # Arguments are formatted by logging only if DEBUG level is enabled
+        LOGGER.debug('Input vector: %r', input_vector)
+        started = time.perf_counter()
+        data_frame = self.input_schema.build_df(input_vector, not self.use_df)
+
+        LOGGER.debug('Running prepare with DataFrame: %r', data_frame)
+        built = time.perf_counter()
+        data_frame = self.prepare_func(data_frame)
+
+        LOGGER.debug('Applying function with DataFrame: %s', data_frame)
+        prepared = time.perf_counter()
+        result = self.apply_func(data_frame)
+
+        self._observe_stages(started, built, prepared, time.perf_counter())
+        return result
+
+    def apply_batch(self, input_columns):
+        """
+        Calculate result of model execution for many rows at once.
+        DF based models get one N-row DataFrame in prepare and apply functions,
+        other models are applied row by row
 
-        LOGGER.info('Running prepare with DataFrame: %r' % data_frame)
+        :param input_columns: input data, column name => list of values
+        :type input_columns: dict[str, list[union[str, Image]]]
+        :return: result of apply function for DF based models or list of results
+        """
+        if not self.use_df:
+            return [self.apply_func(self.prepare_func(input_row))
+                    for input_row in self.input_schema.build_batch_df(input_columns, True)]
+
+        started = time.perf_counter()
+        data_frame = self.input_schema.build_batch_df(input_columns)
+        built = time.perf_counter()
         data_frame = self.prepare_func(data_frame)
+        prepared = time.perf_counter()
+        result = self.apply_func(data_frame)
+
+        self._observe_stages(started, built, prepared, time.perf_counter())
+        return result
+
+    def _observe_stages(self, started, built, prepared, applied):
+        """
+        Send durations of stages to stage observer (if it is set)
+
+        :param started: time of start of DataFrame building (time.perf_counter)
+        :type started: float
+        :param built: time of end of DataFrame building
+        :type built: float
+        :param prepared: time of end of prepare function
+        :type prepared: float
+        :param applied: time of end of apply function
+        :type applied: float
+        :return: None
+        """
+        stage_observer = self.stage_observer
+        if stage_observer is not None:
+            stage_observer('build_df', built - started)
+            stage_observer('prepare', prepared - built)
+            stage_observer('apply', applied - prepared)
 
-        LOGGER.info('Applying function with DataFrame: %s' % str(data_frame))
-        return self.apply_func(data_frame)
+    @property
+    def input_schema(self):
+        """
+        Get input schema (built from column types on first call)
+
+        :return: :py:class:`legion.model.types.InputSchema`
+        """
+        schema = self.__dict__.get('_input_schema')
+        if schema is None:
+            schema = InputSchema(self.column_types)
+            self._input_schema = schema
+        return schema
+
+    def __getstate__(self):
+        """
+        Get state of model for pickling (cached input schema is not saved, it is built again after load)
+
+        :return: dict -- state
+        """
+        state = self.__dict__.copy()
+        state.pop('_input_schema', None)
+        return state
 
     @property
     def version_string(self):
@@ -126,5 +226,7 @@ class ScipyModel(implements(IMLModel)):
         return {
             'version': self.version,
             'use_df': self.use_df,
+            'deterministic': self.deterministic,
+            'vectorized': self.vectorized,
             'input_params': {k: v.description_for_api for (k, v) in self.column_types.items()}
         }
@@ -26,10 +26,12 @@ from io import BytesIO
 import re
 
 import base64
-from PIL import Image as PYTHON_Image
+from legion.utils import lazy_import
 import numpy as np
 import pandas as pd
 
+PYTHON_Image = lazy_import('PIL.Image')
+
 VALID_NATIVE_TYPES = [
     int, float,
     str
@@ -86,6 +88,15 @@ class BaseType:
         """
         return self._description
 
+    @property
+    def native_class(self):
+        """
+        Get native class of type
+
+        :return: int, float and etc or None -- native class or None if type does not build on native class
+        """
+        return self._native_class if self._is_native else None
+
     @property
     def default_numpy_type(self):
         """
@@ -161,6 +172,9 @@ class _Bool(BaseType):
         :type value: str or bytes
         :return: bool -- parsed value
         """
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+
         str_value = value.lower()
 
         if str_value not in self.TRUE_STRINGS + self.WRONG_STRINGS:
@@ -382,6 +396,192 @@ def deduct_types_on_pandas_df(data_frame, extra_columns=None):
     return types
 
 
+def _as_column(value):
+    """
+    Build column with one value: numpy array for numpy scalars (typed values of binary requests) or list
+
+    :param value: input value
+    :type value: union[str, bytes, :py:class:`numpy.generic`]
+    :return: list or :py:class:`numpy.ndarray` -- column
+    """
+    if isinstance(value, np.generic):
+        return np.reshape(value, 1)
+
+    return [value]
+
+
+class InputSchema:
+    """
+    Input schema precompiled from columns map. Parses columns of native types
+    (Integer, Float, Bool, String) directly into numpy arrays of target numpy types
+    """
+
+    def __init__(self, columns_map):
+        """
+        Build input schema
+
+        :param columns_map: information about columns
+        :type columns_map: dict[str, :py:class:`legion.types.ColumnInformation`]
+        """
+        self._columns_map = columns_map
+        self._columns = [
+            (column_name, column_information.representation_type, np.dtype(column_information.numpy_type))
+            for column_name, column_information in columns_map.items()
+        ]
+
+    @property
+    def column_names(self):
+        """
+        Get names of columns (in order of columns map)
+
+        :return: list[str] -- names of columns
+        """
+        return [column_name for column_name, _, _ in self._columns]
+
+    @staticmethod
+    def _is_typed_numeric(representation_type, numpy_type, values):
+        """
+        Check that values are typed numeric array or value (binary requests) for numeric column.
+        Values that can not be cast to column type without loss (for example, floats for integer column) are rejected
+
+        :param representation_type: type of column
+        :type representation_type: :py:class:`legion.types.BaseType`
+        :param numpy_type: target numpy type
+        :type numpy_type: :py:class:`numpy.dtype`
+        :param values: column values or one value
+        :type values: any
+        :return: bool -- check result
+        """
+        native_class = representation_type.native_class
+        if not (native_class is int or native_class is float or isinstance(representation_type, _Bool)):
+            return False
+        if not isinstance(values, (np.ndarray, np.generic)) or values.dtype.kind not in 'biuf':
+            return False
+
+        if not np.can_cast(values.dtype, numpy_type, 'same_kind'):
+            raise Exception('Values of type %s can not be used for column of type %s' % (values.dtype, numpy_type))
+        return True
+
+    @staticmethod
+    def _parse_column(representation_type, numpy_type, values):
+        """
+        Parse values of one column to numpy array of target type
+
+        :param representation_type: type of column
+        :type representation_type: :py:class:`legion.types.BaseType`
+        :param numpy_type: target numpy type
+        :type numpy_type: :py:class:`numpy.dtype`
+        :param values: column values
+        :type values: list[union[str, bytes]] or :py:class:`numpy.ndarray`
+        :return: :py:class:`numpy.ndarray`
+        """
+        native_class = representation_type.native_class
+
+        # Typed numeric arrays (binary requests) are cast without parsing
+        if InputSchema._is_typed_numeric(representation_type, numpy_type, values):
+            return values.astype(numpy_type, copy=False)
+
+        if native_class is int or native_class is float:
+            array = np.asarray(values)
+            if array.dtype.kind in 'USiufb':
+                native_type = np.int64 if native_class is int else np.float64
+                try:
+                    return array.astype(native_type).astype(numpy_type, copy=False)
+                except OverflowError:
+                    # Integers out of int64 range are parsed to Python int values below
+                    pass
+        elif isinstance(representation_type, _Bool):
+            if all(isinstance(value, str) for value in values):
+                array = np.char.lower(np.asarray(values, dtype=str))
+                is_valid = np.isin(array, _Bool.TRUE_STRINGS + _Bool.WRONG_STRINGS)
+                if not is_valid.all():
+                    representation_type.parse(values[int(np.argmin(is_valid))])
+                return np.isin(array, _Bool.TRUE_STRINGS).astype(numpy_type, copy=False)
+        elif native_class is str and numpy_type.kind == 'O':
+            array = np.empty(len(values), dtype=object)
+            array[:] = [value if isinstance(value, str) else str(value) for value in values]
+            return array
+
+        array = np.empty(len(values), dtype=object)
+        array[:] = [representation_type.parse(value) for value in values]
+        try:
+            return array.astype(numpy_type, copy=False)
+        except OverflowError:
+            raise ValueError('Values of type %s are out of range of column type %s'
+                             % (representation_type.name, numpy_type))
+
+    @staticmethod
+    def _parse_value(representation_type, numpy_type, value):
+        """
+        Parse one value to native value, typed values are checked as values of DataFrame columns
+
+        :param representation_type: type of column
+        :type representation_type: :py:class:`legion.types.BaseType`
+        :param numpy_type: target numpy type
+        :type numpy_type: :py:class:`numpy.dtype`
+        :param value: input value
+        :type value: union[str, bytes, :py:class:`numpy.generic`]
+        :return: native value
+        """
+        InputSchema._is_typed_numeric(representation_type, numpy_type, value)
+        return representation_type.parse(value)
+
+    def build_df(self, input_values, return_dict=False):
+        """
+        Build pandas.DataFrame (or plain dict) with one row from input map of strings or bytes
+
+        :param input_values: input values
+        :type input_values: dict[str, union[str, bytes, :py:class:`numpy.generic`]]
+        :param return_dict: return dict with native values instead of pandas DF
+        :type return_dict: bool
+        :return: :py:class:`pandas.DataFrame` or dict
+        """
+        for column_name, _, _ in self._columns:
+            if column_name not in input_values:
+                raise Exception('Missed value for column %s' % column_name)
+
+        if return_dict:
+            return {column_name: self._parse_value(representation_type, numpy_type, input_values[column_name])
+                    for column_name, representation_type, numpy_type in self._columns}
+
+        return self.build_batch_df({column_name: _as_column(input_values[column_name])
+                                    for column_name, _, _ in self._columns})
+
+    def build_batch_df(self, input_columns, return_dict=False):
+        """
+        Build pandas.DataFrame (or list of plain dicts) with N rows from columnar input values
+
+        :param input_columns: input values, column name => list of values (one value per row) or typed numpy array
+        :type input_columns: dict[str, union[list[union[str, bytes]], :py:class:`numpy.ndarray`]]
+        :param return_dict: return list of dicts (one per row) with native values instead of pandas DF
+        :type return_dict: bool
+        :return: :py:class:`pandas.DataFrame` or list[dict]
+        """
+        rows_count = None
+
+        for column_name, _, _ in self._columns:
+            if column_name not in input_columns:
+                raise Exception('Missed values for column %s' % column_name)
+
+            if rows_count is None:
+                rows_count = len(input_columns[column_name])
+            elif len(input_columns[column_name]) != rows_count:
+                raise Exception('Invalid count of values for column %s: %d, not %d'
+                                % (column_name, len(input_columns[column_name]), rows_count))
+
+        if return_dict:
+            return [self.build_df({column_name: input_columns[column_name][row]
+                                   for column_name, _, _ in self._columns}, True)
+                    for row in range(rows_count or 0)]
+
+        arrays = {
+            column_name: self._parse_column(representation_type, numpy_type, input_columns[column_name])
+            for column_name, representation_type, numpy_type in self._columns
+        }
+
+        return pd.DataFrame(arrays, columns=self.column_names)
+
+
 def build_df(columns_map, input_values, return_dict=False):
     """
     Build pandas.DataFrame (or plain dict) from map of columns and input map of strings or bytes
@@ -394,19 +594,19 @@ def build_df(columns_map, input_values, return_dict=False):
     :type return_dict: bool
     :return: :py:class:`pandas.DataFrame` or dict
     """
-    values = {}
-    types = {}
+    return InputSchema(columns_map).build_df(input_values, return_dict)
 
-    for column_name, column_information in columns_map.items():
-        if column_name not in input_values:
-            raise Exception('Missed value for column %s' % column_name)
 
-        values[column_name] = column_information.representation_type.parse(input_values[column_name])
-        types[column_name] = column_information.numpy_type
-
-    if return_dict:
-        return values
+def build_batch_df(columns_map, input_columns, return_dict=False):
+    """
+    Build pandas.DataFrame (or list of plain dicts) with N rows from map of columns and columnar input values
 
-    data_frame = pd.DataFrame([values])
-    data_frame = data_frame.astype(types)
-    return data_frame
+    :param columns_map: information about columns
+    :type columns_map: dict[str, :py:class:`legion.types.ColumnInformation`]
+    :param input_columns: input values, column name => list of values (one value per row)
+    :type input_columns: dict[str, list[union[str, bytes]]]
+    :param return_dict: return list of dicts (one per row) instead of pandas DF
+    :type return_dict: bool
+    :return: :py:class:`pandas.DataFrame` or list[dict]
+    """
+    return InputSchema(columns_map).build_batch_df(input_columns, return_dict)
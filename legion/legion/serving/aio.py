@@ -0,0 +1,276 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Native aiohttp serving engine (without WSGI bridge)
+"""
+
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+import legion.encoding
+import legion.http
+import legion.serving.cache
+import legion.serving.executors
+import legion.serving.metrics
+import legion.serving.pyserve as pyserve
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _check_model_id(application, request):
+    """
+    Check that request has been sent to current model
+
+    :param application: Flask application instance with model and configuration
+    :type application: :py:class:`Flask.app`
+    :param request: aiohttp request
+    :type request: :py:class:`aiohttp.web.Request`
+    :return: None
+    """
+    model_id = request.match_info['model_id']
+    if model_id != application.config['MODEL_ID']:
+        raise Exception('Invalid model handler: {}, not {}'.format(application.config['MODEL_ID'], model_id))
+
+
+async def parse_request(request):
+    """
+    Produce a input dictionary from aiohttp request (GET/POST fields, and Files)
+    or from body in binary columns format (typed values are not parsed)
+
+    :param request: aiohttp request
+    :type request: :py:class:`aiohttp.web.Request`
+    :return: dict with requested fields
+    """
+    if request.content_type == legion.encoding.COLUMNS_MIME_TYPE:
+        return legion.encoding.decode_columns_row(await request.read())
+
+    result = {}
+
+    # Fill in URL parameters
+    for k in request.query:
+        result[k] = request.query[k]
+
+    # Fill in POST parameters and files
+    if request.method == 'POST':
+        post = await request.post()
+        for k in post:
+            value = post[k]
+            if isinstance(value, web.FileField):
+                value = value.file.read()
+            result[k] = value
+
+    return result
+
+
+def prepare_response(response, accept=None):
+    """
+    Produce an aiohttp response from data: JSON (NumPy and pandas objects are supported)
+    or binary columns format if it is accepted by client
+
+    :param response: data
+    :type response: any
+    :param accept: value of Accept header of request
+    :type accept: str or None
+    :return: :py:class:`aiohttp.web.Response`
+    """
+    body, mime_type = legion.encoding.encode_response(response, accept)
+    return web.Response(body=body, content_type=mime_type)
+
+
+def build_handlers(application, executor):
+    """
+    Build aiohttp handlers for model routes
+
+    :param application: Flask application instance with model and configuration
+    :type application: :py:class:`Flask.app`
+    :param executor: executor for model calculations
+    :type executor: :py:class:`legion.serving.executors.ModelExecutor`
+    :return: dict[str, Callable] -- route name => handler
+    """
+    async def model_info(request):
+        """
+        Get model description
+
+        :param request: aiohttp request
+        :type request: :py:class:`aiohttp.web.Request`
+        :return: :py:class:`aiohttp.web.Response` -- model description
+        """
+        _check_model_id(application, request)
+        return prepare_response(application.config['model'].description)
+
+    async def model_invoke(request):
+        """
+        Call model for calculation (in executor)
+
+        :param request: aiohttp request
+        :type request: :py:class:`aiohttp.web.Request`
+        :return: :py:class:`aiohttp.web.Response` -- result of calculation
+        """
+        _check_model_id(application, request)
+        started = time.perf_counter()
+        with legion.serving.metrics.track_request(application.config.get('metrics'), 'invoke'):
+            input_dict = await parse_request(request)
+            pyserve.observe_stage(application, legion.serving.metrics.STAGE_PARSE_REQUEST, started)
+
+            prediction_cache = application.config.get('prediction_cache')
+            if not prediction_cache:
+                output = await asyncio.wrap_future(executor.submit(input_dict))
+            else:
+                key = legion.serving.cache.build_key(input_dict)
+                output = prediction_cache.get(key, legion.serving.cache.MISSING)
+                if output is legion.serving.cache.MISSING:
+                    output = await asyncio.wrap_future(executor.submit(input_dict))
+                    prediction_cache.put(key, output)
+
+            serialization_started = time.perf_counter()
+            response = prepare_response(output, request.headers.get('Accept'))
+            pyserve.observe_stage(application, legion.serving.metrics.STAGE_SERIALIZE, serialization_started)
+
+            pyserve.log_request(application, 'invoke', input_dict, output, started)
+            return response
+
+    async def model_batch(request):
+        """
+        Call model for calculation of many rows (in executor)
+
+        :param request: aiohttp request
+        :type request: :py:class:`aiohttp.web.Request`
+        :return: :py:class:`aiohttp.web.Response` -- result of calculation
+        """
+        _check_model_id(application, request)
+        started = time.perf_counter()
+        with legion.serving.metrics.track_request(application.config.get('metrics'), 'batch'):
+            if request.content_type == legion.encoding.COLUMNS_MIME_TYPE:
+                input_columns = legion.encoding.decode_columns_batch(await request.read())
+            else:
+                input_columns = legion.http.parse_batch_data(await request.json())
+            pyserve.observe_stage(application, legion.serving.metrics.STAGE_PARSE_REQUEST, started)
+
+            output = await asyncio.wrap_future(executor.submit_batch(input_columns))
+
+            serialization_started = time.perf_counter()
+            response = prepare_response(output, request.headers.get('Accept'))
+            pyserve.observe_stage(application, legion.serving.metrics.STAGE_SERIALIZE, serialization_started)
+
+            pyserve.log_request(application, 'batch', input_columns, output, started)
+            return response
+
+    async def model_cache(request):
+        """
+        Get statistics of prediction cache
+
+        :param request: aiohttp request
+        :type request: :py:class:`aiohttp.web.Request`
+        :return: :py:class:`aiohttp.web.Response` -- cache statistics
+        """
+        _check_model_id(application, request)
+        return prepare_response(pyserve.get_cache_statistics(application))
+
+    async def metrics(request):
+        """
+        Get metrics of model server process in Prometheus text format
+
+        :param request: aiohttp request
+        :type request: :py:class:`aiohttp.web.Request`
+        :return: :py:class:`aiohttp.web.Response` -- metrics
+        """
+        serving_metrics = application.config.get('metrics')
+        if not serving_metrics:
+            raise web.HTTPNotFound()
+
+        return web.Response(body=serving_metrics.render().encode('utf-8'),
+                            headers={'Content-Type': legion.serving.metrics.PROMETHEUS_MIME_TYPE})
+
+    async def healthcheck(request):
+        """
+        Check that model is OK (liveness)
+
+        :param request: aiohttp request
+        :type request: :py:class:`aiohttp.web.Request`
+        :return: :py:class:`aiohttp.web.Response` -- status string
+        """
+        return web.Response(text='OK')
+
+    async def ready(request):
+        """
+        Check that model is ready for requests (readiness)
+
+        :param request: aiohttp request
+        :type request: :py:class:`aiohttp.web.Request`
+        :return: :py:class:`aiohttp.web.Response` -- status string
+        """
+        if not pyserve.is_ready(application):
+            return web.Response(text='Warming up', status=503)
+
+        return web.Response(text='OK')
+
+    return {
+        'info': model_info,
+        'invoke': model_invoke,
+        'batch': model_batch,
+        'cache': model_cache,
+        'metrics': metrics,
+        'healthcheck': healthcheck,
+        'ready': ready
+    }
+
+
+def create_aiohttp_application(application):
+    """
+    Create aiohttp application for initialized Flask application (model and configuration)
+
+    :param application: Flask application instance with model and configuration
+    :type application: :py:class:`Flask.app`
+    :return: :py:class:`aiohttp.web.Application`
+    """
+    executor = application.config.get('executor') or legion.serving.executors.build_model_executor(application)
+    handlers = build_handlers(application, executor)
+
+    aioapp_instance = web.Application()
+    aioapp_instance.router.add_route('GET', pyserve.SERVE_INFO.format(model_id='{model_id}'), handlers['info'])
+    aioapp_instance.router.add_route('GET', pyserve.SERVE_INVOKE.format(model_id='{model_id}'), handlers['invoke'])
+    aioapp_instance.router.add_route('POST', pyserve.SERVE_INVOKE.format(model_id='{model_id}'), handlers['invoke'])
+    aioapp_instance.router.add_route('POST', pyserve.SERVE_BATCH.format(model_id='{model_id}'), handlers['batch'])
+    aioapp_instance.router.add_route('GET', pyserve.SERVE_CACHE.format(model_id='{model_id}'), handlers['cache'])
+    aioapp_instance.router.add_route('GET', pyserve.SERVE_HEALTH_CHECK, handlers['healthcheck'])
+    aioapp_instance.router.add_route('GET', pyserve.SERVE_READY, handlers['ready'])
+    aioapp_instance.router.add_route('GET', pyserve.SERVE_METRICS, handlers['metrics'])
+
+    serving_metrics = application.config.get('metrics')
+    if serving_metrics:
+        serving_metrics.add_gauge('legion_model_queue_depth', 'Count of invocations waiting for model',
+                                  lambda: executor.queue_depth, {'queue': 'executor'})
+
+    async def shutdown_executor(aioapp):
+        executor.shutdown()
+
+    aioapp_instance.on_shutdown.append(shutdown_executor)
+
+    return aioapp_instance
+
+
+def make_aiohttp_app(args=None):
+    """
+    Create aiohttp application (load model and register it on Consul)
+
+    :param args: arguments if provided
+    :type args: :py:class:`argparse.Namespace` or None
+    :return: :py:class:`aiohttp.web.Application`
+    """
+    application = pyserve.init_application(args, build_executor=True)
+    return create_aiohttp_application(application)
@@ -0,0 +1,228 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Micro-batching of concurrent model invocations
+"""
+
+import concurrent.futures
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _to_list(values):
+    """
+    Convert sequence (list, numpy array, pandas Series) to plain list
+
+    :param values: sequence
+    :type values: list or tuple or :py:class:`numpy.ndarray` or :py:class:`pandas.Series`
+    :return: list
+    """
+    if isinstance(values, (np.ndarray, pd.Series)):
+        return values.tolist()
+
+    return list(values)
+
+
+def split_batch_result(result, count):
+    """
+    Split result of apply function for N-row input to N results (one per row)
+
+    :param result: result of apply function
+    :type result: :py:class:`pandas.DataFrame`, dict of sequences or sequence
+    :param count: count of rows
+    :type count: int
+    :return: list -- results, one per row
+    """
+    if isinstance(result, pd.DataFrame):
+        results = result.to_dict('records')
+    elif isinstance(result, dict):
+        columns = {key: _to_list(values) for key, values in result.items()}
+        if any(len(values) != count for values in columns.values()):
+            raise Exception('Cannot split result: all values should have %d items' % count)
+
+        results = [{key: values[row] for key, values in columns.items()} for row in range(count)]
+    elif isinstance(result, (list, tuple, np.ndarray, pd.Series)):
+        results = _to_list(result)
+    else:
+        raise Exception('Cannot split result of type %s' % type(result))
+
+    if len(results) != count:
+        raise Exception('Cannot split result: %d items returned for %d rows' % (len(results), count))
+
+    return results
+
+
+class MicroBatcher:
+    """
+    Queue of model invocations that are coalesced into one apply_batch call for vectorized models.
+    Invocation waits at most max_delay seconds for other invocations (or until max_batch_size is reached)
+    """
+
+    def __init__(self, model, max_batch_size=32, max_delay=0.005):
+        """
+        Build micro batcher
+
+        :param model: model
+        :type model: :py:class:`legion.model.model.IMLModel`
+        :param max_batch_size: max count of rows in one batch
+        :type max_batch_size: int
+        :param max_delay: max time in seconds that first invocation in batch waits for others
+        :type max_delay: float
+        """
+        self._model = model
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    @property
+    def queue_size(self):
+        """
+        Get count of invocations waiting in queue
+
+        :return: int -- count of invocations
+        """
+        return self._queue.qsize()
+
+    def submit(self, input_vector):
+        """
+        Put invocation in queue without waiting for result (caller thread is not blocked,
+        so count of coalesced invocations is not limited by count of caller threads)
+
+        :param input_vector: input data
+        :type input_vector: dict[str, union[str, Image]]
+        :return: :py:class:`concurrent.futures.Future` -- future result
+        """
+        self._start_worker()
+
+        future = concurrent.futures.Future()
+        self._queue.put((input_vector, future))
+        return future
+
+    def apply(self, input_vector, timeout=None):
+        """
+        Calculate result of model execution (in batch with concurrent invocations)
+
+        :param input_vector: input data
+        :type input_vector: dict[str, union[str, Image]]
+        :param timeout: max time in seconds to wait for result or None
+        :type timeout: float or None
+        :return: result of model execution for input data
+        """
+        return self.submit(input_vector).result(timeout)
+
+    def _start_worker(self):
+        """
+        Start worker thread if it has not been started (in current process)
+
+        :return: None
+        """
+        if self._worker and self._worker.is_alive():
+            return
+
+        with self._worker_lock:
+            if not self._worker or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='legion-micro-batcher', daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        """
+        Collect invocations for next batch
+
+        :return: list[tuple[dict, :py:class:`concurrent.futures.Future`]] -- invocations
+        """
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._max_delay
+
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        """
+        Worker loop: collect and process batches
+
+        :return: None
+        """
+        while True:
+            self._process(self._collect())
+
+    def _apply_rows(self, input_vectors):
+        """
+        Calculate results for rows with one apply_batch call
+
+        :param input_vectors: input data of rows
+        :type input_vectors: list[dict]
+        :return: list -- results, one per row
+        """
+        columns = {column for input_vector in input_vectors for column in input_vector}
+        input_columns = {column: [input_vector.get(column) for input_vector in input_vectors]
+                         for column in columns}
+        return split_batch_result(self._model.apply_batch(input_columns), len(input_vectors))
+
+    def _apply_each(self, batch):
+        """
+        Calculate results for invocations row by row with apply (result of each row is the same as without batching)
+
+        :param batch: invocations
+        :type batch: list[tuple[dict, :py:class:`concurrent.futures.Future`]]
+        :return: None
+        """
+        for input_vector, future in batch:
+            try:
+                future.set_result(self._model.apply(input_vector))
+            except Exception as apply_exception:
+                future.set_exception(apply_exception)
+
+    def _process(self, batch):
+        """
+        Calculate results for batch of invocations and send them to waiting invocations.
+        Only batches of models marked as vectorized are calculated with one apply_batch call,
+        single invocations and invocations of other models are calculated with apply.
+        Falls back to row by row calculation if batch cannot be calculated or its result cannot be split
+
+        :param batch: invocations
+        :type batch: list[tuple[dict, :py:class:`concurrent.futures.Future`]]
+        :return: None
+        """
+        if len(batch) > 1 and getattr(self._model, 'vectorized', False):
+            try:
+                results = self._apply_rows([input_vector for input_vector, _ in batch])
+            except Exception as batch_exception:
+                LOGGER.debug('Cannot calculate batch of %d rows, applying row by row: %s',
+                             len(batch), batch_exception)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+                return
+
+        self._apply_each(batch)
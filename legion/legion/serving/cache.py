@@ -0,0 +1,506 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Caches of model results (for deterministic models): in-process and shared between worker processes
+"""
+
+import collections
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Marker of absent result (None can be a result of model)
+MISSING = object()
+
+
+def estimate_size(value):
+    """
+    Estimate memory size of value (containers are measured recursively)
+
+    :param value: value
+    :type value: any
+    :return: int -- size in bytes
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes + sys.getsizeof(value) - (value.nbytes if value.flags.owndata else 0)
+    elif isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    elif isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+
+    return sys.getsizeof(value)
+
+
+def build_key(input_vector):
+    """
+    Build canonical (independent of fields order) hashable key of input vector
+
+    :param input_vector: input data
+    :type input_vector: dict[str, union[str, bytes]]
+    :return: tuple -- key
+    """
+    return tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                        for name, value in input_vector.items()))
+
+
+class BasePredictionCache:
+    """
+    Base class of prediction caches (implementations define get, put and statistics)
+    """
+
+    def get(self, key, default=None):  # pragma: no cover
+        """
+        Get cached result
+
+        :param key: key built by :py:func:`legion.serving.cache.build_key`
+        :type key: tuple
+        :param default: value to return if result is not cached
+        :type default: any
+        :return: cached result or default
+        """
+        raise NotImplementedError()
+
+    def put(self, key, value):  # pragma: no cover
+        """
+        Cache result
+
+        :param key: key built by :py:func:`legion.serving.cache.build_key`
+        :type key: tuple
+        :param value: result of model
+        :type value: any
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def apply(self, input_vector, apply):
+        """
+        Get cached result for input vector or calculate (and cache) it
+
+        :param input_vector: input data
+        :type input_vector: dict[str, union[str, bytes]]
+        :param apply: function that calculates result for input vector
+        :type apply: Callable[[dict], any]
+        :return: result of model
+        """
+        key = build_key(input_vector)
+
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = apply(input_vector)
+            self.put(key, value)
+
+        return value
+
+
+class PredictionCache(BasePredictionCache):
+    """
+    Thread-safe bounded cache of model results with LRU eviction (by count of entries and memory size)
+    and TTL expiration
+    """
+
+    def __init__(self, max_entries=10000, ttl=300.0, max_memory=64 * 1024 * 1024):
+        """
+        Build cache
+
+        :param max_entries: max count of cached results
+        :type max_entries: int
+        :param ttl: time to live of cached result in seconds, 0 for infinite
+        :type ttl: float
+        :param max_memory: max estimated size of keys and results in bytes
+        :type max_memory: int
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._max_memory = max_memory
+        self._entries = collections.OrderedDict()
+        self._memory = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """
+        Get cached result and mark it as recently used
+
+        :param key: key built by :py:func:`legion.serving.cache.build_key`
+        :type key: tuple
+        :param default: value to return if result is not cached
+        :type default: any
+        :return: cached result or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, size, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Cache result, evict least recently used results if cache is full
+
+        :param key: key built by :py:func:`legion.serving.cache.build_key`
+        :type key: tuple
+        :param value: result of model
+        :type value: any
+        :return: None
+        """
+        size = estimate_size(key) + estimate_size(value)
+        if size > self._max_memory:
+            return
+
+        expires_at = time.monotonic() + self._ttl if self._ttl else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = expires_at, size, value
+            self._memory += size
+
+            while len(self._entries) > self._max_entries or self._memory > self._max_memory:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        """
+        Remove entry (lock should be acquired)
+
+        :param key: key
+        :type key: tuple
+        :return: None
+        """
+        _, size, _ = self._entries.pop(key)
+        self._memory -= size
+
+    @property
+    def statistics(self):
+        """
+        Get cache counters and sizes
+
+        :return: dict[str, int] -- statistics
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'memory': self._memory
+            }
+
+
+class SharedPredictionCache(BasePredictionCache):
+    """
+    Cache of model results shared by all worker processes of host (memory-mapped file, e.g. in /dev/shm).
+
+    File is a set-associative hash table of fixed-size slots: key hash selects bucket of WAYS slots,
+    full bucket evicts slot with clock algorithm (reference bit is set on each hit).
+    Writers lock one of LOCK_STRIPES stripes (thread lock and fcntl lock of header byte),
+    readers do not lock: slot sequence number is odd while slot is being written and is checked
+    before and after copy of slot (torn reads are treated as misses).
+
+    Keys include namespace (e.g. model id and version), so stale results of other models are never returned.
+    Hit, miss, eviction and expiration counters are counted by current process
+    """
+
+    MAGIC = b'LGNCACHE'
+    FORMAT_VERSION = 1
+    WAYS = 8
+    LOCK_STRIPES = 64
+    HEADER_SIZE = 64
+
+    # magic, format version, count of buckets, ways, slot size
+    _HEADER = struct.Struct('<8sIIII')
+    # sequence number, reference bit, key hash, expiration time (0 - never), key size, value size
+    _SLOT_HEADER = struct.Struct('<IB3xQdII')
+
+    def __init__(self, path, slots=16384, slot_size=4096, ttl=300.0, namespace=''):
+        """
+        Open (or create) shared cache
+
+        :param path: path to cache file, all processes should use same file and geometry (slots and slot_size)
+        :type path: str
+        :param slots: count of slots (rounded up to multiple of WAYS)
+        :type slots: int
+        :param slot_size: size of slot in bytes, results that do not fit slot are not cached
+        :type slot_size: int
+        :param ttl: time to live of cached result in seconds, 0 for infinite
+        :type ttl: float
+        :param namespace: namespace of keys
+        :type namespace: str
+        """
+        if slot_size <= self._SLOT_HEADER.size:
+            raise Exception('Slot size should be greater than %d bytes' % self._SLOT_HEADER.size)
+
+        self._path = path
+        self._buckets = max(1, (slots + self.WAYS - 1) // self.WAYS)
+        self._slot_size = slot_size
+        self._ttl = ttl
+        self._namespace = namespace
+
+        hands_size = (self._buckets + self.HEADER_SIZE - 1) // self.HEADER_SIZE * self.HEADER_SIZE
+        self._hands_offset = self.HEADER_SIZE
+        self._slots_offset = self.HEADER_SIZE + hands_size
+        self._size = self._slots_offset + self._buckets * self.WAYS * slot_size
+
+        self._thread_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._initialize_file()
+            self._mmap = mmap.mmap(self._fd, self._size)
+        except Exception:
+            os.close(self._fd)
+            raise
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _initialize_file(self):
+        """
+        Write header to new file or check header of existing file
+
+        :return: None
+        """
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.HEADER_SIZE, 0)
+        try:
+            header = self._HEADER.pack(self.MAGIC, self.FORMAT_VERSION, self._buckets, self.WAYS, self._slot_size)
+
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, self._size)
+                os.pwrite(self._fd, header, 0)
+            elif os.pread(self._fd, self._HEADER.size, 0) != header or os.fstat(self._fd).st_size != self._size:
+                raise Exception('Shared cache file %s has another format or geometry' % self._path)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.HEADER_SIZE, 0)
+
+    def close(self):
+        """
+        Unmap and close cache file
+
+        :return: None
+        """
+        self._mmap.close()
+        os.close(self._fd)
+
+    def _serialize_key(self, key):
+        """
+        Serialize key with namespace
+
+        :param key: key built by :py:func:`legion.serving.cache.build_key`
+        :type key: tuple
+        :return: tuple[bytes, int] -- serialized key and its stable hash
+        """
+        key_data = pickle.dumps((self._namespace, key), pickle.HIGHEST_PROTOCOL)
+        key_hash = int.from_bytes(hashlib.blake2b(key_data, digest_size=8).digest(), 'little')
+        return key_data, key_hash
+
+    def _slot_offset(self, bucket, way):
+        """
+        Get offset of slot in file
+
+        :param bucket: index of bucket
+        :type bucket: int
+        :param way: index of slot in bucket
+        :type way: int
+        :return: int -- offset
+        """
+        return self._slots_offset + (bucket * self.WAYS + way) * self._slot_size
+
+    def _lock(self, bucket):
+        """
+        Lock stripe of bucket (in current process and between processes)
+
+        :param bucket: index of bucket
+        :type bucket: int
+        :return: int -- index of stripe
+        """
+        stripe = bucket % self.LOCK_STRIPES
+        self._thread_locks[stripe].acquire()
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, stripe)
+        return stripe
+
+    def _unlock(self, stripe):
+        """
+        Unlock stripe
+
+        :param stripe: index of stripe
+        :type stripe: int
+        :return: None
+        """
+        fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, stripe)
+        self._thread_locks[stripe].release()
+
+    def get(self, key, default=None):
+        """
+        Get cached result (without locking)
+
+        :param key: key built by :py:func:`legion.serving.cache.build_key`
+        :type key: tuple
+        :param default: value to return if result is not cached
+        :type default: any
+        :return: cached result or default
+        """
+        key_data, key_hash = self._serialize_key(key)
+        bucket = key_hash % self._buckets
+
+        for way in range(self.WAYS):
+            offset = self._slot_offset(bucket, way)
+            sequence, _, slot_hash, expires_at, key_size, value_size = self._SLOT_HEADER.unpack_from(self._mmap, offset)
+            if slot_hash != key_hash or sequence % 2 or key_size != len(key_data):
+                continue
+
+            data_offset = offset + self._SLOT_HEADER.size
+            slot_key_data = self._mmap[data_offset:data_offset + key_size]
+            value_data = self._mmap[data_offset + key_size:data_offset + key_size + value_size]
+
+            if self._SLOT_HEADER.unpack_from(self._mmap, offset)[0] != sequence or slot_key_data != key_data:
+                continue
+
+            if expires_at and expires_at <= time.time():
+                self.expirations += 1
+                break
+
+            # Reference bit for clock eviction (is written without lock, losing it is harmless)
+            self._mmap[offset + 4] = 1
+            self.hits += 1
+            return pickle.loads(value_data)
+
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """
+        Cache result, evict slot of bucket with clock algorithm if bucket is full
+
+        :param key: key built by :py:func:`legion.serving.cache.build_key`
+        :type key: tuple
+        :param value: result of model
+        :type value: any
+        :return: None
+        """
+        key_data, key_hash = self._serialize_key(key)
+        value_data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self._SLOT_HEADER.size + len(key_data) + len(value_data) > self._slot_size:
+            return
+
+        bucket = key_hash % self._buckets
+        expires_at = time.time() + self._ttl if self._ttl else 0.0
+
+        stripe = self._lock(bucket)
+        try:
+            way = self._find_slot(bucket, key_hash, key_data)
+            offset = self._slot_offset(bucket, way)
+            sequence = self._SLOT_HEADER.unpack_from(self._mmap, offset)[0]
+
+            # Odd sequence number marks slot as being written for readers
+            struct.pack_into('<I', self._mmap, offset, (sequence + 1) & 0xFFFFFFFF)
+            data_offset = offset + self._SLOT_HEADER.size
+            self._mmap[data_offset:data_offset + len(key_data)] = key_data
+            self._mmap[data_offset + len(key_data):data_offset + len(key_data) + len(value_data)] = value_data
+            self._SLOT_HEADER.pack_into(self._mmap, offset, (sequence + 1) & 0xFFFFFFFF, 1, key_hash, expires_at,
+                                        len(key_data), len(value_data))
+            struct.pack_into('<I', self._mmap, offset, (sequence + 2) & 0xFFFFFFFF)
+        finally:
+            self._unlock(stripe)
+
+    def _find_slot(self, bucket, key_hash, key_data):
+        """
+        Find slot for key in bucket: slot with same key, empty or expired slot or victim of clock eviction
+        (stripe should be locked)
+
+        :param bucket: index of bucket
+        :type bucket: int
+        :param key_hash: hash of key
+        :type key_hash: int
+        :param key_data: serialized key
+        :type key_data: bytes
+        :return: int -- index of slot in bucket
+        """
+        now = time.time()
+        free_way = None
+
+        for way in range(self.WAYS):
+            offset = self._slot_offset(bucket, way)
+            _, _, slot_hash, expires_at, key_size, _ = self._SLOT_HEADER.unpack_from(self._mmap, offset)
+            if not key_size or (expires_at and expires_at <= now):
+                if free_way is None:
+                    free_way = way
+            elif slot_hash == key_hash and key_size == len(key_data):
+                data_offset = offset + self._SLOT_HEADER.size
+                if self._mmap[data_offset:data_offset + key_size] == key_data:
+                    return way
+
+        if free_way is not None:
+            return free_way
+
+        hand_offset = self._hands_offset + bucket
+        way = self._mmap[hand_offset] % self.WAYS
+        while self._mmap[self._slot_offset(bucket, way) + 4]:
+            self._mmap[self._slot_offset(bucket, way) + 4] = 0
+            way = (way + 1) % self.WAYS
+
+        self._mmap[hand_offset] = (way + 1) % self.WAYS
+        self.evictions += 1
+        return way
+
+    @property
+    def statistics(self):
+        """
+        Get cache counters (of current process) and sizes (of shared file)
+
+        :return: dict[str, int] -- statistics
+        """
+        slot_count = self._buckets * self.WAYS
+        entries = sum(1 for index in range(slot_count)
+                      if self._SLOT_HEADER.unpack_from(self._mmap, self._slots_offset + index * self._slot_size)[4])
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'entries': entries,
+            'memory': self._size
+        }
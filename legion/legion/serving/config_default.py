@@ -28,3 +28,33 @@ CONSUL_ADDR = "consul"
 CONSUL_PORT = 8500
 
 REGISTER_ON_CONSUL = True
+
+MICRO_BATCHING_ENABLED = False
+MICRO_BATCHING_MAX_SIZE = 32
+MICRO_BATCHING_MAX_DELAY = 0.005
+
+AIO_EXECUTOR_TYPE = 'thread'
+AIO_EXECUTOR_WORKERS = 4
+
+WARM_UP_ENABLED = True
+WARM_UP_MIN_ITERATIONS = 3
+WARM_UP_MAX_ITERATIONS = 50
+WARM_UP_SETTLE_RATIO = 1.5
+
+PREDICTION_CACHE_ENABLED = False
+PREDICTION_CACHE_MAX_ENTRIES = 10000
+PREDICTION_CACHE_TTL = 300.0
+PREDICTION_CACHE_MAX_MEMORY = 64 * 1024 * 1024
+PREDICTION_CACHE_SHARED_FILE = ''
+PREDICTION_CACHE_SLOT_SIZE = 4096
+
+REQUEST_LOG_SAMPLE_RATE = 0.0
+REQUEST_LOG_MAX_PAYLOAD_SIZE = 1024
+REQUEST_LOG_QUEUE_SIZE = 1000
+
+SERVING_METRICS_ENABLED = True
+
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_EVERY = 0
+PROFILING_WINDOW = 300.0
+PROFILING_MAX_STACKS = 10000
@@ -0,0 +1,303 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Model executors (thread pool and forked process pool)
+"""
+
+import concurrent.futures
+import gc
+import logging
+import multiprocessing
+import os
+import threading
+
+LOGGER = logging.getLogger(__name__)
+
+EXECUTOR_THREAD = 'thread'
+EXECUTOR_PROCESS = 'process'
+VALID_EXECUTORS = EXECUTOR_THREAD, EXECUTOR_PROCESS
+
+# Model instance of forked scoring workers (inherited from master process)
+_worker_model = None
+
+
+def _worker_call(function, argument):
+    """
+    Call model function in scoring worker and collect durations of request processing stages
+    (metrics of master process are not available in worker, durations are sent back with result)
+
+    :param function: model function
+    :type function: Callable
+    :param argument: argument of function
+    :return: tuple[any, list[tuple[str, float]]] -- result and durations of stages
+    """
+    stages = []
+    if hasattr(_worker_model, 'stage_observer'):
+        _worker_model.stage_observer = lambda stage, duration: stages.append((stage, duration))
+    return function(argument), stages
+
+
+def _worker_apply(input_vector):
+    """
+    Calculate result of model execution in scoring worker
+
+    :param input_vector: input data
+    :type input_vector: dict[str, union[str, bytes]]
+    :return: tuple[any, list[tuple[str, float]]] -- result of model execution and durations of stages
+    """
+    return _worker_call(_worker_model.apply, input_vector)
+
+
+def _worker_apply_batch(input_columns):
+    """
+    Calculate result of model execution for many rows in scoring worker
+
+    :param input_columns: input data, column name => list of values
+    :type input_columns: dict[str, list]
+    :return: tuple[any, list[tuple[str, float]]] -- result of model execution and durations of stages
+    """
+    return _worker_call(_worker_model.apply_batch, input_columns)
+
+
+class ModelExecutor:
+    """
+    Model executor that calculates results in bounded thread pool
+    """
+
+    def __init__(self, model, workers, batcher=None):
+        """
+        Build executor
+
+        :param model: model
+        :type model: :py:class:`legion.model.model.IMLModel`
+        :param workers: count of threads
+        :type workers: int
+        :param batcher: optional micro batcher for single row invocations
+        :type batcher: :py:class:`legion.serving.batching.MicroBatcher` or None
+        """
+        self._model = model
+        self._batcher = batcher
+        self._workers = workers
+        self._outstanding = 0
+        self._outstanding_lock = threading.Lock()
+        self._pool = self._build_pool(workers)
+
+    def _build_pool(self, workers):
+        """
+        Build pool of workers
+
+        :param workers: count of workers
+        :type workers: int
+        :return: :py:class:`concurrent.futures.Executor` -- pool
+        """
+        return concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+    @property
+    def queue_depth(self):
+        """
+        Get count of submitted calculations that wait for free worker
+
+        :return: int -- count of calculations
+        """
+        return max(0, self._outstanding - self._workers)
+
+    def _release(self, future):
+        """
+        Count finished calculation
+
+        :param future: finished future
+        :type future: :py:class:`concurrent.futures.Future`
+        :return: None
+        """
+        with self._outstanding_lock:
+            self._outstanding -= 1
+
+    def _track(self, future):
+        """
+        Count submitted calculation until it is finished
+
+        :param future: future result
+        :type future: :py:class:`concurrent.futures.Future`
+        :return: :py:class:`concurrent.futures.Future` -- same future
+        """
+        with self._outstanding_lock:
+            self._outstanding += 1
+        future.add_done_callback(self._release)
+        return future
+
+    def submit(self, input_vector):
+        """
+        Submit model calculation
+
+        :param input_vector: input data
+        :type input_vector: dict[str, union[str, bytes]]
+        :return: :py:class:`concurrent.futures.Future` -- future result
+        """
+        if self._batcher:
+            # Invocation waits in batcher queue, not in thread: batches are not limited by count of workers
+            return self._batcher.submit(input_vector)
+        return self._track(self._pool.submit(self._model.apply, input_vector))
+
+    def submit_batch(self, input_columns):
+        """
+        Submit model calculation for many rows
+
+        :param input_columns: input data, column name => list of values
+        :type input_columns: dict[str, list]
+        :return: :py:class:`concurrent.futures.Future` -- future result
+        """
+        return self._track(self._pool.submit(self._model.apply_batch, input_columns))
+
+    def shutdown(self):
+        """
+        Stop executor (without waiting for pending calculations)
+
+        :return: None
+        """
+        self._pool.shutdown(wait=False)
+
+
+class ForkingModelExecutor(ModelExecutor):
+    """
+    Model executor that forks scoring worker processes from process with loaded model.
+    Workers share model memory pages with master process (copy-on-write) and are not limited by GIL.
+    Requests and results are sent through process pool pipes. Durations of request processing stages
+    are sent back with results and passed to stage observer of model in master process
+    """
+
+    def __init__(self, model, workers, batcher=None):
+        """
+        Build executor and fork scoring workers
+
+        :param model: model
+        :type model: :py:class:`legion.model.model.IMLModel`
+        :param workers: count of scoring processes
+        :type workers: int
+        :param batcher: not supported, should be None
+        :type batcher: None
+        """
+        global _worker_model
+
+        if batcher:
+            raise Exception('Micro batching is not supported by forked scoring workers')
+
+        _worker_model = model
+
+        # Move loaded objects to permanent generation: GC of workers does not touch (and copy) model pages
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
+
+        super().__init__(model, workers)
+
+        # Fork all workers now, before serving threads and event loop are started
+        pids = {future.result() for future in [self._pool.submit(os.getpid) for _ in range(workers)]}
+        LOGGER.info('Forked %d scoring workers: %s', workers, ', '.join(str(pid) for pid in sorted(pids)))
+
+    def _build_pool(self, workers):
+        """
+        Build pool of forked scoring processes
+
+        :param workers: count of processes
+        :type workers: int
+        :return: :py:class:`concurrent.futures.ProcessPoolExecutor` -- pool
+        """
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                      mp_context=multiprocessing.get_context('fork'))
+
+    def submit(self, input_vector):
+        """
+        Submit model calculation to scoring worker
+
+        :param input_vector: input data
+        :type input_vector: dict[str, union[str, bytes]]
+        :return: :py:class:`concurrent.futures.Future` -- future result
+        """
+        return self._unpack(self._track(self._pool.submit(_worker_apply, input_vector)))
+
+    def submit_batch(self, input_columns):
+        """
+        Submit model calculation for many rows to scoring worker
+
+        :param input_columns: input data, column name => list of values
+        :type input_columns: dict[str, list]
+        :return: :py:class:`concurrent.futures.Future` -- future result
+        """
+        return self._unpack(self._track(self._pool.submit(_worker_apply_batch, input_columns)))
+
+    def _unpack(self, worker_future):
+        """
+        Build future of result of worker, durations of stages are passed to stage observer of model
+
+        :param worker_future: future of result and durations of stages
+        :type worker_future: :py:class:`concurrent.futures.Future`
+        :return: :py:class:`concurrent.futures.Future` -- future result
+        """
+        future = concurrent.futures.Future()
+
+        def on_worker_done(finished):
+            if finished.cancelled():
+                future.cancel()
+                return
+            if future.cancelled():
+                return
+            try:
+                result, stages = finished.result()
+            except BaseException as worker_exception:
+                future.set_exception(worker_exception)
+                return
+
+            stage_observer = getattr(self._model, 'stage_observer', None)
+            if stage_observer is not None:
+                for stage, duration in stages:
+                    stage_observer(stage, duration)
+            future.set_result(result)
+
+        def on_done(finished):
+            if finished.cancelled():
+                worker_future.cancel()
+
+        worker_future.add_done_callback(on_worker_done)
+        future.add_done_callback(on_done)
+        return future
+
+
+def build_model_executor(application):
+    """
+    Build model executor from application configuration (AIO_EXECUTOR_TYPE, AIO_EXECUTOR_WORKERS).
+    Process executor should be built before background threads of application are started
+
+    :param application: Flask application instance with model and configuration
+    :type application: :py:class:`Flask.app`
+    :return: :py:class:`legion.serving.executors.ModelExecutor`
+    """
+    executor_type = application.config['AIO_EXECUTOR_TYPE']
+    workers = int(application.config['AIO_EXECUTOR_WORKERS'])
+
+    if executor_type == EXECUTOR_THREAD:
+        return ModelExecutor(application.config['model'], workers, application.config.get('batcher'))
+    elif executor_type == EXECUTOR_PROCESS:
+        if application.config.get('batcher'):
+            raise Exception('Micro batching (MICRO_BATCHING_ENABLED) is not supported by %s executor '
+                            '(AIO_EXECUTOR_TYPE), use %s executor or disable micro batching'
+                            % (EXECUTOR_PROCESS, EXECUTOR_THREAD))
+        # Fork after warm-up: workers inherit warmed model and no warm-up thread is running during fork
+        warm_up = application.config.get('warm_up')
+        if warm_up:
+            warm_up.complete()
+        return ForkingModelExecutor(application.config['model'], workers)
+
+    raise Exception('Unknown executor type %s. Should be one of %s' % (executor_type, ', '.join(VALID_EXECUTORS)))
@@ -0,0 +1,284 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+In-process metrics of model serving (stage histograms, in-flight requests and queue depth)
+in Prometheus text format
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+
+PROMETHEUS_MIME_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds of histogram buckets in seconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Stages of request processing: parsing of HTTP request, building of DataFrame, prepare_func,
+# apply_func and serialization of response
+STAGE_PARSE_REQUEST = 'parse_request'
+STAGE_BUILD_DF = 'build_df'
+STAGE_PREPARE = 'prepare'
+STAGE_APPLY = 'apply'
+STAGE_SERIALIZE = 'serialize'
+STAGES = STAGE_PARSE_REQUEST, STAGE_BUILD_DF, STAGE_PREPARE, STAGE_APPLY, STAGE_SERIALIZE
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets (cumulative counts are built on render)
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Build histogram
+
+        :param buckets: sorted upper bounds of buckets
+        :type buckets: tuple[float]
+        """
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """
+        Add value to histogram
+
+        :param value: value
+        :type value: float
+        :return: None
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """
+        Get cumulative counts of buckets (last is +Inf), sum and count of values
+
+        :return: tuple[list[int], float, int] -- cumulative counts, sum and count
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative = []
+        count = 0
+        for bucket_count in counts:
+            count += bucket_count
+            cumulative.append(count)
+
+        return cumulative, total, count
+
+
+def _format_labels(labels):
+    """
+    Format labels in Prometheus text format
+
+    :param labels: label name => value
+    :type labels: dict[str, str]
+    :return: str -- formatted labels (with braces) or empty string
+    """
+    if not labels:
+        return ''
+
+    return '{%s}' % ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                             for name, value in sorted(labels.items()))
+
+
+def _format_value(value):
+    """
+    Format value in Prometheus text format
+
+    :param value: value
+    :type value: float
+    :return: str -- formatted value
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class ServingMetrics:
+    """
+    Metrics of model server process: stage duration histograms, request duration histograms,
+    count of in-flight requests and gauges with values collected on render (for example, queue depth)
+    """
+
+    def __init__(self, labels=None, buckets=DEFAULT_BUCKETS):
+        """
+        Build metrics
+
+        :param labels: constant labels of all metrics (for example, model id and version)
+        :type labels: dict[str, str] or None
+        :param buckets: upper bounds of histogram buckets in seconds
+        :type buckets: tuple[float]
+        """
+        self._labels = dict(labels or {})
+        self._buckets = tuple(buckets)
+        self._stages = {stage: Histogram(self._buckets) for stage in STAGES}
+        self._requests = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def observe_stage(self, stage, duration):
+        """
+        Add duration of request processing stage
+
+        :param stage: name of stage
+        :type stage: str
+        :param duration: duration in seconds
+        :type duration: float
+        :return: None
+        """
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(stage, Histogram(self._buckets))
+        histogram.observe(duration)
+
+    def _get_request_histogram(self, endpoint):
+        """
+        Get (or create) histogram of request durations of endpoint
+
+        :param endpoint: name of endpoint
+        :type endpoint: str
+        :return: :py:class:`legion.serving.metrics.Histogram`
+        """
+        histogram = self._requests.get(endpoint)
+        if histogram is None:
+            with self._lock:
+                histogram = self._requests.setdefault(endpoint, Histogram(self._buckets))
+        return histogram
+
+    @contextlib.contextmanager
+    def track_request(self, endpoint):
+        """
+        Context of request processing: counts in-flight requests and observes request duration
+
+        :param endpoint: name of endpoint
+        :type endpoint: str
+        :return: None
+        """
+        started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._get_request_histogram(endpoint).observe(time.perf_counter() - started)
+
+    def add_gauge(self, name, description, callback, labels=None):
+        """
+        Add gauge with value collected on render
+
+        :param name: metric name
+        :type name: str
+        :param description: metric description
+        :type description: str
+        :param callback: function that returns current value
+        :type callback: Callable[[], float]
+        :param labels: additional labels
+        :type labels: dict[str, str] or None
+        :return: None
+        """
+        with self._lock:
+            self._gauges.setdefault(name, (description, []))[1].append((dict(labels or {}), callback))
+
+    def _render_histogram(self, lines, name, histogram, labels):
+        """
+        Render histogram samples
+
+        :param lines: output lines
+        :type lines: list[str]
+        :param name: metric name
+        :type name: str
+        :param histogram: histogram
+        :type histogram: :py:class:`legion.serving.metrics.Histogram`
+        :param labels: labels of histogram
+        :type labels: dict[str, str]
+        :return: None
+        """
+        cumulative, total, count = histogram.snapshot()
+        for bound, bucket_count in zip(histogram.buckets + (float('inf'),), cumulative):
+            lines.append('%s_bucket%s %d' % (name, _format_labels(dict(labels, le=_format_value(bound))),
+                                             bucket_count))
+        lines.append('%s_sum%s %s' % (name, _format_labels(labels), _format_value(total)))
+        lines.append('%s_count%s %d' % (name, _format_labels(labels), count))
+
+    def render(self):
+        """
+        Render metrics in Prometheus text format
+
+        :return: str -- metrics
+        """
+        lines = [
+            '# HELP legion_model_stage_duration_seconds Duration of request processing stage',
+            '# TYPE legion_model_stage_duration_seconds histogram',
+        ]
+        for stage, histogram in sorted(self._stages.items()):
+            self._render_histogram(lines, 'legion_model_stage_duration_seconds', histogram,
+                                   dict(self._labels, stage=stage))
+
+        lines.append('# HELP legion_model_request_duration_seconds Duration of request processing')
+        lines.append('# TYPE legion_model_request_duration_seconds histogram')
+        for endpoint, histogram in sorted(self._requests.items()):
+            self._render_histogram(lines, 'legion_model_request_duration_seconds', histogram,
+                                   dict(self._labels, endpoint=endpoint))
+
+        lines.append('# HELP legion_model_requests_in_flight Count of requests in processing')
+        lines.append('# TYPE legion_model_requests_in_flight gauge')
+        lines.append('legion_model_requests_in_flight%s %d' % (_format_labels(self._labels), self.in_flight))
+
+        with self._lock:
+            gauges = sorted(self._gauges.items())
+        for name, (description, samples) in gauges:
+            lines.append('# HELP %s %s' % (name, description))
+            lines.append('# TYPE %s gauge' % name)
+            for labels, callback in samples:
+                lines.append('%s%s %s' % (name, _format_labels(dict(self._labels, **labels)),
+                                          _format_value(callback())))
+
+        return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def _untracked():
+    """
+    Context for requests of server without metrics
+
+    :return: None
+    """
+    yield
+
+
+def track_request(metrics, endpoint):
+    """
+    Build context of request processing
+
+    :param metrics: metrics or None if metrics are disabled
+    :type metrics: :py:class:`legion.serving.metrics.ServingMetrics` or None
+    :param endpoint: name of endpoint
+    :type endpoint: str
+    :return: context manager
+    """
+    return metrics.track_request(endpoint) if metrics else _untracked()
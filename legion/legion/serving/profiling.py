@@ -0,0 +1,225 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Opt-in profiling of model invocations: cProfile results of sampled requests are aggregated
+to collapsed stacks (input format of flamegraph.pl and speedscope)
+"""
+
+import cProfile
+import itertools
+import os
+import threading
+import time
+
+PROFILE_HEADER = 'X-Legion-Profile'
+COLLAPSED_MIME_TYPE = 'text/plain; charset=utf-8'
+
+# Stacks deeper than this are cut, parts of stacks shorter than this in microseconds are not expanded
+MAX_STACK_DEPTH = 64
+MIN_STACK_TIME = 1e-6
+
+TRUNCATED_STACK = '[truncated]'
+
+
+def _frame_name(function):
+    """
+    Build frame name for collapsed stacks
+
+    :param function: pstats function key
+    :type function: tuple[str, int, str]
+    :return: str -- frame name (without stack delimiters)
+    """
+    filename, line, name = function
+    if filename == '~':
+        # Built-in function
+        label = name
+    else:
+        label = '%s (%s:%d)' % (name, os.path.basename(filename), line)
+    return label.replace(';', ',')
+
+
+def collapse_stats(stats):
+    """
+    Convert cProfile stats to collapsed stacks. cProfile keeps caller-callee pairs only,
+    so time of function is split between its call paths in proportion to time of calls from each caller
+
+    :param stats: stats of :py:class:`cProfile.Profile` (after create_stats)
+    :type stats: dict
+    :return: dict[tuple[str], float] -- stack (frame names from root) => self time in seconds
+    """
+    callees = {}
+    roots = []
+    for function, (_, calls, _, total_time, callers) in stats.items():
+        if function[2].startswith("<method 'disable' of '_lsprof.Profiler"):
+            continue
+        if sum(caller_stats[0] for caller_stats in callers.values()) < calls:
+            # Function has been called from code outside of profile (it is profiled function itself):
+            # time of these calls is time of function without time of calls from other profiled functions
+            outside_time = total_time - sum(caller_stats[3] for caller, caller_stats in callers.items()
+                                            if caller != function)
+            roots.append((function, max(0.0, outside_time)))
+        for caller, caller_stats in callers.items():
+            callees.setdefault(caller, []).append((function, caller_stats[3]))
+
+    stacks = {}
+
+    def walk(function, share, path, names):
+        total_time = stats[function][3]
+        if total_time <= 0:
+            return
+
+        names = names + (_frame_name(function),)
+        if len(names) > MAX_STACK_DEPTH:
+            truncated = names[:MAX_STACK_DEPTH - 1] + (TRUNCATED_STACK,)
+            stacks[truncated] = stacks.get(truncated, 0.0) + share
+            return
+
+        own_time = share * min(1.0, stats[function][2] / total_time)
+        for callee, call_time in callees.get(function, ()):
+            callee_share = share * call_time / total_time
+            if callee in path or callee_share < MIN_STACK_TIME:
+                # Recursion and tiny parts are kept in caller
+                own_time += callee_share
+                continue
+            walk(callee, callee_share, path | {callee}, names)
+
+        if own_time > 0:
+            stacks[names] = stacks.get(names, 0.0) + own_time
+
+    for root, share in roots:
+        walk(root, share, frozenset((root,)), ())
+
+    return stacks
+
+
+class RequestProfiler:
+    """
+    Profiler of model invocations. Requests are profiled if they have PROFILE_HEADER
+    (when header_enabled) or if they are every sample_every request.
+    Collapsed stacks are aggregated in windows of window seconds: dump contains
+    current and previous windows. Count of distinct stacks in window is limited by max_stacks
+    """
+
+    def __init__(self, sample_every=0, window=300.0, max_stacks=10000, header_enabled=True):
+        """
+        Build profiler
+
+        :param sample_every: profile every N-th request (0 - only requests with header)
+        :type sample_every: int
+        :param window: aggregation window in seconds
+        :type window: float
+        :param max_stacks: max count of distinct stacks in window (others are added to TRUNCATED_STACK)
+        :type max_stacks: int
+        :param header_enabled: profile requests with PROFILE_HEADER
+        :type header_enabled: bool
+        """
+        self.sample_every = sample_every
+        self.window = window
+        self.max_stacks = max_stacks
+        self.header_enabled = header_enabled
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._window_started = time.time()
+        self._current = {}
+        self._previous = {}
+        self.profiled = 0
+
+    def is_sampled(self, header_value=None):
+        """
+        Decide should request be profiled or not
+
+        :param header_value: value of PROFILE_HEADER of request
+        :type header_value: str or None
+        :return: bool -- decision
+        """
+        if header_value and self.header_enabled and header_value.lower() not in ('0', 'false', 'no'):
+            return True
+        return self.sample_every > 0 and next(self._counter) % self.sample_every == 0
+
+    def _rotate(self, now):
+        """
+        Start new window if current has been finished (lock should be acquired)
+
+        :param now: current time
+        :type now: float
+        :return: None
+        """
+        if now - self._window_started >= self.window:
+            # Previous window is dropped if there were no profiles in whole window
+            self._previous = self._current if now - self._window_started < 2 * self.window else {}
+            self._current = {}
+            self._window_started = now
+
+    def add(self, stacks):
+        """
+        Add collapsed stacks to current window
+
+        :param stacks: stack => time in seconds
+        :type stacks: dict[tuple[str], float]
+        :return: None
+        """
+        with self._lock:
+            self._rotate(time.time())
+            for stack, duration in stacks.items():
+                if stack not in self._current and len(self._current) >= self.max_stacks:
+                    stack = (TRUNCATED_STACK,)
+                self._current[stack] = self._current.get(stack, 0.0) + duration
+            self.profiled += 1
+
+    def profile(self, function, *args, **kwargs):
+        """
+        Call function under cProfile and add its collapsed stacks
+
+        :param function: function (for example, model apply)
+        :type function: Callable
+        :return: result of function
+        """
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(function, *args, **kwargs)
+        finally:
+            profile.create_stats()
+            self.add(collapse_stats(profile.stats))
+
+    def dump(self):
+        """
+        Dump aggregated stacks in collapsed format: "frame;frame;frame microseconds" lines
+
+        :return: str -- collapsed stacks
+        """
+        with self._lock:
+            self._rotate(time.time())
+            stacks = dict(self._previous)
+            for stack, duration in self._current.items():
+                stacks[stack] = stacks.get(stack, 0.0) + duration
+
+        lines = []
+        for stack, duration in sorted(stacks.items()):
+            microseconds = int(round(duration * 1e6))
+            if microseconds > 0:
+                lines.append('%s %d' % (';'.join(stack), microseconds))
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def reset(self):
+        """
+        Drop aggregated stacks
+
+        :return: None
+        """
+        with self._lock:
+            self._current = {}
+            self._previous = {}
+            self._window_started = time.time()
@@ -19,24 +19,38 @@ Flask app
 
 import logging
 import os
+import time
 
-import consul
 import legion.config
 import legion.external.grafana
 import legion.http
 import legion.io
 import legion.model.model as mlmodel
+import legion.serving.batching
+import legion.serving.cache
+import legion.serving.executors
+import legion.serving.metrics
+import legion.serving.profiling
+import legion.serving.request_log
+import legion.serving.warmup
 import legion.utils as utils
-from flask import Flask, Blueprint, request, jsonify, redirect
+from flask import Flask, Blueprint, Response, request, jsonify, redirect, abort
 from flask import current_app as app
 
+consul = utils.lazy_import('consul')
+
 LOGGER = logging.getLogger(__name__)
 blueprint = Blueprint('pyserve', __name__)
 
 SERVE_ROOT = '/'
 SERVE_INFO = '/api/model/{model_id}/info'
 SERVE_INVOKE = '/api/model/{model_id}/invoke'
+SERVE_BATCH = '/api/model/{model_id}/batch'
+SERVE_CACHE = '/api/model/{model_id}/cache'
 SERVE_HEALTH_CHECK = '/healthcheck'
+SERVE_READY = '/ready'
+SERVE_METRICS = '/metrics'
+SERVE_PROFILE = '/profile'
 
 
 @blueprint.route(SERVE_ROOT)
@@ -78,25 +92,241 @@ def model_invoke(model_id):
     if model_id != app.config['MODEL_ID']:
         raise Exception('Invalid model handler: {}, not {}'.format(app.config['MODEL_ID'], model_id))
 
-    input_dict = legion.http.parse_request(request)
+    started = time.perf_counter()
+    with legion.serving.metrics.track_request(app.config.get('metrics'), 'invoke'):
+        input_dict = legion.http.parse_request(request)
+        observe_stage(app, legion.serving.metrics.STAGE_PARSE_REQUEST, started)
 
-    model = app.config['model']
+        batcher = app.config.get('batcher')
+        apply = batcher.apply if batcher else app.config['model'].apply
+
+        prediction_cache = app.config.get('prediction_cache')
+        if is_profiled(app):
+            # Model is called directly (without cache and micro batching) to profile its code
+            output = app.config['profiler'].profile(app.config['model'].apply, input_dict)
+        elif prediction_cache:
+            output = prediction_cache.apply(input_dict, apply)
+        else:
+            output = apply(input_dict)
+
+        serialization_started = time.perf_counter()
+        response = legion.http.prepare_response(output, request.headers.get('Accept'))
+        observe_stage(app, legion.serving.metrics.STAGE_SERIALIZE, serialization_started)
+
+        log_request(app, 'invoke', input_dict, output, started)
+        return response
+
+
+@blueprint.route(SERVE_BATCH.format(model_id='<model_id>'), methods=['POST'])
+def model_batch(model_id):
+    """
+    Call model for calculation of many rows (JSON array of rows or JSON object of columns)
+
+    :param model_id: model name
+    :type model_id: str
+    :return: :py:class:`Flask.Response` -- result of calculation
+    """
+    if model_id != app.config['MODEL_ID']:
+        raise Exception('Invalid model handler: {}, not {}'.format(app.config['MODEL_ID'], model_id))
+
+    started = time.perf_counter()
+    with legion.serving.metrics.track_request(app.config.get('metrics'), 'batch'):
+        input_columns = legion.http.parse_batch_request(request)
+        observe_stage(app, legion.serving.metrics.STAGE_PARSE_REQUEST, started)
+
+        model = app.config['model']
+
+        if is_profiled(app):
+            output = app.config['profiler'].profile(model.apply_batch, input_columns)
+        else:
+            output = model.apply_batch(input_columns)
+
+        serialization_started = time.perf_counter()
+        response = legion.http.prepare_response(output, request.headers.get('Accept'))
+        observe_stage(app, legion.serving.metrics.STAGE_SERIALIZE, serialization_started)
+
+        log_request(app, 'batch', input_columns, output, started)
+        return response
 
-    output = model.apply(input_dict)
 
-    return legion.http.prepare_response(output)
+@blueprint.route(SERVE_CACHE.format(model_id='<model_id>'))
+def model_cache(model_id):
+    """
+    Get statistics of prediction cache
+
+    :param model_id: model name
+    :type model_id: str
+    :return: :py:class:`Flask.Response` -- cache statistics
+    """
+    if model_id != app.config['MODEL_ID']:
+        raise Exception('Invalid model handler: {}, not {}'.format(app.config['MODEL_ID'], model_id))
+
+    return jsonify(get_cache_statistics(app))
 
 
 @blueprint.route(SERVE_HEALTH_CHECK)
 def healthcheck():
     """
-    Check that model is OK
+    Check that model is OK (liveness)
 
     :return: str -- status string
     """
     return 'OK'
 
 
+def observe_stage(application, stage, started):
+    """
+    Add duration of request processing stage to metrics (if they are enabled)
+
+    :param application: Flask app instance
+    :type application: :py:class:`Flask.app`
+    :param stage: name of stage
+    :type stage: str
+    :param started: time of stage start (time.perf_counter)
+    :type started: float
+    :return: None
+    """
+    serving_metrics = application.config.get('metrics')
+    if serving_metrics:
+        serving_metrics.observe_stage(stage, time.perf_counter() - started)
+
+
+def build_metrics(application):
+    """
+    Build metrics of model server and attach them to model and micro batcher
+
+    :param application: Flask app instance with model
+    :type application: :py:class:`Flask.app`
+    :return: :py:class:`legion.serving.metrics.ServingMetrics` -- metrics
+    """
+    model = application.config['model']
+    serving_metrics = legion.serving.metrics.ServingMetrics({
+        'model_id': application.config['MODEL_ID'],
+        'model_version': getattr(model, 'version_string', None) or 'unknown'
+    })
+
+    if hasattr(model, 'stage_observer'):
+        def observe_stage(stage, duration):
+            # Model calls of background warm-up are not requests
+            if not legion.serving.warmup.is_warming_up():
+                serving_metrics.observe_stage(stage, duration)
+
+        model.stage_observer = observe_stage
+
+    batcher = application.config.get('batcher')
+    if batcher:
+        serving_metrics.add_gauge('legion_model_queue_depth', 'Count of invocations waiting for model',
+                                  lambda: batcher.queue_size, {'queue': 'batcher'})
+
+    return serving_metrics
+
+
+def log_request(application, endpoint, input_data, output, started):
+    """
+    Log request with sampled request logger (if it is enabled)
+
+    :param application: Flask app instance
+    :type application: :py:class:`Flask.app`
+    :param endpoint: name of endpoint
+    :type endpoint: str
+    :param input_data: parsed input of request
+    :type input_data: dict
+    :param output: model result
+    :type output: any
+    :param started: time of request start (time.perf_counter)
+    :type started: float
+    :return: None
+    """
+    request_logger = application.config.get('request_logger')
+    if request_logger:
+        request_logger.log(endpoint, input_data, output, time.perf_counter() - started)
+
+
+def is_profiled(application):
+    """
+    Decide should current request be profiled (profiling is enabled and request is sampled or has profile header)
+
+    :param application: Flask app instance
+    :type application: :py:class:`Flask.app`
+    :return: bool -- decision
+    """
+    profiler = application.config.get('profiler')
+    return bool(profiler) and profiler.is_sampled(request.headers.get(legion.serving.profiling.PROFILE_HEADER))
+
+
+def get_cache_statistics(application):
+    """
+    Get statistics of prediction cache
+
+    :param application: Flask application instance
+    :type application: :py:class:`Flask.app`
+    :return: dict[str, any] -- statistics (hits, misses, evictions, etc.)
+    """
+    prediction_cache = application.config.get('prediction_cache')
+    if not prediction_cache:
+        return {'enabled': False}
+
+    statistics = prediction_cache.statistics
+    statistics['enabled'] = True
+    return statistics
+
+
+def is_ready(application):
+    """
+    Check that model has been warmed up
+
+    :param application: Flask application instance
+    :type application: :py:class:`Flask.app`
+    :return: bool -- is model ready
+    """
+    warm_up = application.config.get('warm_up')
+    return warm_up is None or warm_up.ready
+
+
+@blueprint.route(SERVE_READY)
+def ready():
+    """
+    Check that model is ready for requests (readiness)
+
+    :return: tuple[str, int] -- status string and HTTP code
+    """
+    if not is_ready(app):
+        return 'Warming up', 503
+
+    return 'OK'
+
+
+@blueprint.route(SERVE_METRICS)
+def metrics():
+    """
+    Get metrics of model server process in Prometheus text format
+
+    :return: :py:class:`Flask.Response` -- metrics
+    """
+    serving_metrics = app.config.get('metrics')
+    if not serving_metrics:
+        abort(404)
+
+    return Response(serving_metrics.render(), mimetype=legion.serving.metrics.PROMETHEUS_MIME_TYPE)
+
+
+@blueprint.route(SERVE_PROFILE, methods=['GET', 'DELETE'])
+def profile():
+    """
+    Get collapsed stacks of profiled requests (input of flamegraph.pl) or drop them (DELETE)
+
+    :return: :py:class:`Flask.Response` -- collapsed stacks
+    """
+    profiler = app.config.get('profiler')
+    if not profiler:
+        abort(404)
+
+    if request.method == 'DELETE':
+        profiler.reset()
+
+    return Response(profiler.dump(), mimetype=legion.serving.profiling.COLLAPSED_MIME_TYPE)
+
+
 def init_model(application):
     """
     Load model from app configuration
@@ -153,7 +383,7 @@ def register_service(application):
         address=addr,
         port=port,
         tags=['legion', 'model'],
-        check=consul.Check.http('http://%s:%d/healthcheck' % (addr, port), '2s')
+        check=consul.Check.http('http://%s:%d%s' % (addr, port, SERVE_READY), '2s')
     )
 
 
@@ -174,7 +404,31 @@ def register_dashboard(application):
     client.create_dashboard_for_model(application.config['MODEL_ID'])
 
 
-def init_application(args=None):
+def build_prediction_cache(application):
+    """
+    Build prediction cache from application configuration: shared by worker processes
+    if PREDICTION_CACHE_SHARED_FILE is set or in-process otherwise
+
+    :param application: Flask application instance
+    :type application: :py:class:`Flask.app`
+    :return: :py:class:`legion.serving.cache.BasePredictionCache` -- cache
+    """
+    max_entries = int(application.config['PREDICTION_CACHE_MAX_ENTRIES'])
+    ttl = float(application.config['PREDICTION_CACHE_TTL'])
+    max_memory = int(application.config['PREDICTION_CACHE_MAX_MEMORY'])
+
+    shared_file = application.config['PREDICTION_CACHE_SHARED_FILE']
+    if not shared_file:
+        return legion.serving.cache.PredictionCache(max_entries, ttl, max_memory)
+
+    slot_size = int(application.config['PREDICTION_CACHE_SLOT_SIZE'])
+    namespace = '%s:%s' % (application.config['MODEL_ID'], application.config['model'].version_string)
+    LOGGER.info('Using shared prediction cache %s', shared_file)
+    return legion.serving.cache.SharedPredictionCache(shared_file, min(max_entries, max_memory // slot_size),
+                                                      slot_size, ttl, namespace)
+
+
+def init_application(args=None, build_executor=False):
     """
     Initialize configured Flask application instance, register application on consul
     Overall configuration priority: config_default.py, env::FLASK_APP_SETTINGS_FILES file,
@@ -182,6 +436,8 @@ def init_application(args=None):
 
     :param args: arguments if provided
     :type args: :py:class:`argparse.Namespace` or None
+    :param build_executor: build model executor of aiohttp server (before background threads are started)
+    :type build_executor: bool
     :return: :py:class:`Flask.app` -- application instance
     """
     application = create_application()
@@ -196,6 +452,62 @@ def init_application(args=None):
     # Put a model object into application configuration
     application.config['model'] = init_model(application)
 
+    # Coalesce concurrent invocations of vectorized models into batches if enabled
+    if application.config['MICRO_BATCHING_ENABLED']:
+        if getattr(application.config['model'], 'vectorized', False):
+            application.config['batcher'] = legion.serving.batching.MicroBatcher(
+                application.config['model'],
+                int(application.config['MICRO_BATCHING_MAX_SIZE']),
+                float(application.config['MICRO_BATCHING_MAX_DELAY'])
+            )
+        else:
+            LOGGER.warning('Micro batching has been disabled: model is not marked as vectorized')
+
+    # Warm model up with synthetic inputs if enabled (model is ready after warm-up)
+    if application.config['WARM_UP_ENABLED']:
+        application.config['warm_up'] = legion.serving.warmup.ModelWarmUp(
+            application.config['model'],
+            int(application.config['WARM_UP_MIN_ITERATIONS']),
+            int(application.config['WARM_UP_MAX_ITERATIONS']),
+            float(application.config['WARM_UP_SETTLE_RATIO'])
+        )
+
+    # Fork scoring workers (after warm-up in this thread) before any background thread is started
+    if build_executor:
+        application.config['executor'] = legion.serving.executors.build_model_executor(application)
+
+    # Collect in-process metrics of request processing if enabled
+    if application.config['SERVING_METRICS_ENABLED']:
+        application.config['metrics'] = build_metrics(application)
+
+    # Cache results of deterministic models if enabled
+    if application.config['PREDICTION_CACHE_ENABLED']:
+        if getattr(application.config['model'], 'deterministic', False):
+            application.config['prediction_cache'] = build_prediction_cache(application)
+        else:
+            LOGGER.warning('Prediction cache has been disabled: model is not marked as deterministic')
+
+    # Profile sampled requests and requests with profile header if enabled
+    if application.config['PROFILING_ENABLED']:
+        application.config['profiler'] = legion.serving.profiling.RequestProfiler(
+            int(application.config['PROFILING_SAMPLE_EVERY']),
+            float(application.config['PROFILING_WINDOW']),
+            int(application.config['PROFILING_MAX_STACKS'])
+        )
+
+    # Log sampled requests in background if enabled
+    if float(application.config['REQUEST_LOG_SAMPLE_RATE']) > 0:
+        application.config['request_logger'] = legion.serving.request_log.RequestLogger(
+            float(application.config['REQUEST_LOG_SAMPLE_RATE']),
+            int(application.config['REQUEST_LOG_MAX_PAYLOAD_SIZE']),
+            int(application.config['REQUEST_LOG_QUEUE_SIZE'])
+        )
+
+    # Warm model up in background if it has not been warmed up before fork of scoring workers
+    warm_up = application.config.get('warm_up')
+    if warm_up and not warm_up.ready:
+        warm_up.start()
+
     # Register instance on Consul
     if application.config['REGISTER_ON_CONSUL']:
         register_service(application)
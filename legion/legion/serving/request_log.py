@@ -0,0 +1,217 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Sampled request logging of model API (records are written by background thread)
+"""
+
+import json
+import logging
+import queue
+import random
+import reprlib
+import threading
+import time
+
+REQUEST_LOGGER_NAME = 'legion.requests'
+
+
+class PayloadRepr(reprlib.Repr):
+    """
+    Bounded representation of request and response payloads (arrays and DataFrames are summarized)
+    """
+
+    def __init__(self, max_size):
+        """
+        Build representation
+
+        :param max_size: max length of representation
+        :type max_size: int
+        """
+        super(PayloadRepr, self).__init__()
+        self.max_size = max_size
+        self.maxstring = max_size
+        self.maxother = max_size
+        self.maxlong = max_size
+        self.maxdict = 32
+        self.maxlist = 32
+        self.maxtuple = 32
+
+    def repr_bytes(self, value, level):
+        """
+        Represent bytes by its size (for example, image)
+        """
+        return '<%d bytes>' % len(value)
+
+    def repr_ndarray(self, value, level):
+        """
+        Represent NumPy array by dtype, shape and first values
+        """
+        return 'array(dtype=%s, shape=%s, values=%s)' % (value.dtype, value.shape,
+                                                         self.repr1(value.reshape(-1)[:self.maxlist].tolist(), level))
+
+    def repr_Series(self, value, level):
+        """
+        Represent pandas Series by name, length and first values
+        """
+        return 'Series(name=%r, length=%d, values=%s)' % (value.name, len(value),
+                                                          self.repr1(value.iloc[:self.maxlist].tolist(), level))
+
+    def repr_DataFrame(self, value, level):
+        """
+        Represent pandas DataFrame by shape and columns
+        """
+        return 'DataFrame(shape=%s, columns=%s)' % (value.shape, self.repr1(list(value.columns), level))
+
+    def truncate(self, value):
+        """
+        Build bounded representation of value
+
+        :param value: value
+        :type value: any
+        :return: str -- representation not longer than max size
+        """
+        representation = self.repr(value)
+        if len(representation) > self.max_size:
+            representation = representation[:max(0, self.max_size - 3)] + '...'
+        return representation
+
+
+class RequestLogger:
+    """
+    Logger of sampled model requests. Requests are sampled with sample_rate probability,
+    payloads are truncated to max_payload_size and records are put in bounded queue.
+    Records are written as JSON by background thread to REQUEST_LOGGER_NAME logger,
+    records are dropped if queue is full (request processing is never blocked)
+    """
+
+    def __init__(self, sample_rate=0.0, max_payload_size=1024, queue_size=1000, logger=None):
+        """
+        Build request logger
+
+        :param sample_rate: probability of request logging (0 - disabled, 1 - all requests)
+        :type sample_rate: float
+        :param max_payload_size: max length of request and response representations
+        :type max_payload_size: int
+        :param queue_size: max count of records waiting for write
+        :type queue_size: int
+        :param logger: target logger (default: REQUEST_LOGGER_NAME logger)
+        :type logger: :py:class:`logging.Logger` or None
+        """
+        self.sample_rate = sample_rate
+        self._repr = PayloadRepr(max_payload_size)
+        self._queue = queue.Queue(queue_size)
+        self._logger = logger or logging.getLogger(REQUEST_LOGGER_NAME)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.logged = 0
+        self.dropped = 0
+
+    def is_sampled(self):
+        """
+        Decide should request be logged or not
+
+        :return: bool -- decision
+        """
+        return self.sample_rate >= 1.0 or (self.sample_rate > 0.0 and random.random() < self.sample_rate)
+
+    def _start(self):
+        """
+        Start writing thread if it is not alive (for example, after fork of worker process)
+
+        :return: None
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-logger', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """
+        Write records from queue until stop record (None)
+
+        :return: None
+        """
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    return
+                self._logger.info(json.dumps(record, separators=(',', ':')))
+                self.logged += 1
+            except Exception as write_exception:
+                logging.getLogger(__name__).warning('Request record has not been written: %s', write_exception)
+            finally:
+                self._queue.task_done()
+
+    def log(self, endpoint, request, response, duration, status=200):
+        """
+        Log request if it is sampled
+
+        :param endpoint: name of endpoint
+        :type endpoint: str
+        :param request: request payload (input vector or columns)
+        :type request: any
+        :param response: response payload (model result)
+        :type response: any
+        :param duration: duration of request processing in seconds
+        :type duration: float
+        :param status: HTTP status
+        :type status: int
+        :return: bool -- is request put in queue
+        """
+        if not self.is_sampled():
+            return False
+
+        record = {
+            'time': time.time(),
+            'endpoint': endpoint,
+            'status': status,
+            'duration_ms': round(duration * 1000, 3),
+            'request': self._repr.truncate(request),
+            'response': self._repr.truncate(response),
+        }
+
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        return True
+
+    def flush(self):
+        """
+        Wait until all queued records are written
+
+        :return: None
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self, timeout=None):
+        """
+        Write queued records and stop writing thread
+
+        :param timeout: timeout of thread join in seconds
+        :type timeout: float or None
+        :return: None
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
@@ -0,0 +1,190 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Model warm-up with synthetic inputs (readiness of model)
+"""
+
+import io
+import logging
+import threading
+import time
+
+import legion.model.types
+
+LOGGER = logging.getLogger(__name__)
+
+# State of current thread: warm-up flag
+_thread_state = threading.local()
+
+# Native class of column type => synthetic value (as it comes in HTTP request)
+SYNTHETIC_NATIVE_VALUES = {
+    int: '1',
+    float: '1.0',
+    str: 'a',
+}
+
+
+def is_warming_up():
+    """
+    Check that model is called by warm-up in current thread (such calls should not be counted as requests)
+
+    :return: bool -- check result
+    """
+    return getattr(_thread_state, 'warming_up', False)
+
+
+def _build_synthetic_image():
+    """
+    Build 1x1 PNG image
+
+    :return: bytes -- image file content
+    """
+    buffer = io.BytesIO()
+    legion.model.types.PYTHON_Image.new('RGB', (1, 1)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def build_synthetic_input(column_types):
+    """
+    Build input vector with synthetic value for each column
+
+    :param column_types: column name => column information
+    :type column_types: dict[str, :py:class:`legion.model.types.ColumnInformation`]
+    :return: dict[str, union[str, bytes]] or None -- input vector or None if column has unknown type
+    """
+    input_vector = {}
+
+    for column_name, column_information in column_types.items():
+        representation_type = column_information.representation_type
+
+        if isinstance(representation_type, legion.model.types._Bool):
+            input_vector[column_name] = 'true'
+        elif isinstance(representation_type, legion.model.types._Image):
+            input_vector[column_name] = _build_synthetic_image()
+        elif representation_type.native_class in SYNTHETIC_NATIVE_VALUES:
+            input_vector[column_name] = SYNTHETIC_NATIVE_VALUES[representation_type.native_class]
+        else:
+            return None
+
+    return input_vector
+
+
+class ModelWarmUp:
+    """
+    Warm-up that applies model to synthetic input until latencies settle: last min_iterations latencies
+    differ no more than settle_ratio times (or max_iterations is reached). Model is ready after warm-up
+    """
+
+    def __init__(self, model, min_iterations=3, max_iterations=50, settle_ratio=1.5):
+        """
+        Build warm-up
+
+        :param model: model
+        :type model: :py:class:`legion.model.model.IMLModel`
+        :param min_iterations: count of latest latencies that should settle
+        :type min_iterations: int
+        :param max_iterations: max count of model applications
+        :type max_iterations: int
+        :param settle_ratio: max ratio of max and min latencies in settled window
+        :type settle_ratio: float
+        """
+        self._model = model
+        self._min_iterations = max(1, min_iterations)
+        self._max_iterations = max(self._min_iterations, max_iterations)
+        self._settle_ratio = settle_ratio
+        self._ready = threading.Event()
+        self._thread = None
+        self.latencies = []
+
+    @property
+    def ready(self):
+        """
+        Check that warm-up has been finished
+
+        :return: bool -- is model ready
+        """
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for end of warm-up
+
+        :param timeout: timeout in seconds or None
+        :type timeout: float or None
+        :return: bool -- is model ready
+        """
+        return self._ready.wait(timeout)
+
+    def _is_settled(self):
+        """
+        Check that latest latencies are settled
+
+        :return: bool -- check result
+        """
+        if len(self.latencies) < self._min_iterations:
+            return False
+
+        window = self.latencies[-self._min_iterations:]
+        return max(window) <= min(window) * self._settle_ratio
+
+    def run(self):
+        """
+        Run warm-up in current thread
+
+        :return: None
+        """
+        _thread_state.warming_up = True
+        try:
+            column_types = getattr(self._model, 'column_types', None)
+            input_vector = build_synthetic_input(column_types) if column_types else None
+
+            if input_vector is None:
+                LOGGER.info('Warm-up has been skipped: model has no columns with known types')
+                return
+
+            while len(self.latencies) < self._max_iterations and not self._is_settled():
+                started = time.perf_counter()
+                self._model.apply(input_vector)
+                self.latencies.append(time.perf_counter() - started)
+
+            LOGGER.info('Model has been warmed up in %d iterations, latencies (ms): %s', len(self.latencies),
+                        ', '.join('%.2f' % (latency * 1000) for latency in self.latencies))
+        except Exception as warm_up_exception:
+            LOGGER.warning('Warm-up has been stopped by exception: %s', warm_up_exception)
+        finally:
+            _thread_state.warming_up = False
+            self._ready.set()
+
+    def complete(self):
+        """
+        Run warm-up in current thread if it has not been started, otherwise wait for end of warm-up
+
+        :return: None
+        """
+        if self._thread is None and not self.ready:
+            self.run()
+        else:
+            self.wait()
+
+    def start(self):
+        """
+        Run warm-up in background thread
+
+        :return: :py:class:`legion.serving.warmup.ModelWarmUp` -- self
+        """
+        self._thread = threading.Thread(target=self.run, name='model-warm-up', daemon=True)
+        self._thread.start()
+        return self
@@ -17,6 +17,12 @@
 legion utils functional
 """
 
+import collections
+import concurrent.futures
+import hashlib
+import importlib.util
+import io
+import logging
 import os
 import re
 import shutil
@@ -24,13 +30,45 @@ import socket
 import subprocess
 import sys
 import tempfile
+import threading
+import time
 
 import legion.config
 
-import docker
-import requests
-import requests.auth
-from jinja2 import Environment, PackageLoader, select_autoescape
+LOGGER = logging.getLogger(__name__)
+
+
+def lazy_import(name):
+    """
+    Import module on first access to its attributes (for heavy modules that are not needed by every command)
+
+    :param name: full name of module, for example legion.io
+    :type name: str
+    :return: module (loaded or lazy)
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError('No module named %r' % name, name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    parent_name, _, child_name = name.rpartition('.')
+    if parent_name:
+        setattr(sys.modules[parent_name], child_name, module)
+
+    return module
+
+
+jinja2 = lazy_import('jinja2')
+requests = lazy_import('requests')
 
 
 def render_template(template_name, values=None):
@@ -40,9 +78,9 @@ def render_template(template_name, values=None):
     :param values: dict template variables or None
     :return: str rendered template
     """
-    env = Environment(
-        loader=PackageLoader(__name__, 'templates'),
-        autoescape=select_autoescape(['tmpl'])
+    env = jinja2.Environment(
+        loader=jinja2.PackageLoader(__name__, 'templates'),
+        autoescape=jinja2.select_autoescape(['tmpl'])
     )
 
     if not values:
@@ -275,6 +313,272 @@ def _get_auth_credentials_for_external_resource():
     return None
 
 
+class UploadStatistics:
+    """
+    Statistics of file upload
+    """
+
+    def __init__(self, size):
+        """
+        Create statistics
+
+        :param size: size of uploaded file in bytes
+        :type size: int
+        """
+        self.size = size
+        self.parts = 0
+        self.retries = 0
+        self.seconds = 0.0
+        self.sha256 = None
+        self._lock = threading.Lock()
+
+    def add_retry(self):
+        """
+        Count retry of request (parts are uploaded from several threads)
+
+        :return: None
+        """
+        with self._lock:
+            self.retries += 1
+
+    @property
+    def throughput(self):
+        """
+        Get upload throughput
+
+        :return: float -- bytes per second
+        """
+        return self.size / self.seconds if self.seconds else 0.0
+
+
+class _UploadStream:
+    """
+    Read-only stream of file for requests body. Calculates SHA256 of data that has been read
+    """
+
+    def __init__(self, file, size):
+        """
+        Create stream
+
+        :param file: source file
+        :type file: file-like object
+        :param size: size of file
+        :type size: int
+        """
+        self._file = file
+        self._size = size
+        self.hash = hashlib.sha256()
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(lambda: self.read(1024 * 1024), b'')
+
+    def read(self, size=-1):
+        """
+        Read data from file
+
+        :param size: max count of bytes
+        :type size: int
+        :return: bytes -- data
+        """
+        data = self._file.read(size)
+        self.hash.update(data)
+        return data
+
+
+def _put_with_retries(session, url, retries, statistics, build_body, headers=None):
+    """
+    Send PUT request, retry on connection errors and 5xx responses
+
+    :param session: session
+    :type session: :py:class:`requests.Session`
+    :param url: target URL
+    :type url: str
+    :param retries: count of retries
+    :type retries: int
+    :param statistics: upload statistics (retries counter is updated)
+    :type statistics: :py:class:`legion.utils.UploadStatistics`
+    :param build_body: function that opens request body (called for each attempt)
+    :type build_body: Callable[[], any]
+    :param headers: request headers
+    :type headers: dict[str, str] or None
+    :return: :py:class:`requests.Response` -- response
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = session.put(url, data=build_body(), headers=headers,
+                                   auth=_get_auth_credentials_for_external_resource())
+            if response.status_code < 500 or attempt == retries:
+                break
+        except requests.exceptions.ConnectionError:
+            if attempt == retries:
+                raise
+
+        statistics.add_retry()
+        time.sleep(0.1 * 2 ** attempt)
+
+    if response.status_code >= 400:
+        raise Exception('Wrong status code %d returned for url %s' % (response.status_code, url))
+
+    return response
+
+
+def upload_file(local_file, url, part_size=None, threads=None, retries=None):
+    """
+    Upload local file to URL with streamed PUT request. If part size is set, files larger than part size
+    are uploaded with parallel PUT requests of parts (with Content-Range header). PUT with Content-Range
+    is not supported by all servers, so if size of uploaded resource differs from size of file, file is
+    uploaded again with one streamed PUT request. Failed requests are retried, size (Content-Length) and
+    checksum (X-Checksum-Sha256) of uploaded resource are verified if server provides them
+
+    :param local_file: path to file on local machine
+    :type local_file: str
+    :param url: target URL
+    :type url: str
+    :param part_size: size of part in bytes, 0 for upload in one request (EXTERNAL_RESOURCE_UPLOAD_PART_SIZE)
+    :type part_size: int or None
+    :param threads: count of parallel part uploads (EXTERNAL_RESOURCE_UPLOAD_THREADS)
+    :type threads: int or None
+    :param retries: count of retries of one request (EXTERNAL_RESOURCE_UPLOAD_RETRIES)
+    :type retries: int or None
+    :return: :py:class:`legion.utils.UploadStatistics` -- upload statistics
+    """
+    if part_size is None:
+        part_size = int(os.getenv(*legion.config.EXTERNAL_RESOURCE_UPLOAD_PART_SIZE))
+    if threads is None:
+        threads = int(os.getenv(*legion.config.EXTERNAL_RESOURCE_UPLOAD_THREADS))
+    if retries is None:
+        retries = int(os.getenv(*legion.config.EXTERNAL_RESOURCE_UPLOAD_RETRIES))
+
+    size = os.path.getsize(local_file)
+    statistics = UploadStatistics(size)
+    started = time.time()
+
+    with requests.Session() as session:
+        if part_size and size > part_size:
+            statistics.sha256 = _upload_parts(local_file, url, size, part_size, threads, retries, statistics)
+            remote_size, _ = _get_remote_size_and_checksum(session, url)
+            if remote_size is not None and remote_size != size:
+                LOGGER.warning('Size of %s after upload of parts is %d instead of %d (server does not support '
+                               'PUT with Content-Range), uploading in one request', url, remote_size, size)
+                _upload_stream(session, local_file, url, size, retries, statistics)
+        else:
+            _upload_stream(session, local_file, url, size, retries, statistics)
+
+        remote_size, remote_checksum = _get_remote_size_and_checksum(session, url)
+        if remote_size is not None and remote_size != size:
+            raise Exception('Size mismatch for url %s: %d (local %d)' % (url, remote_size, size))
+        if remote_checksum and remote_checksum.lower() != statistics.sha256:
+            raise Exception('Checksum mismatch for url %s: %s (local %s)' % (url, remote_checksum, statistics.sha256))
+
+    statistics.seconds = time.time() - started
+    LOGGER.info('Uploaded %d bytes to %s in %d parts (%d retries) in %.3f s (%.1f KiB/s)',
+                size, url, statistics.parts, statistics.retries, statistics.seconds, statistics.throughput / 1024)
+    return statistics
+
+
+def _upload_stream(session, local_file, url, size, retries, statistics):
+    """
+    Upload local file with one streamed PUT request
+
+    :param session: session
+    :type session: :py:class:`requests.Session`
+    :param local_file: path to file on local machine
+    :type local_file: str
+    :param url: target URL
+    :type url: str
+    :param size: size of file
+    :type size: int
+    :param retries: count of retries
+    :type retries: int
+    :param statistics: upload statistics (parts count and SHA256 are set)
+    :type statistics: :py:class:`legion.utils.UploadStatistics`
+    :return: None
+    """
+    with open(local_file, 'rb') as file:
+        streams = []
+
+        def build_body():
+            file.seek(0)
+            streams.append(_UploadStream(file, size))
+            return streams[-1]
+
+        _put_with_retries(session, url, retries, statistics, build_body)
+
+    statistics.parts = 1
+    statistics.sha256 = streams[-1].hash.hexdigest()
+
+
+def _get_remote_size_and_checksum(session, url):
+    """
+    Get size (Content-Length) and checksum (X-Checksum-Sha256) of uploaded resource with HEAD request
+
+    :param session: session
+    :type session: :py:class:`requests.Session`
+    :param url: URL of resource
+    :type url: str
+    :return: tuple[int or None, str or None] -- size and checksum, None if server does not provide them
+    """
+    response = session.head(url, auth=_get_auth_credentials_for_external_resource())
+    if response.status_code >= 400:
+        return None, None
+
+    content_length = response.headers.get('Content-Length')
+    remote_size = int(content_length) if content_length and content_length.isdigit() else None
+    return remote_size, response.headers.get('X-Checksum-Sha256')
+
+
+def _upload_parts(local_file, url, size, part_size, threads, retries, statistics):
+    """
+    Upload parts of local file with parallel PUT requests with Content-Range header
+
+    :param local_file: path to file on local machine
+    :type local_file: str
+    :param url: target URL
+    :type url: str
+    :param size: size of file
+    :type size: int
+    :param part_size: size of part in bytes
+    :type part_size: int
+    :param threads: count of parallel uploads
+    :type threads: int
+    :param retries: count of retries of one part
+    :type retries: int
+    :param statistics: upload statistics
+    :type statistics: :py:class:`legion.utils.UploadStatistics`
+    :return: str -- SHA256 of file
+    """
+    sessions = threading.local()
+
+    def upload_part(start):
+        if not hasattr(sessions, 'session'):
+            sessions.session = requests.Session()
+
+        with open(local_file, 'rb') as file:
+            file.seek(start)
+            data = file.read(part_size)
+
+        headers = {'Content-Range': 'bytes %d-%d/%d' % (start, start + len(data) - 1, size)}
+        _put_with_retries(sessions.session, url, retries, statistics, lambda: data, headers)
+        return data
+
+    file_hash = hashlib.sha256()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        # Parts are hashed in order of results, memory is limited by count of submitted parts
+        futures = collections.deque()
+        for start in range(0, size, part_size):
+            futures.append(pool.submit(upload_part, start))
+            if len(futures) >= threads * 2:
+                file_hash.update(futures.popleft().result())
+        while futures:
+            file_hash.update(futures.popleft().result())
+
+    statistics.parts = (size + part_size - 1) // part_size
+    return file_hash.hexdigest()
+
+
 def save_file(temp_file, target_file, remove_after_delete=False):
     """
     Upload local file to external resource
@@ -294,15 +598,7 @@ def save_file(temp_file, target_file, remove_after_delete=False):
             result_path = target_file
         else:
             url = normalize_external_resource_path(target_file)
-
-            with open(temp_file, 'rb') as file:
-                auth = _get_auth_credentials_for_external_resource()
-                response = requests.put(url,
-                                        data=file,
-                                        auth=auth)
-                if response.status_code >= 400:
-                    raise Exception('Wrong status code %d returned for url %s' % (response.status_code, url))
-
+            upload_file(temp_file, url)
             result_path = url
 
     finally:
@@ -312,9 +608,314 @@ def save_file(temp_file, target_file, remove_after_delete=False):
     return result_path
 
 
+class DownloadCache:
+    """
+    Content-addressed cache of downloaded files (key is built from URL and ETag) with LRU eviction
+    """
+
+    PARTIAL_SUFFIX = '.part'
+    CHUNKS_SUFFIX = '.chunks'
+
+    def __init__(self, directory, max_size):
+        """
+        Create cache
+
+        :param directory: cache directory (created if not exists)
+        :type directory: str
+        :param max_size: max total size of cached files in bytes
+        :type max_size: int
+        """
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def build_key(url, etag=None, last_modified=None, size=None):
+        """
+        Build cache key of resource version
+
+        :param url: URL of resource
+        :type url: str
+        :param etag: ETag of resource
+        :type etag: str or None
+        :param last_modified: Last-Modified header of resource (used if there is no ETag)
+        :type last_modified: str or None
+        :param size: size of resource (used if there is no ETag)
+        :type size: int or None
+        :return: str or None -- key or None if resource version cannot be identified
+        """
+        if etag:
+            version = 'etag:' + etag
+        elif last_modified and size is not None:
+            version = 'modified:%s:%d' % (last_modified, size)
+        else:
+            return None
+
+        return hashlib.sha256(('%s\n%s' % (url, version)).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        """
+        Get path of cached file
+
+        :param key: cache key
+        :type key: str
+        :return: str -- path
+        """
+        return os.path.join(self.directory, key)
+
+    def partial_path(self, key):
+        """
+        Get path of partial file of this process (parallel downloads of one file do not share partial file).
+        Partial file of finished process of this host is taken over, so its download is resumed
+
+        :param key: cache key
+        :type key: str
+        :return: str -- path
+        """
+        prefix = '%s.%s-' % (key, socket.gethostname())
+        path = os.path.join(self.directory, '%s%d%s' % (prefix, os.getpid(), self.PARTIAL_SUFFIX))
+        if os.path.exists(path):
+            return path
+
+        for name in os.listdir(self.directory):
+            if not name.startswith(prefix) or not name.endswith(self.PARTIAL_SUFFIX):
+                continue
+            pid = name[len(prefix):-len(self.PARTIAL_SUFFIX)]
+            if not pid.isdigit() or _is_process_running(int(pid)):
+                continue
+
+            orphan_path = os.path.join(self.directory, name)
+            try:
+                os.rename(orphan_path, path)
+            except FileNotFoundError:
+                # Partial file has been taken over by other process
+                continue
+            if os.path.exists(orphan_path + self.CHUNKS_SUFFIX):
+                os.replace(orphan_path + self.CHUNKS_SUFFIX, path + self.CHUNKS_SUFFIX)
+            break
+
+        return path
+
+    def owns(self, path):
+        """
+        Check that file is placed in cache
+
+        :param path: path to file
+        :type path: str
+        :return: bool -- check result
+        """
+        return os.path.dirname(os.path.abspath(path)) == self.directory
+
+    def get(self, key):
+        """
+        Get path of cached file and mark it as recently used
+
+        :param key: cache key
+        :type key: str
+        :return: str or None -- path to file or None if file is not cached
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+
+        os.utime(path)
+        return path
+
+    def put(self, key, partial_path):
+        """
+        Move completely downloaded file to cache and evict least recently used files
+
+        :param key: cache key
+        :type key: str
+        :param partial_path: path to downloaded file
+        :type partial_path: str
+        :return: str -- path to cached file
+        """
+        path = self.path(key)
+        os.replace(partial_path, path)
+
+        chunks_path = partial_path + self.CHUNKS_SUFFIX
+        if os.path.exists(chunks_path):
+            os.remove(chunks_path)
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used files while total size is greater than max size
+
+        :param keep: path to file that should not be removed
+        :type keep: str or None
+        :return: None
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path) and not name.endswith((self.PARTIAL_SUFFIX, self.CHUNKS_SUFFIX)):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.max_size:
+                break
+            if path != keep:
+                os.remove(path)
+                total_size -= size
+
+
+def _is_process_running(pid):
+    """
+    Check that process with PID is running on this host
+
+    :param pid: PID
+    :type pid: int
+    :return: bool -- check result
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def get_download_cache():
+    """
+    Get download cache configured by EXTERNAL_RESOURCE_CACHE_DIR and EXTERNAL_RESOURCE_CACHE_SIZE
+
+    :return: :py:class:`legion.utils.DownloadCache` or None -- cache or None if cache is disabled
+    """
+    directory = os.getenv(*legion.config.EXTERNAL_RESOURCE_CACHE_DIR)
+    if not directory:
+        return None
+
+    return DownloadCache(directory, int(os.getenv(*legion.config.EXTERNAL_RESOURCE_CACHE_SIZE)))
+
+
+def _open_stream(url, session):
+    """
+    Send streamed GET request for whole resource
+
+    :param url: URL of resource
+    :type url: str
+    :param session: session
+    :type session: :py:class:`requests.Session`
+    :return: :py:class:`requests.Response` -- response (body is not read)
+    """
+    response = session.get(url, stream=True, verify=False, auth=_get_auth_credentials_for_external_resource())
+    if response.status_code >= 400 or response.status_code < 200:
+        response.close()
+        raise Exception('Cannot load resource: %s. Returned status code: %d' % (url, response.status_code))
+
+    return response
+
+
+def _write_stream(response, path):
+    """
+    Write body of streamed response to file and close response
+
+    :param response: streamed response
+    :type response: :py:class:`requests.Response`
+    :param path: path to target file
+    :type path: str
+    :return: None
+    """
+    with response, open(path, 'wb') as file:
+        for chunk in response.iter_content(chunk_size=1024 * 1024):
+            if chunk:
+                file.write(chunk)
+
+
+def _get_range_validator(headers):
+    """
+    Get If-Range value for range requests: strong ETag or Last-Modified of resource
+
+    :param headers: response headers
+    :type headers: dict[str, str]
+    :return: str or None -- validator or None if resource has no one
+    """
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+def _download_chunks(url, path, size, chunk_size, threads, retries, validator=None):
+    """
+    Download resource to file with parallel HTTP range requests.
+    Indexes of downloaded chunks are written to <path>.chunks, download is resumed from this state.
+    Partial file belongs to version of resource (key of cache is built from ETag), range requests are sent
+    with If-Range validator, so change of resource during download fails it instead of mixing versions
+
+    :param url: URL of resource
+    :type url: str
+    :param path: path to target (partial) file
+    :type path: str
+    :param size: size of resource
+    :type size: int
+    :param chunk_size: size of one range request
+    :type chunk_size: int
+    :param threads: count of parallel requests
+    :type threads: int
+    :param retries: count of retries of one chunk
+    :type retries: int
+    :param validator: If-Range value (ETag or Last-Modified of resource)
+    :type validator: str or None
+    :return: None
+    """
+    chunks_path = path + DownloadCache.CHUNKS_SUFFIX
+    completed = set()
+
+    if os.path.exists(path) and os.path.getsize(path) == size and os.path.exists(chunks_path):
+        with open(chunks_path, 'r') as chunks_file:
+            completed = {int(line) for line in chunks_file if line.strip()}
+    else:
+        with open(path, 'wb') as file:
+            file.truncate(size)
+        open(chunks_path, 'w').close()
+
+    pending = [index for index in range((size + chunk_size - 1) // chunk_size) if index not in completed]
+    state_lock = threading.Lock()
+    sessions = threading.local()
+
+    def download_chunk(index):
+        if not hasattr(sessions, 'session'):
+            sessions.session = requests.Session()
+
+        start = index * chunk_size
+        end = min(start + chunk_size, size) - 1
+
+        for attempt in range(retries + 1):
+            try:
+                data = download_file_range(url, start, end, sessions.session, validator)
+                if len(data) != end - start + 1:
+                    raise Exception('Invalid size of range %d-%d of resource %s: %d' % (start, end, url, len(data)))
+                break
+            except Exception:
+                if attempt == retries:
+                    raise
+
+        with open(path, 'r+b') as file:
+            file.seek(start)
+            file.write(data)
+
+        with state_lock, open(chunks_path, 'a') as chunks_file:
+            chunks_file.write('%d\n' % index)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(download_chunk, index) for index in pending]:
+            future.result()
+
+
 def download_file(target_file):
     """
-    Download file from external resource and return path to file on local machine
+    Download file from external resource and return path to file on local machine.
+    Large files are downloaded with parallel range requests. If download cache is configured
+    (EXTERNAL_RESOURCE_CACHE_DIR), file is returned from cache or downloaded to it (interrupted downloads are resumed).
+    If HEAD request is not allowed (for example, for presigned URLs), file is downloaded with one GET request
 
     :param target_file: path to file on external resource
     :type target_file: str
@@ -326,24 +927,202 @@ def download_file(target_file):
     # If external resource (only HTTP at this time)
     url = normalize_external_resource_path(target_file)
     name = target_file.split('/')[-1]
-    credentials = _get_auth_credentials_for_external_resource()
-    response = requests.get(url,
-                            stream=True,
-                            verify=False,
-                            auth=credentials)
-    if response.status_code >= 400 or response.status_code < 200:
-        raise Exception('Cannot load resource: %s. Returned status code: %d' % (url, response.status_code))
+    cache = get_download_cache()
+    chunk_size = int(os.getenv(*legion.config.EXTERNAL_RESOURCE_DOWNLOAD_CHUNK_SIZE))
+
+    with requests.Session() as session:
+        response = session.head(url, allow_redirects=True, verify=False,
+                                auth=_get_auth_credentials_for_external_resource())
+        stream = None
+        if response.status_code >= 400 or response.status_code < 200:
+            LOGGER.debug('HEAD request for %s returned status code %d, loading it with GET request',
+                         url, response.status_code)
+            stream = response = _open_stream(url, session)
+
+        size = int(response.headers['Content-Length']) if 'Content-Length' in response.headers else None
+        key = None
+        if cache:
+            key = cache.build_key(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), size)
+
+        if key:
+            cached_path = cache.get(key)
+            if cached_path:
+                if stream is not None:
+                    stream.close()
+                return cached_path
+            temp_file = cache.partial_path(key)
+        else:
+            handle, temp_file = tempfile.mkstemp(suffix=name)
+            os.close(handle)
+
+        if stream is not None:
+            _write_stream(stream, temp_file)
+        elif size is not None and size > chunk_size and response.headers.get('Accept-Ranges') == 'bytes':
+            _download_chunks(url, temp_file, size, chunk_size,
+                             int(os.getenv(*legion.config.EXTERNAL_RESOURCE_DOWNLOAD_THREADS)),
+                             int(os.getenv(*legion.config.EXTERNAL_RESOURCE_DOWNLOAD_RETRIES)),
+                             _get_range_validator(response.headers))
+            if not key:
+                os.remove(temp_file + DownloadCache.CHUNKS_SUFFIX)
+        else:
+            _write_stream(_open_stream(url, session), temp_file)
 
-    temp_file = tempfile.mktemp(suffix=name)
-
-    with open(temp_file, 'wb') as file:
-        for chunk in response.iter_content(chunk_size=1024):
-            if chunk:
-                file.write(chunk)
+    if key:
+        return cache.put(key, temp_file)
 
     return os.path.abspath(temp_file)
 
 
+def download_file_range(target_file, start, end, session=None, validator=None):
+    """
+    Download range of bytes of file from external resource (using HTTP range request)
+
+    :param target_file: path to file on external resource
+    :type target_file: str
+    :param start: offset of first byte
+    :type start: int
+    :param end: offset of last byte (inclusive)
+    :type end: int
+    :param session: optional session for connection reuse
+    :type session: :py:class:`requests.Session` or None
+    :param validator: optional If-Range value (ETag or Last-Modified of expected version of resource)
+    :type validator: str or None
+    :return: bytes -- content of range
+    """
+    url = normalize_external_resource_path(target_file)
+    headers = {'Range': 'bytes=%d-%d' % (start, end)}
+    if validator:
+        headers['If-Range'] = validator
+
+    response = (session or requests).get(url,
+                                         headers=headers,
+                                         verify=False,
+                                         auth=_get_auth_credentials_for_external_resource())
+    if response.status_code == 200 and validator:
+        raise Exception('Resource %s has been changed (does not match %s)' % (url, validator))
+    if response.status_code != 206:
+        raise Exception('Cannot load range of resource: %s. Returned status code: %d' % (url, response.status_code))
+
+    return response.content
+
+
+class RemoteFileReader(io.RawIOBase):
+    """
+    Read-only seekable binary file on external resource. Each read is a HTTP range request
+    """
+
+    def __init__(self, path):
+        """
+        Create remote file reader
+
+        :param path: path to file on external resource
+        :type path: str
+        """
+        super().__init__()
+        self._path = path
+        self._session = requests.Session()
+        self._position = 0
+
+        url = normalize_external_resource_path(path)
+        response = self._session.head(url,
+                                      allow_redirects=True,
+                                      verify=False,
+                                      auth=_get_auth_credentials_for_external_resource())
+        if response.status_code >= 400 or response.status_code < 200:
+            raise Exception('Cannot load resource: %s. Returned status code: %d' % (url, response.status_code))
+        if 'Content-Length' not in response.headers:
+            raise Exception('Cannot get size of resource: %s' % url)
+
+        self._size = int(response.headers['Content-Length'])
+
+    def readable(self):
+        """
+        Check that file is readable
+
+        :return: bool -- True
+        """
+        return True
+
+    def seekable(self):
+        """
+        Check that file is seekable
+
+        :return: bool -- True
+        """
+        return True
+
+    def tell(self):
+        """
+        Get current position
+
+        :return: int -- position
+        """
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """
+        Change current position
+
+        :param offset: offset
+        :type offset: int
+        :param whence: io.SEEK_SET, io.SEEK_CUR or io.SEEK_END
+        :type whence: int
+        :return: int -- new position
+        """
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+
+        if offset < 0:
+            raise ValueError('Negative seek position %d' % offset)
+
+        self._position = offset
+        return self._position
+
+    def readinto(self, buffer):
+        """
+        Read bytes from current position to buffer
+
+        :param buffer: target buffer
+        :type buffer: bytearray or memoryview
+        :return: int -- count of read bytes
+        """
+        end = min(self._position + len(buffer), self._size)
+        if end <= self._position:
+            return 0
+
+        data = download_file_range(self._path, self._position, end - 1, self._session)
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def close(self):
+        """
+        Close file and HTTP session
+
+        :return: None
+        """
+        self._session.close()
+        super().close()
+
+
+def open_external_file(path, buffer_size=64 * 1024):
+    """
+    Open file from local FS or external resource for binary reading (without downloading whole file)
+
+    :param path: path to file
+    :type path: str
+    :param buffer_size: size of read buffer (min size of HTTP range requests)
+    :type buffer_size: int
+    :return: file-like object
+    """
+    if is_local_resource(path):
+        return open(path, 'rb')
+
+    return io.BufferedReader(RemoteFileReader(path), buffer_size)
+
+
 class ExternalFileReader:
     """
     External file reader for opening files from http://, https:// and local FS
@@ -359,6 +1138,7 @@ class ExternalFileReader:
         self._path = path
         self._local_path = None
         self._is_external_path = not is_local_resource(self._path)
+        self._is_cached = False
 
     @property
     def path(self):
@@ -378,6 +1158,8 @@ class ExternalFileReader:
         if not self._local_path:
             if self._is_external_path:
                 self._local_path = download_file(self._path)
+                cache = get_download_cache()
+                self._is_cached = cache is not None and cache.owns(self._local_path)
             else:
                 self._local_path = self._path
 
@@ -399,7 +1181,7 @@ class ExternalFileReader:
         :param traceback: -
         :return: None
         """
-        if self._is_external_path:
+        if self._is_external_path and not self._is_cached:
             remove_directory(self._local_path)
 
 
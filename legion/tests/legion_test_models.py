@@ -40,6 +40,43 @@ def create_simple_summation_model_by_df(path, version):
                             version=version)
 
 
+def create_deterministic_summation_model_by_df(path, version):
+    def apply(x):
+        return {'x': x['a'] + x['b']}
+
+    df = pandas.DataFrame([{
+        'a': 1,
+        'b': 1,
+    }])
+
+    return legion.io.export(path,
+                            apply,
+                            input_data_frame=df,
+                            use_df=False,
+                            version=version,
+                            deterministic=True)
+
+
+def create_simple_summation_model_by_df_vectorized(path, version):
+    def prepare(x):
+        return x
+
+    def apply(x):
+        return {'x': (x['a'] + x['b']).tolist()}
+
+    df = pandas.DataFrame([{
+        'a': 1,
+        'b': 1,
+    }])
+
+    return legion.io.export(path,
+                            apply,
+                            prepare,
+                            input_data_frame=df,
+                            use_df=True,
+                            version=version)
+
+
 def create_simple_summation_model_by_types(path, version):
     pass
 
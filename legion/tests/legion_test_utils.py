@@ -1,8 +1,13 @@
 from argparse import Namespace
+import asyncio
 import time
 import tempfile
 import os
 import glob
+import hashlib
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from unittest.mock import patch
 
 import legion.config
@@ -50,6 +55,210 @@ def patch_environ(values, flush_existence=False):
     return patch('os.environ', new_values)
 
 
+class LocalFileServer:
+    """
+    Context manager with local HTTP server for files of directory (supports HEAD, GET with Range header
+    and PUT with Content-Range header unless content_range_puts is False). Next failing_requests GET and PUT requests
+    are answered with failing_status, HEAD requests are answered with head_status if it is set
+    """
+
+    def __init__(self, directory):
+        """
+        Create context
+
+        :param directory: directory with served files
+        :type directory: str
+        """
+        self.directory = directory
+        self.requests = []
+        self.bytes_sent = 0
+        self.failing_requests = 0
+        self.failing_status = 500
+        self.content_range_puts = True
+        self.head_status = None
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def url(self, name):
+        """
+        Get URL of served file
+
+        :param name: name of file
+        :type name: str
+        :return: str -- URL
+        """
+        return 'http://127.0.0.1:{}/{}'.format(self._server.server_address[1], name)
+
+    def _build_handler(self):
+        """
+        Build request handler class bound to this server
+
+        :return: type -- handler class
+        """
+        context = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send_file(self, with_body):
+                path = os.path.join(context.directory, self.path.lstrip('/'))
+                context.requests.append((self.command, self.path, self.headers.get('Range')))
+
+                if not os.path.isfile(path):
+                    self.send_error(404)
+                    return
+
+                if not with_body and context.head_status:
+                    self.send_error(context.head_status)
+                    return
+
+                with context._lock:
+                    if with_body and context.failing_requests > 0:
+                        context.failing_requests -= 1
+                        self.send_error(context.failing_status)
+                        return
+
+                with open(path, 'rb') as file:
+                    content = file.read()
+
+                status = 200
+                etag = '"{}"'.format(os.stat(path).st_mtime_ns)
+                range_match = re.match(r'bytes=(\d+)-(\d+)$', self.headers.get('Range', ''))
+                if range_match and self.headers.get('If-Range', etag) == etag:
+                    start, end = int(range_match.group(1)), min(int(range_match.group(2)), len(content) - 1)
+                    status = 206
+                    self.send_response(status)
+                    self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, end, len(content)))
+                    content = content[start:end + 1]
+                else:
+                    self.send_response(status)
+
+                self.send_header('Content-Length', str(len(content)))
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('ETag', etag)
+                if not with_body:
+                    self.send_header('X-Checksum-Sha256', hashlib.sha256(content).hexdigest())
+                self.end_headers()
+
+                if with_body:
+                    self.wfile.write(content)
+                    context.bytes_sent += len(content)
+
+            def do_HEAD(self):
+                self._send_file(False)
+
+            def do_GET(self):
+                self._send_file(True)
+
+            def do_PUT(self):
+                path = os.path.join(context.directory, self.path.lstrip('/'))
+                content_range = self.headers.get('Content-Range')
+                context.requests.append((self.command, self.path, content_range))
+                content = self.rfile.read(int(self.headers['Content-Length']))
+
+                with context._lock:
+                    if context.failing_requests > 0:
+                        context.failing_requests -= 1
+                        self.send_error(context.failing_status)
+                        return
+
+                    range_match = re.match(r'bytes (\d+)-(\d+)/(\d+)$', content_range or '')
+                    if range_match and context.content_range_puts:
+                        if not os.path.exists(path):
+                            open(path, 'wb').close()
+                        with open(path, 'r+b') as file:
+                            file.truncate(int(range_match.group(3)))
+                            file.seek(int(range_match.group(1)))
+                            file.write(content)
+                    else:
+                        with open(path, 'wb') as file:
+                            file.write(content)
+
+                self.send_response(201)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+        return Handler
+
+    def __enter__(self):
+        """
+        Start server
+
+        :return: self
+        """
+        self._server = HTTPServer(('127.0.0.1', 0), self._build_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        """
+        Stop server
+
+        :param args: list of arguements
+        :return: None
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class LocalModelServer:
+    """
+    Context manager with local native aiohttp server (in background thread) for initialized pyserve application
+    """
+
+    def __init__(self, application):
+        """
+        Create context
+
+        :param application: Flask application instance with model and configuration
+        :type application: :py:class:`Flask.app`
+        """
+        self._application = application
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self.url = None
+
+    def __enter__(self):
+        """
+        Start server
+
+        :return: self
+        """
+        import aiohttp.web
+        import legion.serving.aio
+
+        self._loop = asyncio.new_event_loop()
+        self._runner = aiohttp.web.AppRunner(legion.serving.aio.create_aiohttp_application(self._application))
+
+        async def start():
+            await self._runner.setup()
+            site = aiohttp.web.TCPSite(self._runner, '127.0.0.1', 0)
+            await site.start()
+            return site._server.sockets[0].getsockname()[1]
+
+        port = self._loop.run_until_complete(start())
+        self.url = 'http://127.0.0.1:{}'.format(port)
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        """
+        Stop server
+
+        :param args: list of arguements
+        :return: None
+        """
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+        self._loop.close()
+
+
 class ModelServeTestBuild:
     """
     Context manager for building and testing models with pyserve
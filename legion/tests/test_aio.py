@@ -0,0 +1,95 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import print_function
+
+import asyncio
+
+import unittest2
+from aiohttp.test_utils import TestClient, TestServer
+
+try:
+    from .legion_test_utils import ModelServeTestBuild
+    from .legion_test_models import create_simple_summation_model_by_df
+except ImportError:
+    from legion_test_utils import ModelServeTestBuild
+    from legion_test_models import create_simple_summation_model_by_df
+
+import legion.serving.aio as aio
+import legion.serving.pyserve as pyserve
+
+
+class TestNativeAioServing(unittest2.TestCase):
+    MODEL_ID = 'temp'
+    MODEL_VERSION = '1.8'
+
+    def _query(self, method, url, **kwargs):
+        async def query():
+            with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                     create_simple_summation_model_by_df) as model:
+                aioapp = aio.create_aiohttp_application(model.application)
+                async with TestClient(TestServer(aioapp)) as client:
+                    response = await client.request(method, url, **kwargs)
+                    if response.content_type == 'application/json':
+                        return response.status, await response.json()
+                    return response.status, await response.text()
+
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(query())
+        finally:
+            loop.close()
+
+    def test_health_check(self):
+        status, data = self._query('GET', pyserve.SERVE_HEALTH_CHECK)
+        self.assertEqual(status, 200)
+        self.assertEqual(data, 'OK')
+
+    def test_model_info(self):
+        status, data = self._query('GET', pyserve.SERVE_INFO.format(model_id=self.MODEL_ID))
+        self.assertEqual(status, 200)
+        self.assertEqual(data['version'], self.MODEL_VERSION)
+
+    def test_model_invoke_get(self):
+        status, data = self._query('GET', pyserve.SERVE_INVOKE.format(model_id=self.MODEL_ID) + '?a=10&b=20')
+        self.assertEqual(status, 200)
+        self.assertDictEqual(data, {'x': 30})
+
+    def test_model_invoke_post(self):
+        status, data = self._query('POST', pyserve.SERVE_INVOKE.format(model_id=self.MODEL_ID),
+                                   data={'a': '1', 'b': '2'})
+        self.assertEqual(status, 200)
+        self.assertDictEqual(data, {'x': 3})
+
+    def test_model_batch(self):
+        status, data = self._query('POST', pyserve.SERVE_BATCH.format(model_id=self.MODEL_ID),
+                                   json={'a': [1, 2], 'b': [10, 20]})
+        self.assertEqual(status, 200)
+        self.assertListEqual(data, [{'x': 11}, {'x': 22}])
+
+    def test_model_cache_statistics(self):
+        status, data = self._query('GET', pyserve.SERVE_CACHE.format(model_id=self.MODEL_ID))
+        self.assertEqual(status, 200)
+        self.assertDictEqual(data, {'enabled': False})
+
+    def test_metrics(self):
+        status, data = self._query('GET', pyserve.SERVE_METRICS)
+        self.assertEqual(status, 200)
+        self.assertIn('legion_model_requests_in_flight{model_id="temp",model_version="1.8"} 0', data)
+        self.assertIn('legion_model_queue_depth{model_id="temp",model_version="1.8",queue="executor"} 0', data)
+
+
+if __name__ == '__main__':
+    unittest2.main()
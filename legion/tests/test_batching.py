@@ -0,0 +1,147 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import print_function
+
+import concurrent.futures
+
+import legion.model.types as types
+from legion.model.model import ScipyModel
+from legion.serving.batching import MicroBatcher, split_batch_result
+import numpy
+import pandas
+import unittest2
+
+
+COLUMN_TYPES = {
+    'a': types.ColumnInformation(types.Integer, numpy.int64),
+    'b': types.ColumnInformation(types.Integer, numpy.int64),
+}
+
+
+def build_summation_model(calls, vectorized=True):
+    def apply(x):
+        calls.append(len(x))
+        return (x['a'] + x['b']).values
+
+    return ScipyModel(apply_func=apply, prepare_func=lambda x: x, column_types=COLUMN_TYPES, version='1.0',
+                      vectorized=vectorized)
+
+
+def build_scalar_model(calls, vectorized=False):
+    def apply(x):
+        calls.append(len(x))
+        return {'result': int(x['a'][0] + x['b'][0])}
+
+    return ScipyModel(apply_func=apply, prepare_func=lambda x: x, column_types=COLUMN_TYPES, version='1.0',
+                      vectorized=vectorized)
+
+
+def apply_concurrently(batcher, input_vectors):
+    with concurrent.futures.ThreadPoolExecutor(len(input_vectors)) as executor:
+        futures = [executor.submit(batcher.apply, input_vector) for input_vector in input_vectors]
+        return [future.result(10) for future in futures]
+
+
+class TestMicroBatching(unittest2.TestCase):
+    def test_split_batch_result(self):
+        self.assertListEqual(split_batch_result([1, 2], 2), [1, 2])
+        self.assertListEqual(split_batch_result(numpy.array([1, 2]), 2), [1, 2])
+        self.assertListEqual(split_batch_result({'x': pandas.Series([1, 2])}, 2), [{'x': 1}, {'x': 2}])
+        self.assertListEqual(split_batch_result(pandas.DataFrame({'x': [1, 2]}), 2), [{'x': 1}, {'x': 2}])
+
+        with self.assertRaises(Exception):
+            split_batch_result([1, 2, 3], 2)
+
+        with self.assertRaises(Exception):
+            split_batch_result(10, 2)
+
+    def test_concurrent_invocations_coalesced(self):
+        calls = []
+        batcher = MicroBatcher(build_summation_model(calls), max_batch_size=8, max_delay=0.5)
+        count = 8
+
+        results = apply_concurrently(batcher, [{'a': str(i), 'b': '100'} for i in range(count)])
+
+        self.assertListEqual(results, [i + 100 for i in range(count)])
+        self.assertEqual(sum(calls), count)
+        self.assertLess(len(calls), count)
+
+    def test_single_invocation_result_shape(self):
+        calls = []
+        batcher = MicroBatcher(build_summation_model(calls), max_batch_size=8, max_delay=0.01)
+
+        # Invocation processed alone is calculated with apply, result is the same as without batching
+        result = batcher.apply({'a': '1', 'b': '2'}, 10)
+        self.assertIsInstance(result, numpy.ndarray)
+        self.assertListEqual(result.tolist(), [3])
+        self.assertListEqual(calls, [1])
+
+    def test_not_vectorized_model_applied_row_by_row(self):
+        calls = []
+        model = build_summation_model(calls, vectorized=False)
+        batcher = MicroBatcher(model, max_batch_size=4, max_delay=0.5)
+        input_vectors = [{'a': str(i), 'b': '100'} for i in range(4)]
+
+        results = apply_concurrently(batcher, input_vectors)
+
+        # ndarray results of model have the same shape as without batching
+        self.assertListEqual([result.tolist() for result in results], [[i + 100] for i in range(4)])
+        self.assertListEqual(calls, [1] * 4)
+        self.assertListEqual([model.apply(input_vector).tolist() for input_vector in input_vectors],
+                             [result.tolist() for result in results])
+
+    def test_dict_of_scalars_model(self):
+        calls = []
+        batcher = MicroBatcher(build_scalar_model(calls), max_batch_size=4, max_delay=0.5)
+
+        results = apply_concurrently(batcher, [{'a': str(i), 'b': '100'} for i in range(4)])
+
+        self.assertListEqual(results, [{'result': i + 100} for i in range(4)])
+        self.assertListEqual(calls, [1] * 4)
+
+    def test_not_split_result_applied_row_by_row(self):
+        calls = []
+        batcher = MicroBatcher(build_scalar_model(calls, vectorized=True), max_batch_size=4, max_delay=0.5)
+
+        results = apply_concurrently(batcher, [{'a': str(i), 'b': '100'} for i in range(4)])
+
+        # Dict of scalars cannot be split into rows, so each invocation is calculated with apply
+        self.assertListEqual(results, [{'result': i + 100} for i in range(4)])
+        self.assertEqual(calls[-4:], [1] * 4)
+
+    def test_submissions_coalesced_without_waiting_threads(self):
+        calls = []
+        batcher = MicroBatcher(build_summation_model(calls), max_batch_size=32, max_delay=0.5)
+
+        futures = [batcher.submit({'a': str(i), 'b': '100'}) for i in range(32)]
+        self.assertListEqual([future.result(10) for future in futures], [i + 100 for i in range(32)])
+        self.assertListEqual(calls, [32])
+
+    def test_invalid_row_does_not_break_batch(self):
+        calls = []
+        batcher = MicroBatcher(build_summation_model(calls), max_batch_size=2, max_delay=0.5)
+
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            valid = executor.submit(batcher.apply, {'a': '1', 'b': '2'})
+            invalid = executor.submit(batcher.apply, {'a': 'wrong', 'b': '2'})
+
+            self.assertEqual(valid.result(10), 3)
+            with self.assertRaises(ValueError):
+                invalid.result(10)
+
+
+if __name__ == '__main__':
+    unittest2.main()
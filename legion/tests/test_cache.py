@@ -0,0 +1,202 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import print_function
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import legion.model.types as types
+from legion.model.model import ScipyModel
+from legion.serving.cache import PredictionCache, SharedPredictionCache, build_key
+import numpy
+import unittest2
+
+
+class TestPredictionCache(unittest2.TestCase):
+    def test_key_does_not_depend_on_order(self):
+        self.assertEqual(build_key({'a': '1', 'b': '2'}), build_key({'b': '2', 'a': '1'}))
+        self.assertNotEqual(build_key({'a': '1', 'b': '2'}), build_key({'a': '2', 'b': '1'}))
+
+    def test_results_are_cached(self):
+        calls = []
+
+        def apply(input_vector):
+            calls.append(input_vector)
+            return {'x': int(input_vector['a']) + int(input_vector['b'])}
+
+        cache = PredictionCache()
+        self.assertDictEqual(cache.apply({'a': '1', 'b': '2'}, apply), {'x': 3})
+        self.assertDictEqual(cache.apply({'b': '2', 'a': '1'}, apply), {'x': 3})
+        self.assertDictEqual(cache.apply({'a': '2', 'b': '2'}, apply), {'x': 4})
+
+        self.assertEqual(len(calls), 2)
+        statistics = cache.statistics
+        self.assertEqual(statistics['hits'], 1)
+        self.assertEqual(statistics['misses'], 2)
+        self.assertEqual(statistics['entries'], 2)
+        self.assertGreater(statistics['memory'], 0)
+
+    def test_none_result_is_cached(self):
+        calls = []
+        cache = PredictionCache()
+        for _ in range(3):
+            self.assertIsNone(cache.apply({'a': '1'}, calls.append))
+        self.assertEqual(len(calls), 1)
+
+    def test_lru_eviction(self):
+        cache = PredictionCache(max_entries=2)
+        cache.put(('a',), 1)
+        cache.put(('b',), 2)
+        self.assertEqual(cache.get(('a',)), 1)
+        cache.put(('c',), 3)
+
+        self.assertIsNone(cache.get(('b',)))
+        self.assertEqual(cache.get(('a',)), 1)
+        self.assertEqual(cache.get(('c',)), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_memory_cap(self):
+        value = numpy.zeros(1000, dtype=numpy.float64)
+        cache = PredictionCache(max_memory=20000)
+        for index in range(5):
+            cache.put((index,), value.copy())
+
+        self.assertLessEqual(cache.statistics['memory'], 20000)
+        self.assertEqual(cache.statistics['entries'], 2)
+        self.assertEqual(cache.evictions, 3)
+
+        cache.put(('big',), numpy.zeros(10000))
+        self.assertIsNone(cache.get(('big',)))
+
+    def test_ttl_expiration(self):
+        cache = PredictionCache(ttl=0.05)
+        cache.put(('a',), 1)
+        self.assertEqual(cache.get(('a',)), 1)
+
+        time.sleep(0.1)
+        self.assertIsNone(cache.get(('a',)))
+        self.assertEqual(cache.expirations, 1)
+        self.assertEqual(cache.statistics['entries'], 0)
+
+    def test_model_is_not_deterministic_by_default(self):
+        column_types = {'a': types.ColumnInformation(types.Integer, numpy.int64)}
+        model = ScipyModel(apply_func=lambda x: x, prepare_func=lambda x: x, column_types=column_types)
+        self.assertFalse(model.deterministic)
+
+        del model.__dict__['deterministic']
+        self.assertFalse(model.deterministic)
+        self.assertFalse(model.description['deterministic'])
+
+
+def _put_in_shared_cache(path, keys):
+    cache = SharedPredictionCache(path, slots=64, slot_size=256)
+    try:
+        for key in keys:
+            cache.put((key,), {'pid': os.getpid(), 'key': key})
+    finally:
+        cache.close()
+
+
+class TestSharedPredictionCache(unittest2.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._path = os.path.join(self._directory, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def test_results_are_cached(self):
+        calls = []
+        cache = SharedPredictionCache(self._path, slots=64, slot_size=256, namespace='model:1')
+        try:
+            for input_vector in ({'a': '1', 'b': '2'}, {'b': '2', 'a': '1'}, {'a': '2', 'b': '2'}):
+                cache.apply(input_vector, lambda x: calls.append(x) or {'x': int(x['a']) + int(x['b'])})
+            self.assertEqual(len(calls), 2)
+            self.assertDictEqual(cache.get(build_key({'a': '2', 'b': '2'})), {'x': 4})
+            self.assertEqual(cache.statistics['entries'], 2)
+
+            other_namespace = SharedPredictionCache(self._path, slots=64, slot_size=256, namespace='model:2')
+            try:
+                self.assertIsNone(other_namespace.get(build_key({'a': '1', 'b': '2'})))
+            finally:
+                other_namespace.close()
+        finally:
+            cache.close()
+
+    def test_results_are_shared_between_processes(self):
+        cache = SharedPredictionCache(self._path, slots=64, slot_size=256)
+        try:
+            context = multiprocessing.get_context('fork')
+            processes = [context.Process(target=_put_in_shared_cache, args=(self._path, range(i, 20, 2)))
+                         for i in range(2)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join(10)
+                self.assertEqual(process.exitcode, 0)
+
+            results = [cache.get((key,)) for key in range(20)]
+            self.assertListEqual([result['key'] for result in results], list(range(20)))
+            self.assertEqual(len({result['pid'] for result in results}), 2)
+            self.assertNotIn(os.getpid(), {result['pid'] for result in results})
+        finally:
+            cache.close()
+
+    def test_clock_eviction(self):
+        cache = SharedPredictionCache(self._path, slots=SharedPredictionCache.WAYS, slot_size=256)
+        try:
+            for key in range(cache.WAYS):
+                cache.put((key,), key)
+
+            # All reference bits are set after put: first slot is evicted, then reference bit of key 1 is set by get
+            cache.put(('new',), 'new')
+            self.assertIsNone(cache.get((0,)))
+            self.assertEqual(cache.get((1,)), 1)
+            cache.put(('next',), 'next')
+
+            self.assertEqual(cache.get((1,)), 1)
+            self.assertIsNone(cache.get((2,)))
+            self.assertEqual(cache.get(('new',)), 'new')
+            self.assertEqual(cache.get(('next',)), 'next')
+            self.assertEqual(cache.evictions, 2)
+        finally:
+            cache.close()
+
+    def test_ttl_and_big_values(self):
+        cache = SharedPredictionCache(self._path, slots=64, slot_size=256, ttl=0.05)
+        try:
+            cache.put(('big',), 'x' * 1000)
+            self.assertIsNone(cache.get(('big',)))
+
+            cache.put(('a',), 1)
+            self.assertEqual(cache.get(('a',)), 1)
+            time.sleep(0.1)
+            self.assertIsNone(cache.get(('a',)))
+            self.assertEqual(cache.expirations, 1)
+        finally:
+            cache.close()
+
+    def test_geometry_mismatch(self):
+        SharedPredictionCache(self._path, slots=64, slot_size=256).close()
+        with self.assertRaises(Exception):
+            SharedPredictionCache(self._path, slots=64, slot_size=512)
+
+
+if __name__ == '__main__':
+    unittest2.main()
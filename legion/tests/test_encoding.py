@@ -0,0 +1,105 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import print_function
+
+import json
+
+import legion.encoding as encoding
+import numpy
+import pandas
+import unittest2
+
+
+class TestEncoding(unittest2.TestCase):
+    def _check_json(self, data, expected):
+        for encode in (encoding.encode_json, encoding.encode_json_stdlib):
+            self.assertEqual(json.loads(encode(data).decode('utf-8')), expected)
+
+    def test_json_numpy_objects(self):
+        matrix = numpy.arange(6, dtype=numpy.int32).reshape(2, 3)
+        self._check_json({'i': numpy.int64(1), 'f': numpy.float32(0.5), 'b': numpy.bool_(True)},
+                         {'i': 1, 'f': 0.5, 'b': True})
+        self._check_json({'matrix': matrix, 'transposed': matrix.T, 'column': matrix[:, 1]},
+                         {'matrix': [[0, 1, 2], [3, 4, 5]], 'transposed': [[0, 3], [1, 4], [2, 5]], 'column': [1, 4]})
+        self._check_json({'objects': numpy.array(['a', None], dtype=object), 'float16': numpy.float16(2)},
+                         {'objects': ['a', None], 'float16': 2.0})
+
+    def test_json_pandas_objects(self):
+        data_frame = pandas.DataFrame({'a': [1, 2], 'b': [0.5, 1.5], 'c': ['x', 'y']})
+        self._check_json(data_frame, {'a': [1, 2], 'b': [0.5, 1.5], 'c': ['x', 'y']})
+        self._check_json({'series': data_frame['b']}, {'series': [0.5, 1.5]})
+
+    def test_json_special_values(self):
+        self._check_json({'nan': float('nan'), 'values': numpy.array([1.5, numpy.inf]), 'float32': numpy.float32(0.1)},
+                         {'nan': None, 'values': [1.5, None], 'float32': 0.1})
+
+        dates = numpy.array(['2020-01-02T03:04:05.123456789', 'NaT'], dtype='datetime64[ns]')
+        self._check_json({'dates': dates, 'date': dates[0], 'series': pandas.Series(dates)},
+                         {'dates': ['2020-01-02T03:04:05.123456', None], 'date': '2020-01-02T03:04:05.123456',
+                          'series': ['2020-01-02T03:04:05.123456', None]})
+
+        data = {'a': [float('nan'), numpy.datetime64('2020-01-02')], 'b': pandas.Timestamp('2020-01-02 03:04:05')}
+        self.assertEqual(encoding.encode_json(data), encoding.encode_json_stdlib(data))
+
+    def test_json_unsupported_object(self):
+        with self.assertRaises(TypeError):
+            encoding.encode_json_stdlib({'a': object()})
+
+    def test_columns_round_trip(self):
+        columns = {
+            'float': numpy.linspace(0, 1, 5),
+            'matrix': numpy.arange(6, dtype='>i4').reshape(2, 3),
+            'bool': numpy.array([True, False]),
+            'scalar': numpy.float32(2.5),
+            'empty': numpy.array([], dtype=numpy.int8),
+        }
+
+        decoded = encoding.decode_columns(encoding.encode_columns(columns))
+
+        self.assertListEqual(list(decoded.keys()), list(columns.keys()))
+        for name, column in columns.items():
+            numpy.testing.assert_array_equal(decoded[name], column)
+            self.assertEqual(decoded[name].dtype, numpy.asarray(column).dtype.newbyteorder('<'))
+        self.assertEqual(decoded['matrix'].shape, (2, 3))
+        self.assertEqual(decoded['float'].ctypes.data % encoding.COLUMNS_ALIGNMENT, 0)
+
+        with self.assertRaises(Exception):
+            encoding.decode_columns(b'not a columns data')
+        with self.assertRaises(Exception):
+            encoding.encode_columns({'strings': numpy.array(['a'])})
+
+    def test_response_negotiation(self):
+        result = {'x': numpy.arange(3), 'score': 0.5}
+
+        body, mime_type = encoding.encode_response(result)
+        self.assertEqual(mime_type, encoding.JSON_MIME_TYPE)
+        self.assertDictEqual(json.loads(body.decode('utf-8')), {'x': [0, 1, 2], 'score': 0.5})
+
+        body, mime_type = encoding.encode_response(result, 'application/json, %s' % encoding.COLUMNS_MIME_TYPE)
+        self.assertEqual(mime_type, encoding.COLUMNS_MIME_TYPE)
+        decoded = encoding.decode_columns(body)
+        self.assertListEqual(decoded['x'].tolist(), [0, 1, 2])
+        self.assertEqual(decoded['score'], 0.5)
+
+        body, mime_type = encoding.encode_response(pandas.Series([1.0, 2.0]), encoding.COLUMNS_MIME_TYPE)
+        self.assertListEqual(encoding.decode_columns(body)[encoding.DEFAULT_COLUMN_NAME].tolist(), [1.0, 2.0])
+
+        _, mime_type = encoding.encode_response({'label': 'cat'}, encoding.COLUMNS_MIME_TYPE)
+        self.assertEqual(mime_type, encoding.JSON_MIME_TYPE)
+
+
+if __name__ == '__main__':
+    unittest2.main()
@@ -0,0 +1,103 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import print_function
+
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import legion.model.types as types
+from legion.model.model import ScipyModel
+from legion.serving.executors import ModelExecutor, ForkingModelExecutor, build_model_executor
+from legion.serving.warmup import ModelWarmUp
+import numpy
+import unittest2
+
+
+def build_pid_model():
+    def apply(x):
+        return {'x': int(x['a'] + x['b']), 'pid': os.getpid()}
+
+    column_types = {
+        'a': types.ColumnInformation(types.Integer, numpy.int64),
+        'b': types.ColumnInformation(types.Integer, numpy.int64),
+    }
+
+    return ScipyModel(apply_func=apply, prepare_func=lambda x: x, column_types=column_types,
+                      version='1.0', use_df=False)
+
+
+class TestModelExecutors(unittest2.TestCase):
+    def test_thread_executor(self):
+        executor = ModelExecutor(build_pid_model(), 2)
+        try:
+            result = executor.submit({'a': '1', 'b': '2'}).result(10)
+            self.assertDictEqual(result, {'x': 3, 'pid': os.getpid()})
+
+            results = executor.submit_batch({'a': ['1', '2'], 'b': ['3', '4']}).result(10)
+            self.assertListEqual([result['x'] for result in results], [4, 6])
+        finally:
+            executor.shutdown()
+
+    def test_forking_executor(self):
+        executor = ForkingModelExecutor(build_pid_model(), 2)
+        try:
+            results = [executor.submit({'a': str(i), 'b': '2'}) for i in range(10)]
+            results = [future.result(10) for future in results]
+
+            self.assertListEqual([result['x'] for result in results], [i + 2 for i in range(10)])
+            self.assertNotIn(os.getpid(), {result['pid'] for result in results})
+
+            results = executor.submit_batch({'a': ['1', '2'], 'b': ['3', '4']}).result(10)
+            self.assertListEqual([result['x'] for result in results], [4, 6])
+        finally:
+            executor.shutdown()
+
+    def test_forked_workers_send_stage_durations(self):
+        model = build_pid_model()
+        executor = ForkingModelExecutor(model, 1)
+        try:
+            stages = []
+            model.stage_observer = lambda stage, duration: stages.append(stage)
+            executor.submit({'a': '1', 'b': '2'}).result(10)
+
+            self.assertListEqual(stages, ['build_df', 'prepare', 'apply'])
+        finally:
+            executor.shutdown()
+
+    def test_workers_are_forked_after_warm_up_in_current_thread(self):
+        model = build_pid_model()
+        warm_up = ModelWarmUp(model, min_iterations=2, max_iterations=2)
+        application = SimpleNamespace(config={'AIO_EXECUTOR_TYPE': 'process', 'AIO_EXECUTOR_WORKERS': '1',
+                                              'model': model, 'warm_up': warm_up})
+        executor = build_model_executor(application)
+        try:
+            self.assertTrue(warm_up.ready)
+            self.assertEqual(len(warm_up.latencies), 2)
+            self.assertIsNone(warm_up._thread)
+            self.assertEqual(executor.submit({'a': '1', 'b': '2'}).result(10)['x'], 3)
+        finally:
+            executor.shutdown()
+
+    def test_batcher_is_rejected_by_process_executor(self):
+        application = SimpleNamespace(config={'AIO_EXECUTOR_TYPE': 'process', 'AIO_EXECUTOR_WORKERS': '1',
+                                              'model': build_pid_model(), 'batcher': Mock()})
+        with self.assertRaisesRegex(Exception, 'Micro batching'):
+            build_model_executor(application)
+
+
+if __name__ == '__main__':
+    unittest2.main()
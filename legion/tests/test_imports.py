@@ -0,0 +1,65 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+
+import legion.utils
+import unittest2
+
+
+def get_imported_modules(module):
+    """
+    Get names of modules that are loaded by import of module in new interpreter
+
+    :param module: name of module
+    :type module: str
+    :return: set[str] -- names of loaded modules
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True,
+                             cwd=os.path.join(os.path.dirname(__file__), '..'))
+
+    return {line.split('|')[-1].strip() for line in process.stderr.splitlines() if line.startswith('import time:')}
+
+
+class TestImports(unittest2.TestCase):
+    def test_cli_imports(self):
+        modules = get_imported_modules('legion.edi.deploy')
+        self.assertIn('legion.containers.k8s', modules)
+
+        for heavy_module in 'docker', 'kubernetes', 'consul', 'flask', 'pandas', 'numpy', 'dill', 'PIL.Image':
+            self.assertNotIn(heavy_module, modules)
+
+    def test_serving_imports(self):
+        modules = get_imported_modules('legion.serving.pyserve')
+        self.assertIn('flask', modules)
+
+        for heavy_module in 'docker', 'kubernetes', 'consul', 'PIL.Image':
+            self.assertNotIn(heavy_module, modules)
+
+    def test_lazy_import(self):
+        module = legion.utils.lazy_import('legion.containers.headers')
+        self.assertEqual(module.MODEL_ID, 'Model-Id')
+
+        with self.assertRaises(ImportError):
+            legion.utils.lazy_import('legion.not_existed_module')
+
+
+if __name__ == '__main__':
+    unittest2.main()
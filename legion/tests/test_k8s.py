@@ -15,13 +15,30 @@
 #
 from __future__ import print_function
 
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from types import SimpleNamespace
+import json
 import os
 import os.path
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import Mock, patch
 
 import legion.containers.k8s
+import legion.containers.k8s_index
 import legion.config
+from kubernetes.config import kube_config
 import unittest2
 
+try:
+    from .legion_test_utils import patch_environ
+except ImportError:
+    from legion_test_utils import patch_environ
+
 
 class TestK8S(unittest2.TestCase):
     def setUp(self):
@@ -41,6 +58,277 @@ class TestK8S(unittest2.TestCase):
         self.assertIsInstance(config, dict)
         self.assertDictEqual(config, valid)
 
+    def test_model_probes(self):
+        labels = {'com.epam.legion.readiness-check': 'true'}
+        liveness, readiness = legion.containers.k8s.build_model_probes(labels, 900)
+        self.assertEqual(liveness.http_get.path, '/healthcheck')
+        self.assertEqual(liveness.initial_delay_seconds, 900)
+        self.assertEqual(readiness.http_get.path, '/ready')
+
+        # Images of older legion versions have no readiness endpoint
+        liveness, readiness = legion.containers.k8s.build_model_probes({})
+        self.assertEqual(liveness.initial_delay_seconds, legion.config.MODEL_STARTUP_TIMEOUT[1])
+        self.assertEqual(readiness.http_get.path, '/healthcheck')
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ProbedEdgeHandler(BaseHTTPRequestHandler):
+    """
+    Edge that answers model info requests after delay from model id: /api/model/<delay in ms>/info
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        model_id = self.path.split('/')[3]
+        time.sleep(int(model_id) / 1000)
+        body = json.dumps({'model_id': model_id}).encode('utf-8')
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+
+class TestK8SInspectProbes(unittest2.TestCase):
+    def setUp(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), ProbedEdgeHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self._edge_url = 'http://127.0.0.1:%d' % self._server.server_address[1]
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def test_probes_are_concurrent(self):
+        model_ids = ['300'] * 20
+        started = time.monotonic()
+        results = legion.containers.k8s.probe_models_api(model_ids, self._edge_url, threads=20, timeout=2.0)
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual(len(results), len(model_ids))
+        for model_api_ok, model_api_info in results:
+            self.assertTrue(model_api_ok)
+            self.assertDictEqual(model_api_info['result'], {'model_id': '300'})
+
+    def test_hung_model_does_not_block_results(self):
+        model_ids = ['10', '5000', '20']
+        started = time.monotonic()
+        results = legion.containers.k8s.probe_models_api(model_ids, self._edge_url, threads=4, timeout=0.5)
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 2.0)
+        self.assertListEqual([model_api_ok for model_api_ok, _ in results], [True, False, True])
+        self.assertIn('exception', results[1][1])
+        self.assertEqual(results[2][1]['result']['model_id'], '20')
+
+    def test_session_outlives_hung_probes(self):
+        release = threading.Event()
+        session = Mock()
+
+        def probe(model_id, edge_url, timeout, http_client):
+            if model_id == 'hung':
+                release.wait(5)
+            return True, {'result': model_id}
+
+        with patch('legion.containers.k8s.build_session', return_value=session), \
+                patch('legion.containers.k8s.probe_model_api', side_effect=probe):
+            results = legion.containers.k8s.probe_models_api(['a', 'hung', 'b', 'c'], self._edge_url,
+                                                             threads=2, timeout=0.3)
+            self.assertListEqual([model_api_ok for model_api_ok, _ in results], [True, False, True, True])
+            session.close.assert_not_called()
+
+            release.set()
+            deadline = time.monotonic() + 5
+            while not session.close.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+            session.close.assert_called_once_with()
+
+    def test_empty_models_list(self):
+        self.assertListEqual(legion.containers.k8s.probe_models_api([], self._edge_url), [])
+
+
+def build_deployment(name, model_id, model_version, replicas=1, container_type='model', resource_version='1',
+                     namespace='default'):
+    labels = {
+        legion.containers.k8s_index.MODEL_TYPE_LABEL: container_type,
+        legion.containers.k8s_index.MODEL_ID_LABEL: model_id,
+        legion.containers.k8s_index.MODEL_VERSION_LABEL: model_version,
+    }
+    metadata = SimpleNamespace(name=name, namespace=namespace, labels=labels, resource_version=resource_version)
+    return SimpleNamespace(metadata=metadata, spec=SimpleNamespace(replicas=replicas))
+
+
+class FakeDeploymentSource:
+    """
+    Source of deployments with list content and watch events set by test
+    """
+
+    def __init__(self, deployments):
+        self.deployments = deployments
+        self.events = queue.Queue()
+        self.lists = 0
+
+    def list(self):
+        self.lists += 1
+        return list(self.deployments), str(self.lists)
+
+    def watch(self, resource_version, timeout):
+        while True:
+            event = self.events.get(timeout=timeout)
+            if event is None:
+                return
+            yield event
+
+    def stop(self):
+        self.events.put(None)
+
+
+class TestModelDeploymentIndex(unittest2.TestCase):
+    def setUp(self):
+        self.source = FakeDeploymentSource([
+            build_deployment('model-a-1', 'model-a', '1.0'),
+            build_deployment('model-b-1', 'model-b', '1.0'),
+            build_deployment('other', 'model-c', '1.0', container_type='other'),
+        ])
+        self.index = legion.containers.k8s_index.ModelDeploymentIndex(self.source, resync_period=10, retry_delay=0.05)
+
+    def tearDown(self):
+        self.index.stop(5)
+        legion.containers.k8s.stop_deployment_indexes()
+
+    def _wait_for_events(self, count):
+        deadline = time.monotonic() + 5
+        while self.index.events < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.index.events, count)
+
+    def test_resync(self):
+        self.index.resync()
+        self.assertTrue(self.index.synced)
+        self.assertEqual(self.index.get('model-a').metadata.name, 'model-a-1')
+        self.assertEqual(self.index.get('model b', '1.0').metadata.name, 'model-b-1')
+        self.assertIsNone(self.index.get('model-a', '2.0'))
+        self.assertIsNone(self.index.get('model-c'))
+        self.assertSetEqual({d.metadata.name for d in self.index.get_all()}, {'model-a-1', 'model-b-1'})
+
+    def test_watch_events(self):
+        self.index.start()
+        self.assertTrue(self.index.wait(5))
+
+        self.source.events.put(('ADDED', build_deployment('model-a-2', 'model-a', '2.0', resource_version='10')))
+        self.source.events.put(('MODIFIED', build_deployment('model-b-1', 'model-b', '1.0', replicas=3)))
+        self.source.events.put(('DELETED', build_deployment('model-a-1', 'model-a', '1.0')))
+        self._wait_for_events(3)
+
+        self.assertEqual(self.index.get('model-a').metadata.name, 'model-a-2')
+        self.assertIsNone(self.index.get('model-a', '1.0'))
+        self.assertEqual(self.index.get('model-b').spec.replicas, 3)
+        self.assertEqual(len(self.index.get_all()), 2)
+
+    def test_resync_after_watch_error(self):
+        self.index.start()
+        self.assertTrue(self.index.wait(5))
+
+        self.source.deployments = [build_deployment('model-d-1', 'model-d', '1.0')]
+        self.source.events.put(('ERROR', {'code': 410}))
+        deadline = time.monotonic() + 5
+        while self.index.resyncs < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(self.index.resyncs, 2)
+        self.assertIsNone(self.index.get('model-a'))
+        self.assertEqual(self.index.get('model-d').metadata.name, 'model-d-1')
+
+    def test_lookups_use_index(self):
+        index = legion.containers.k8s.start_deployment_index('default', source=self.source)
+        self.assertTrue(index.wait(5))
+        self.assertIs(legion.containers.k8s.start_deployment_index('default', source=self.source), index)
+
+        self.assertEqual(legion.containers.k8s.find_model_deployment('model-a', 'default').metadata.name, 'model-a-1')
+        self.assertEqual(len(legion.containers.k8s.find_all_models_deployments('default')), 2)
+        self.assertIsNone(legion.containers.k8s.get_deployment_index('other-namespace'))
+
+    def test_namespaces_do_not_collide(self):
+        self.source.deployments.append(build_deployment('model-a-1', 'model-a', '1.0', namespace='other'))
+        self.index.resync()
+
+        self.assertEqual(len(self.index.get_all()), 3)
+        self.assertEqual(self.index.get('model-a', '1.0', 'other').metadata.namespace, 'other')
+        self.assertEqual(self.index.get('model-a', namespace='default').metadata.namespace, 'default')
+        self.assertIsNone(self.index.get('model-b', namespace='other'))
+
+        self.index.apply_event('DELETED', build_deployment('model-a-1', 'model-a', '1.0', namespace='other'))
+        self.assertIsNone(self.index.get('model-a', namespace='other'))
+        self.assertEqual(self.index.get('model-a').metadata.namespace, 'default')
+
+    def test_lookup_falls_back_to_api_on_index_miss(self):
+        index = legion.containers.k8s.start_deployment_index('default', source=self.source)
+        self.assertTrue(index.wait(5))
+
+        # Deployment is created but watch event has not been received yet
+        created = build_deployment('model-e-1', 'model-e', '1.0')
+        api = Mock()
+        api.list_namespaced_deployment.return_value = SimpleNamespace(items=[created])
+        with patch('legion.containers.k8s.get_client'), \
+                patch('kubernetes.client.ExtensionsV1beta1Api', return_value=api, create=True):
+            self.assertIs(legion.containers.k8s.find_model_deployment('model-e', 'default'), created)
+            self.assertEqual(legion.containers.k8s.find_model_deployment('model-a', 'default').metadata.name,
+                             'model-a-1')
+
+        api.list_namespaced_deployment.assert_called_once_with('default')
+
+
+class TestK8SClient(unittest2.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        path = os.path.join(self._directory, 'kubeconfig')
+        with open(path, 'w') as stream:
+            json.dump({
+                'apiVersion': 'v1',
+                'kind': 'Config',
+                'clusters': [{'name': 'test', 'cluster': {'server': 'http://127.0.0.1:1'}}],
+                'users': [{'name': 'test', 'user': {'token': 'test-token'}}],
+                'contexts': [{'name': 'test', 'context': {'cluster': 'test', 'user': 'test'}}],
+                'current-context': 'test',
+            }, stream)
+
+        self._default_location = kube_config.KUBE_CONFIG_DEFAULT_LOCATION
+        kube_config.KUBE_CONFIG_DEFAULT_LOCATION = path
+        legion.containers.k8s.reset_client()
+
+    def tearDown(self):
+        legion.containers.k8s.reset_client()
+        kube_config.KUBE_CONFIG_DEFAULT_LOCATION = self._default_location
+        shutil.rmtree(self._directory)
+
+    def test_client_is_shared(self):
+        with patch_environ({legion.config.K8S_CLIENT_POOL_SIZE[0]: '7'}):
+            client = legion.containers.k8s.get_client()
+            self.assertIs(legion.containers.k8s.get_client(), client)
+            self.assertEqual(client.configuration.connection_pool_maxsize, 7)
+            self.assertEqual(client.configuration.host, 'http://127.0.0.1:1')
+
+            legion.containers.k8s.reset_client()
+            self.assertIsNot(legion.containers.k8s.get_client(), client)
+
+    def test_client_is_refreshed(self):
+        with patch_environ({legion.config.K8S_CLIENT_REFRESH_PERIOD[0]: '0.05'}):
+            client = legion.containers.k8s.get_client()
+            time.sleep(0.1)
+            with patch.object(client.rest_client.pool_manager, 'clear') as clear:
+                self.assertIsNot(legion.containers.k8s.get_client(), client)
+            clear.assert_called_once_with()
+
 
 if __name__ == '__main__':
     unittest2.main()
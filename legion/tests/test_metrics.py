@@ -16,6 +16,9 @@
 from __future__ import print_function
 
 import os
+import socket
+import socketserver
+import threading
 import time
 from unittest.mock import patch
 
@@ -24,6 +27,51 @@ import legion.metrics as metrics
 import legion.model.model_id
 import unittest2
 
+try:
+    from .legion_test_utils import patch_environ
+except ImportError:
+    from legion_test_utils import patch_environ
+
+
+class GraphiteHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.connections.append(self.connection)
+        try:
+            for line in self.rfile:
+                self.server.lines.append(line.decode('utf-8').strip())
+        except ConnectionResetError:
+            pass
+
+
+class GraphiteServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0):
+        super(GraphiteServer, self).__init__(('127.0.0.1', port), GraphiteHandler)
+        self.lines = []
+        self.connections = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def wait_lines(self, count, timeout=5.0):
+        deadline = time.time() + timeout
+        while len(self.lines) < count and time.time() < deadline:
+            time.sleep(0.01)
+        return self.lines
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        for connection in self.connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
 
 def _reset_model_id():
     legion.model.model_id._model_id = None
@@ -88,7 +136,8 @@ class TestMetrics(unittest2.TestCase):
         with patch('legion.model.model_id.send_model_id') as send_model_id_mock:
             with MetricContent(model_id, build_number, init_at_startup=False):
                 self.assertEqual(len(send_model_id_mock.call_args_list), 0)
-                with patch('legion.metrics.send_tcp') as send_tcp_mock:
+                with patch('legion.metrics.send_tcp') as send_tcp_mock, \
+                        patch_environ({env.METRICS_MODE[0]: metrics.MODE_DIRECT}):
                     timestamp = int(time.time())
                     metrics.send_metric(metric, value)
 
@@ -113,6 +162,197 @@ class TestMetrics(unittest2.TestCase):
                     self.assertEqual(int(float(call_with_build_number[1])), build_number)
                     self.assertEqual(call_with_build_number[2], str(timestamp))
 
+    def test_metrics_send_buffered(self):
+        server = GraphiteServer()
+        client = metrics.GraphiteClient('127.0.0.1', server.port, flush_interval=0.05)
+        try:
+            with patch('legion.metrics.get_metrics_client', return_value=client), \
+                    patch_environ({env.MODEL_ID[0]: 'demo', env.BUILD_NUMBER[0]: '10'}), \
+                    patch('legion.model.model_id.send_model_id'):
+                metrics.send_metric(metrics.Metric.TEST_ACCURACY, 30.0)
+                metrics.send_metric(metrics.Metric.TRAINING_LOSS, 0.5)
+
+            lines = server.wait_lines(4)
+            self.assertEqual(len(lines), 4)
+            self.assertEqual(len(server.connections), 1)
+            metric_prefix = '%s.demo.metrics.%s ' % (env.GRAPHITE_NAMESPACE[1], metrics.Metric.TEST_ACCURACY.value)
+            self.assertTrue(lines[0].startswith(metric_prefix + '30.0 '))
+            self.assertTrue(lines[1].startswith('%s.demo.metrics.build 10 ' % env.GRAPHITE_NAMESPACE[1]))
+        finally:
+            client.close()
+            server.close()
+
+    def test_graphite_client_flush_and_reconnect(self):
+        server = GraphiteServer()
+        port = server.port
+        client = metrics.GraphiteClient('127.0.0.1', port, flush_interval=60.0)
+        try:
+            client.send('a.b', 1, 100)
+            client.send('a.c', 2, 100)
+            self.assertTrue(client.flush())
+            self.assertEqual(server.wait_lines(2), ['a.b 1 100', 'a.c 2 100'])
+
+            server.close()
+            # Values are kept in buffer while server is unavailable
+            client.send('a.d', 3, 100)
+            for _ in range(100):
+                if not client.flush():
+                    break
+                client.send('a.d', 3, 100)
+            self.assertGreater(len(client._buffer), 0)
+
+            server = GraphiteServer(port)
+            client.close()
+            self.assertEqual(server.wait_lines(1), ['a.d 3 100'])
+            self.assertEqual(len(client._buffer), 0)
+        finally:
+            client.close()
+            server.close()
+
+    def test_graphite_client_buffer_overflow(self):
+        client = metrics.GraphiteClient('127.0.0.1', 1, flush_interval=60.0, max_buffer_size=3)
+        client._start = lambda: None
+        for value in range(5):
+            client.send('a.b', value, 100)
+
+        self.assertEqual(client.dropped, 2)
+        self.assertEqual(list(client._buffer), ['a.b %d 100\n' % value for value in (2, 3, 4)])
+
+    def test_graphite_values_keep_precision(self):
+        client = metrics.GraphiteClient('127.0.0.1', 1, flush_interval=60.0)
+        client._start = lambda: None
+        client.send('a.b', 1e-7, 100)
+        client.send('a.c', 123456789.123, 100)
+        self.assertEqual(list(client._buffer), ['a.b 1e-07 100\n', 'a.c 123456789.123 100\n'])
+
+        with patch('legion.metrics.send_tcp') as send_tcp_mock, \
+                patch('legion.metrics.get_metric_endpoint', return_value=('127.0.0.1', 1, 'ns')):
+            metrics._build_aggregator_sink(metrics.MODE_DIRECT)([('a.b', 1e-7), ('a.c', 2)], 100)
+        self.assertEqual(send_tcp_mock.call_args[0][2], 'a.b 1e-07 100\na.c 2 100\n')
+
+    def test_statsd_client_aggregation(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as server:
+            server.bind(('127.0.0.1', 0))
+            server.settimeout(5.0)
+            client = metrics.StatsdClient('127.0.0.1', server.getsockname()[1], flush_interval=60.0,
+                                          max_packet_size=40)
+            try:
+                client.gauge('model.loss', 0.5)
+                client.gauge('model.loss', 0.25)
+                client.gauge('model.delta', -1.5)
+                client.gauge('model.precise', 123456.789)
+                client.increment('model.epochs')
+                client.increment('model.epochs', 2)
+                client.timing('model.epoch', 15)
+                self.assertTrue(client.flush())
+
+                lines = []
+                while len(lines) < 6:
+                    packet = server.recv(65536)
+                    self.assertLessEqual(len(packet), 40)
+                    lines.extend(packet.decode('utf-8').split('\n'))
+            finally:
+                client.close()
+
+        self.assertEqual(sorted(lines), ['model.delta:-1.5|g', 'model.delta:0|g', 'model.epoch:15|ms',
+                                         'model.epochs:3|c', 'model.loss:0.25|g', 'model.precise:123456.789|g'])
+        self.assertEqual(lines.index('model.delta:0|g') + 1, lines.index('model.delta:-1.5|g'))
+
+    def test_distribution_percentiles(self):
+        distribution = metrics.Distribution(reservoir_size=1000)
+        for value in range(1, 101):
+            distribution.add(float(value))
+
+        summary = dict(distribution.summary())
+        self.assertEqual(summary['count'], 100)
+        self.assertEqual(summary['mean'], 50.5)
+        self.assertEqual(summary['min'], 1.0)
+        self.assertEqual(summary['max'], 100.0)
+        self.assertEqual(summary['p50'], 50.0)
+        self.assertEqual(summary['p90'], 90.0)
+        self.assertEqual(summary['p99'], 99.0)
+
+    def test_distribution_reservoir_is_bounded(self):
+        distribution = metrics.Distribution(reservoir_size=10)
+        for value in range(1000):
+            distribution.add(value)
+
+        self.assertEqual(distribution.count, 1000)
+        self.assertEqual(len(distribution._reservoir), 10)
+        self.assertEqual(distribution.max, 999)
+        self.assertTrue(0 <= distribution.percentile(50) <= 999)
+
+    def test_aggregator_rollups(self):
+        flushed = []
+        aggregator = metrics.MetricsAggregator(lambda values, timestamp: flushed.append((dict(values), timestamp)),
+                                               lambda metric: 'model.%s' % metric, flush_interval=60.0)
+        try:
+            for value in (1, 2, 3, 4):
+                aggregator.observe('loss', value)
+            aggregator.increment('batches')
+            aggregator.increment('batches', 9)
+            with aggregator.timer('epoch'):
+                time.sleep(0.01)
+
+            self.assertTrue(aggregator.flush())
+            self.assertEqual(len(flushed), 1)
+            values, timestamp = flushed[0]
+            self.assertAlmostEqual(timestamp, time.time(), delta=2)
+
+            self.assertEqual(values['model.loss.count'], 4)
+            self.assertEqual(values['model.loss.mean'], 2.5)
+            self.assertEqual(values['model.loss.max'], 4)
+            self.assertEqual(values['model.loss.p50'], 2)
+            self.assertEqual(values['model.batches.count'], 10)
+            self.assertGreater(values['model.batches.rate'], 0)
+            self.assertEqual(values['model.epoch.count'], 1)
+            self.assertGreaterEqual(values['model.epoch.max'], 10)
+
+            # New interval starts empty
+            self.assertTrue(aggregator.flush())
+            self.assertEqual(len(flushed), 1)
+        finally:
+            aggregator.close()
+
+    def test_aggregator_timer_decorator(self):
+        aggregator = metrics.MetricsAggregator(lambda values, timestamp: None, flush_interval=60.0)
+
+        @aggregator.timer('apply')
+        def apply(value):
+            return value * 2
+
+        try:
+            self.assertEqual(apply(2), 4)
+            self.assertEqual(apply(3), 6)
+            self.assertEqual(aggregator._distributions['apply'].count, 2)
+        finally:
+            aggregator.close()
+
+    def test_aggregated_metrics_send(self):
+        server = GraphiteServer()
+        try:
+            with patch_environ({env.METRICS_MODE[0]: metrics.MODE_DIRECT, env.MODEL_ID[0]: 'demo',
+                                env.GRAPHITE_HOST[0]: '127.0.0.1', env.GRAPHITE_PORT[0]: str(server.port)}), \
+                    patch('legion.model.model_id.send_model_id'), \
+                    patch('legion.metrics._aggregator', None):
+                metrics.observe(metrics.Metric.TRAINING_LOSS, 0.5)
+                metrics.increment('batches')
+                aggregator = metrics.get_aggregator()
+                self.assertTrue(metrics.flush_metrics())
+                aggregator.close()
+
+            names = [line.split(' ')[0] for line in server.wait_lines(8)]
+            prefix = '%s.demo.metrics.' % env.GRAPHITE_NAMESPACE[1]
+            self.assertIn(prefix + metrics.Metric.TRAINING_LOSS.value + '.p99', names)
+            self.assertIn(prefix + 'batches.rate', names)
+        finally:
+            server.close()
+
+    def test_unknown_metrics_mode(self):
+        with patch_environ({env.METRICS_MODE[0]: 'unknown'}):
+            with self.assertRaises(Exception):
+                metrics.get_metrics_mode()
+
     def test_set_model_id_and_reset_metrics(self):
         model_id = 'demo'
         build_number = 10
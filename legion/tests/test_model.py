@@ -17,6 +17,8 @@
 Test models
 """
 
+import pickle
+
 import legion.io
 import legion.model
 import legion.model.types as types
@@ -104,6 +106,27 @@ class TestScipyModel(unittest2.TestCase):
         s.apply({'d_int': '1', 'd_float': '2.0', 'd_str': 'omg', 'excessive': 'of course'})
         print(s.description)
 
+    def test_input_schema_is_not_pickled(self):
+        model = legion.model.model.ScipyModel(
+            sum_columns,
+            identity,
+            {'a': types.ColumnInformation(types.Integer, numpy.int64)},
+            version='1.0')
+        self.assertEqual(model.apply({'a': '2'}), 2)
+        self.assertIn('_input_schema', model.__dict__)
+
+        loaded_model = pickle.loads(pickle.dumps(model))
+        self.assertNotIn('_input_schema', loaded_model.__dict__)
+        self.assertEqual(loaded_model.apply({'a': '3'}), 3)
+
+
+def identity(x):
+    return x
+
+
+def sum_columns(x):
+    return int(x['a'].sum())
+
 
 if __name__ == '__main__':
     unittest2.main()
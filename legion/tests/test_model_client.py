@@ -15,13 +15,21 @@
 #
 from __future__ import print_function
 
+import asyncio
+import io
+import json
+import shutil
+import tempfile
 import unittest2
 import os
 
 try:
-    from .legion_test_utils import patch_environ
+    from .legion_test_utils import patch_environ, ModelServeTestBuild, LocalModelServer, LocalFileServer
+    from .legion_test_models import create_simple_summation_model_by_df
 except ImportError:
-    from legion_test_utils import patch_environ
+    from legion_test_utils import patch_environ, ModelServeTestBuild, LocalModelServer, LocalFileServer
+    from legion_test_models import create_simple_summation_model_by_df
+import numpy
 import legion.config
 import legion.model.client
 import legion.serving.pyserve as pyserve
@@ -63,6 +71,118 @@ class TestModelClient(unittest2.TestCase):
             self.assertEqual(client.info_url, root_url + '/info')
             self.assertEqual(client.invoke_url, root_url + '/invoke')
 
+    def test_invoke_binary(self):
+        with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                 create_simple_summation_model_by_df) as model:
+            client = legion.model.client.ModelClient(self.MODEL_ID, use_relative_url=True,
+                                                     http_client=FlaskHttpClient(model.client))
+
+            result = client.invoke_binary(a=1, b=numpy.int32(2))
+            self.assertIsInstance(result['x'], numpy.ndarray)
+            self.assertEqual(result['x'], 3)
+            self.assertDictEqual(client.invoke(a=1, b=2), {'x': 3})
+
+    def test_pooled_client(self):
+        self.assertIs(legion.model.client.ModelClient(self.MODEL_ID)._http_client,
+                      legion.model.client.ModelClient('other')._http_client)
+
+        with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                 create_simple_summation_model_by_df) as model, \
+                LocalModelServer(model.application) as server:
+            session = legion.model.client.build_session(2)
+            client = legion.model.client.ModelClient(self.MODEL_ID, server.url, http_client=session)
+
+            for i in range(5):
+                self.assertDictEqual(client.invoke(a=i, b=1), {'x': i + 1})
+            self.assertListEqual(client.invoke_batch([{'a': 1, 'b': 2}, {'a': numpy.int64(3), 'b': 4}]),
+                                 [{'x': 3}, {'x': 7}])
+            self.assertListEqual(client.invoke_batch({'a': [1], 'b': [1]}), [{'x': 2}])
+            self.assertEqual(client.info()['version'], self.MODEL_VERSION)
+
+            pools = session.get_adapter(server.url).poolmanager.pools
+            self.assertEqual(len(pools), 1)
+            self.assertEqual(pools[list(pools.keys())[0]].num_connections, 1)
+            session.close()
+
+    def test_async_client(self):
+        async def invoke(url):
+            async with legion.model.client.AsyncModelClient(self.MODEL_ID, url, pool_size=4) as client:
+                results = await client.invoke_many([{'a': i, 'b': 1} for i in range(20)])
+                batch = await client.invoke_batch({'a': [1, 2], 'b': [3, 4]})
+                binary = await client.invoke_binary(a=1, b=2)
+                info = await client.info()
+                return results, batch, binary, info
+
+        with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                 create_simple_summation_model_by_df) as model, \
+                LocalModelServer(model.application) as server:
+            loop = asyncio.new_event_loop()
+            try:
+                results, batch, binary, info = loop.run_until_complete(invoke(server.url))
+            finally:
+                loop.close()
+
+        self.assertListEqual(results, [{'x': i + 1} for i in range(20)])
+        self.assertListEqual(batch, [{'x': 4}, {'x': 6}])
+        self.assertEqual(binary['x'], 3)
+        self.assertEqual(info['version'], self.MODEL_VERSION)
+
+    def test_retries(self):
+        directory = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(directory, 'api', 'model', self.MODEL_ID))
+            with open(os.path.join(directory, 'api', 'model', self.MODEL_ID, 'info'), 'w') as info_file:
+                json.dump({'version': self.MODEL_VERSION}, info_file)
+
+            with LocalFileServer(directory) as server:
+                host = server.url('').rstrip('/')
+                server.failing_status = 503
+
+                server.failing_requests = 2
+                client = legion.model.client.ModelClient(self.MODEL_ID, host, retries=2)
+                self.assertDictEqual(client.info(), {'version': self.MODEL_VERSION})
+                self.assertEqual(len(server.requests), 3)
+
+                server.failing_requests = 2
+                with self.assertRaises(Exception):
+                    legion.model.client.ModelClient(self.MODEL_ID, host, retries=1).info()
+
+                server.failing_requests = 2
+                loop = asyncio.new_event_loop()
+                try:
+                    client = legion.model.client.AsyncModelClient(self.MODEL_ID, host, retries=2)
+                    self.assertDictEqual(loop.run_until_complete(client.info()), {'version': self.MODEL_VERSION})
+                    loop.run_until_complete(client.close())
+                finally:
+                    loop.close()
+        finally:
+            shutil.rmtree(directory)
+
+
+class FlaskHttpClient:
+    """
+    requests-like HTTP client for Flask test client
+    """
+
+    def __init__(self, flask_client):
+        self._flask_client = flask_client
+
+    def _wrap(self, response, url):
+        response.content = response.data
+        response.text = response.get_data(as_text=True)
+        response.url = url
+        return response
+
+    def post(self, url, data=None, files=None, headers=None):
+        headers = dict(headers or {})
+        content_type = headers.pop('Content-Type', None)
+        if files:
+            data = dict(data or {}, **{k: (io.BytesIO(v), k) for k, v in files.items()})
+        return self._wrap(self._flask_client.post(url, data=data, headers=headers, content_type=content_type), url)
+
+    def get(self, url, **kwargs):
+        return self._wrap(self._flask_client.get(url, **kwargs), url)
+
 
 if __name__ == '__main__':
     unittest2.main()
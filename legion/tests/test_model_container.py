@@ -15,12 +15,24 @@
 #
 from __future__ import print_function
 
+import json
+import mmap
 import os
+import pickle
+import tempfile
+import zipfile
+from unittest.mock import patch
+
+try:
+    from .legion_test_utils import LocalFileServer
+except ImportError:
+    from legion_test_utils import LocalFileServer
 
 import legion.io
 import legion.model
 import legion.model.model_id
 import legion.model.types
+import legion.utils
 import numpy
 import pandas
 import unittest2
@@ -73,6 +85,201 @@ class TestModelContainer(unittest2.TestCase):
             if os.path.exists(path):
                 os.unlink(path)
 
+    def test_model_load_compressed_and_metadata_only(self):
+        df = pandas.DataFrame([{
+            'a': 1,
+        }])
+
+        path = 'test.model'
+        compressed_path = 'test-compressed.model'
+
+        try:
+            legion.model.model_id._model_id = None
+            legion.model.model_id.init('demo-model')
+            legion.io.export(path, lambda x: {'result': int(x['a'])}, input_data_frame=df, use_df=False,
+                             version='1.0')
+
+            with zipfile.ZipFile(path, 'r') as source, \
+                    zipfile.ZipFile(compressed_path, 'w', zipfile.ZIP_DEFLATED) as target:
+                for name in source.namelist():
+                    target.writestr(name, source.read(name))
+
+            for model_path in path, compressed_path:
+                with legion.io.ModelContainer(model_path) as container:
+                    self.assertEqual(container['model.version'], '1.0')
+                    self.assertDictEqual(container.model.apply({'a': '5'}), {'result': 5})
+
+                with legion.io.ModelContainer(model_path, do_not_load_model=True) as container:
+                    self.assertEqual(container['model.id'], 'demo-model')
+                    self.assertIsNone(container._model)
+        finally:
+            legion.model.model_id._model_id = None
+            for model_path in path, compressed_path:
+                if os.path.exists(model_path):
+                    os.unlink(model_path)
+
+    def test_model_arrays_stored_out_of_band(self):
+        weights = numpy.arange(100000, dtype=numpy.float64)
+        matrix = numpy.asfortranarray(numpy.arange(40000, dtype=numpy.int32).reshape(200, 200))
+        small = numpy.arange(10)
+
+        def apply(x):
+            return {'result': float(weights[int(x['a'])] + matrix[1, 0] + small[1])}
+
+        df = pandas.DataFrame([{
+            'a': 1,
+        }])
+
+        path = 'test.model'
+        compressed_path = 'test-compressed.model'
+
+        try:
+            legion.model.model_id._model_id = None
+            legion.model.model_id.init('demo-model')
+            legion.io.export(path, apply, input_data_frame=df, use_df=False, version='1.0')
+
+            with zipfile.ZipFile(path, 'r') as source, \
+                    zipfile.ZipFile(compressed_path, 'w', zipfile.ZIP_DEFLATED) as target:
+                buffer_names = [name for name in source.namelist()
+                                if name.startswith(legion.io.ModelContainer.ZIP_BUFFERS_PREFIX)]
+                self.assertEqual(len(buffer_names), 2)
+
+                for name in source.namelist():
+                    target.writestr(name, source.read(name))
+
+                with open(path, 'rb') as file:
+                    for name in buffer_names:
+                        offset = legion.io._get_member_data_offset(file, source.getinfo(name))
+                        self.assertEqual(offset % legion.io.ModelContainer.BUFFER_ALIGNMENT, 0)
+
+            for model_path in path, compressed_path:
+                with legion.io.ModelContainer(model_path) as container:
+                    self.assertEqual(container['legion.container_format'], '2')
+                    self.assertDictEqual(container.model.apply({'a': '5'}), {'result': 206.0})
+
+                    loaded_weights, = [cell.cell_contents for cell in container.model.apply_func.__closure__
+                                       if getattr(cell.cell_contents, 'size', None) == weights.size]
+                    numpy.testing.assert_array_equal(loaded_weights, weights)
+                    # Arrays are writable, changes are not written to file (copy-on-write mapping)
+                    self.assertTrue(loaded_weights.flags.writeable)
+                    loaded_weights[0] = -1
+
+            with legion.io.ModelContainer(path) as container:
+                self.assertDictEqual(container.model.apply({'a': '5'}), {'result': 206.0})
+                loaded_weights, = [cell.cell_contents for cell in container.model.apply_func.__closure__
+                                   if getattr(cell.cell_contents, 'size', None) == weights.size]
+                self.assertEqual(loaded_weights[0], weights[0])
+        finally:
+            legion.model.model_id._model_id = None
+            for model_path in path, compressed_path:
+                if os.path.exists(model_path):
+                    os.unlink(model_path)
+
+    def test_model_file_closed_on_failed_load(self):
+        weights = numpy.arange(100000, dtype=numpy.float64)
+
+        def apply(x):
+            return {'result': float(weights[int(x['a'])])}
+
+        df = pandas.DataFrame([{
+            'a': 1,
+        }])
+
+        path = 'test.model'
+        memories = []
+        create_memory = mmap.mmap
+        persistent_load = legion.io._ModelUnpickler.persistent_load
+
+        def build_memory(*args, **kwargs):
+            memories.append(create_memory(*args, **kwargs))
+            return memories[-1]
+
+        def fail_load(unpickler, pid):
+            # Array on mapped memory is built before failure
+            persistent_load(unpickler, pid)
+            raise pickle.UnpicklingError('Broken model')
+
+        try:
+            legion.model.model_id._model_id = None
+            legion.model.model_id.init('demo-model')
+            legion.io.export(path, apply, input_data_frame=df, use_df=False, version='1.0')
+
+            with patch('legion.io.mmap.mmap', side_effect=build_memory), \
+                    patch.object(legion.io._ModelUnpickler, 'persistent_load', fail_load):
+                with self.assertRaisesRegex(Exception, 'Broken model'):
+                    legion.io.ModelContainer(path)
+
+            self.assertEqual(len(memories), 1)
+            self.assertTrue(memories[0].closed)
+        finally:
+            legion.model.model_id._model_id = None
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def test_unsupported_container_format(self):
+        df = pandas.DataFrame([{
+            'a': 1,
+        }])
+
+        path = 'test.model'
+        future_path = 'test-future.model'
+
+        try:
+            legion.model.model_id._model_id = None
+            legion.model.model_id.init('demo-model')
+            legion.io.export(path, lambda x: {'result': 1}, input_data_frame=df, use_df=False, version='1.0')
+
+            with zipfile.ZipFile(path, 'r') as source, zipfile.ZipFile(future_path, 'w') as target:
+                for name in source.namelist():
+                    data = source.read(name)
+                    if name == legion.io.ModelContainer.ZIP_FILE_INFO:
+                        info = json.loads(data.decode('utf-8'))
+                        info['legion.container_format'] = str(legion.io.ModelContainer.CONTAINER_FORMAT + 1)
+                        data = json.dumps(info).encode('utf-8')
+                    target.writestr(name, data)
+
+            with self.assertRaisesRegex(Exception, 'upgrade legion'):
+                legion.io.ModelContainer(future_path)
+
+            # Meta information is still available
+            with legion.io.ModelContainer(future_path, do_not_load_model=True) as container:
+                self.assertEqual(container['model.id'], 'demo-model')
+        finally:
+            legion.model.model_id._model_id = None
+            for model_path in path, future_path:
+                if os.path.exists(model_path):
+                    os.unlink(model_path)
+
+    def test_model_metadata_from_external_resource(self):
+        weights = numpy.arange(500000, dtype=numpy.float64)
+        df = pandas.DataFrame([{
+            'a': 1,
+        }])
+
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'test.model')
+
+        try:
+            legion.model.model_id._model_id = None
+            legion.model.model_id.init('demo-model')
+            legion.io.export(path, lambda x: {'result': float(weights[int(x['a'])])}, input_data_frame=df,
+                             use_df=False, version='1.0')
+
+            with LocalFileServer(directory) as server:
+                with legion.io.ModelContainer(server.url('test.model'), do_not_load_model=True) as container:
+                    self.assertEqual(container['model.id'], 'demo-model')
+                    self.assertEqual(container['model.version'], '1.0')
+                    self.assertIsNone(container._model)
+
+                self.assertLess(server.bytes_sent, os.path.getsize(path) / 10)
+                self.assertTrue(all(method == 'HEAD' or header_range for method, _, header_range in server.requests))
+
+                with self.assertRaises(Exception):
+                    legion.io.ModelContainer(server.url('test.model'))
+        finally:
+            legion.model.model_id._model_id = None
+            legion.utils.remove_directory(directory)
+
 
 if __name__ == '__main__':
     unittest2.main()
@@ -0,0 +1,101 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import print_function
+
+from unittest.mock import patch
+
+import unittest2
+
+import legion.serving.profiling as profiling
+
+
+def _spin(iterations):
+    total = 0
+    for value in range(iterations):
+        total += value
+    return total
+
+
+def _inner():
+    return _spin(20000)
+
+
+def _outer():
+    return _spin(10000) + _inner()
+
+
+def _parse_stacks(dump):
+    stacks = {}
+    for line in dump.splitlines():
+        frames, _, microseconds = line.rpartition(' ')
+        stacks[tuple(frame.split(' ')[0] for frame in frames.split(';'))] = int(microseconds)
+    return stacks
+
+
+class TestProfiling(unittest2.TestCase):
+    def test_collapsed_stacks(self):
+        profiler = profiling.RequestProfiler()
+        self.assertEqual(profiler.profile(_outer), _spin(10000) + _spin(20000))
+        self.assertEqual(profiler.profiled, 1)
+
+        stacks = _parse_stacks(profiler.dump())
+        self.assertIn(('_outer', '_spin'), stacks)
+        self.assertIn(('_outer', '_inner', '_spin'), stacks)
+        self.assertFalse([stack for stack in stacks if 'disable' in ' '.join(stack)])
+        for stack in stacks:
+            self.assertEqual(stack[0], '_outer')
+
+    def test_recursion_is_collapsed(self):
+        def fibonacci(number):
+            return number if number < 2 else fibonacci(number - 1) + fibonacci(number - 2)
+
+        profiler = profiling.RequestProfiler()
+        profiler.profile(fibonacci, 12)
+        stacks = _parse_stacks(profiler.dump())
+        self.assertEqual(list(stacks), [('fibonacci',)])
+
+    def test_sampling(self):
+        profiler = profiling.RequestProfiler(sample_every=3)
+        self.assertEqual([profiler.is_sampled() for _ in range(6)], [False, False, True, False, False, True])
+        self.assertTrue(profiler.is_sampled('1'))
+        self.assertFalse(profiler.is_sampled('false'))
+
+        profiler = profiling.RequestProfiler(sample_every=0, header_enabled=False)
+        self.assertFalse(profiler.is_sampled('1'))
+        self.assertFalse(profiler.is_sampled())
+
+    def test_windows(self):
+        profiler = profiling.RequestProfiler(window=10.0)
+        with patch('time.time', return_value=1000.0):
+            profiler.reset()
+            profiler.add({('a', 'b'): 0.001})
+        with patch('time.time', return_value=1015.0):
+            profiler.add({('a', 'c'): 0.002})
+            self.assertEqual(_parse_stacks(profiler.dump()), {('a', 'b'): 1000, ('a', 'c'): 2000})
+        with patch('time.time', return_value=1026.0):
+            self.assertEqual(_parse_stacks(profiler.dump()), {('a', 'c'): 2000})
+        with patch('time.time', return_value=1100.0):
+            self.assertEqual(profiler.dump(), '')
+
+    def test_max_stacks(self):
+        profiler = profiling.RequestProfiler(max_stacks=2)
+        profiler.add({('a',): 0.001, ('b',): 0.001, ('c',): 0.001, ('d',): 0.001})
+        self.assertEqual(_parse_stacks(profiler.dump()),
+                         {('a',): 1000, ('b',): 1000, (profiling.TRUNCATED_STACK,): 2000})
+
+
+if __name__ == '__main__':
+    unittest2.main()
@@ -18,15 +18,28 @@ from __future__ import print_function
 import unittest2
 import json
 import argparse
+import os
+import shutil
+import tempfile
+
+import numpy
 
 try:
     from .legion_test_utils import patch_environ, ModelServeTestBuild
-    from .legion_test_models import create_simple_summation_model_by_df
+    from .legion_test_models import create_simple_summation_model_by_df, \
+        create_simple_summation_model_by_df_vectorized, create_deterministic_summation_model_by_df
 except ImportError:
     from legion_test_utils import patch_environ, ModelServeTestBuild
-    from legion_test_models import create_simple_summation_model_by_df
+    from legion_test_models import create_simple_summation_model_by_df, \
+        create_simple_summation_model_by_df_vectorized, create_deterministic_summation_model_by_df
 
+import legion.config
+import legion.encoding
+import legion.serving.cache
+import legion.serving.metrics
+import legion.serving.profiling
 import legion.serving.pyserve as pyserve
+import legion.serving.warmup
 
 
 class TestModelApiEndpoints(unittest2.TestCase):
@@ -56,6 +69,26 @@ class TestModelApiEndpoints(unittest2.TestCase):
             self.assertEqual(response.status_code, 200)
             self.assertEqual(self._load_response_text(response), 'OK')
 
+    def test_readiness(self):
+        with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                 create_simple_summation_model_by_df) as model:
+            warm_up = model.application.config['warm_up']
+            self.assertTrue(warm_up.wait(10))
+            self.assertGreaterEqual(len(warm_up.latencies), 3)
+
+            # Warm-up calls are not counted in stage metrics of requests
+            response = model.client.get(pyserve.SERVE_METRICS)
+            self.assertIn('legion_model_stage_duration_seconds_count{model_id="temp",model_version="1.8",'
+                          'stage="build_df"} 0\n', self._load_response_text(response))
+
+            response = model.client.get(pyserve.SERVE_READY)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self._load_response_text(response), 'OK')
+
+            model.application.config['warm_up'] = legion.serving.warmup.ModelWarmUp(model.application.config['model'])
+            response = model.client.get(pyserve.SERVE_READY)
+            self.assertEqual(response.status_code, 503)
+
     def test_model_info(self):
         with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
                                  create_simple_summation_model_by_df) as model:
@@ -86,6 +119,195 @@ class TestModelApiEndpoints(unittest2.TestCase):
             self.assertIsInstance(result, dict, 'Result not a dict')
             self.assertDictEqual(result, {'x': a + b})
 
+    def test_model_invoke_cached(self):
+        with patch_environ({legion.config.PREDICTION_CACHE_ENABLED[0]: 'true'}), \
+                ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                    create_deterministic_summation_model_by_df) as model:
+            self.assertIn('prediction_cache', model.application.config)
+            url = pyserve.SERVE_INVOKE.format(model_id=self.MODEL_ID)
+
+            for query in ('?a=1&b=2', '?b=2&a=1', '?a=2&b=2'):
+                model.client.get(url + query)
+            result = self._parse_json_response(model.client.get(url + '?a=1&b=2'))
+            self.assertDictEqual(result, {'x': 3})
+
+            response = model.client.get(pyserve.SERVE_CACHE.format(model_id=self.MODEL_ID))
+            statistics = self._parse_json_response(response)
+            self.assertTrue(statistics['enabled'])
+            self.assertEqual(statistics['hits'], 2)
+            self.assertEqual(statistics['misses'], 2)
+            self.assertEqual(statistics['entries'], 2)
+
+    def test_model_invoke_logged(self):
+        with patch_environ({legion.config.REQUEST_LOG_SAMPLE_RATE[0]: '1.0'}), \
+                ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                    create_simple_summation_model_by_df) as model:
+            request_logger = model.application.config['request_logger']
+            url = pyserve.SERVE_INVOKE.format(model_id=self.MODEL_ID)
+            self.assertDictEqual(self._parse_json_response(model.client.get(url + '?a=1&b=2')), {'x': 3})
+
+            request_logger.flush()
+            self.assertEqual(request_logger.logged, 1)
+            request_logger.close(5)
+
+    def test_metrics(self):
+        # Warm-up is disabled, so only applications of model by requests are counted (warm-up ones are excluded)
+        with patch_environ({legion.config.WARM_UP_ENABLED[0]: 'false'}), \
+                ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                    create_simple_summation_model_by_df) as model:
+            url = pyserve.SERVE_INVOKE.format(model_id=self.MODEL_ID)
+            for _ in range(3):
+                model.client.get(url + '?a=1&b=2')
+
+            response = model.client.get(pyserve.SERVE_METRICS)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'text/plain')
+            metrics = self._load_response_text(response)
+
+            labels = 'model_id="{}",model_version="{}"'.format(self.MODEL_ID, self.MODEL_VERSION)
+            for stage in legion.serving.metrics.STAGES:
+                self.assertIn('legion_model_stage_duration_seconds_count{%s,stage="%s"} 3' % (labels, stage), metrics)
+            self.assertIn('legion_model_request_duration_seconds_count{endpoint="invoke",%s} 3' % labels, metrics)
+            self.assertIn('legion_model_requests_in_flight{%s} 0' % labels, metrics)
+
+    def test_model_invoke_profiled(self):
+        environment = {
+            legion.config.PROFILING_ENABLED[0]: 'true',
+            legion.config.PROFILING_SAMPLE_EVERY[0]: '2',
+            legion.config.WARM_UP_ENABLED[0]: 'false'
+        }
+        with patch_environ(environment), \
+                ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                    create_simple_summation_model_by_df) as model:
+            profiler = model.application.config['profiler']
+            url = pyserve.SERVE_INVOKE.format(model_id=self.MODEL_ID)
+
+            headers = {legion.serving.profiling.PROFILE_HEADER: '1'}
+            self.assertDictEqual(self._parse_json_response(model.client.get(url + '?a=1&b=2', headers=headers)),
+                                 {'x': 3})
+            self.assertEqual(profiler.profiled, 1)
+
+            # Every second request is sampled
+            for _ in range(4):
+                self.assertDictEqual(self._parse_json_response(model.client.get(url + '?a=1&b=2')), {'x': 3})
+            self.assertEqual(profiler.profiled, 3)
+
+            response = model.client.get(pyserve.SERVE_PROFILE)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'text/plain')
+            stacks = self._load_response_text(response).splitlines()
+            self.assertTrue(stacks)
+            for stack in stacks:
+                frames, _, microseconds = stack.rpartition(' ')
+                self.assertTrue(frames.startswith('apply ('))
+                self.assertGreater(int(microseconds), 0)
+
+            self.assertEqual(model.client.delete(pyserve.SERVE_PROFILE).status_code, 200)
+            self.assertEqual(self._load_response_text(model.client.get(pyserve.SERVE_PROFILE)), '')
+
+    def test_profile_disabled(self):
+        with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                 create_simple_summation_model_by_df) as model:
+            self.assertNotIn('profiler', model.application.config)
+            self.assertEqual(model.client.get(pyserve.SERVE_PROFILE).status_code, 404)
+
+    def test_metrics_disabled(self):
+        with patch_environ({legion.config.SERVING_METRICS_ENABLED[0]: 'false'}), \
+                ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                    create_simple_summation_model_by_df) as model:
+            self.assertEqual(model.client.get(pyserve.SERVE_METRICS).status_code, 404)
+
+    def test_model_invoke_cached_in_shared_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            environment = {
+                legion.config.PREDICTION_CACHE_ENABLED[0]: 'true',
+                legion.config.PREDICTION_CACHE_SHARED_FILE[0]: os.path.join(directory, 'cache')
+            }
+            with patch_environ(environment), \
+                    ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                        create_deterministic_summation_model_by_df) as model:
+                prediction_cache = model.application.config['prediction_cache']
+                self.assertIsInstance(prediction_cache, legion.serving.cache.SharedPredictionCache)
+                url = pyserve.SERVE_INVOKE.format(model_id=self.MODEL_ID)
+
+                for _ in range(3):
+                    result = self._parse_json_response(model.client.get(url + '?a=1&b=2'))
+                    self.assertDictEqual(result, {'x': 3})
+
+                self.assertEqual(prediction_cache.hits, 2)
+                self.assertEqual(prediction_cache.misses, 1)
+                prediction_cache.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_model_invoke_not_cached_for_not_deterministic_model(self):
+        with patch_environ({legion.config.PREDICTION_CACHE_ENABLED[0]: 'true'}), \
+                ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                    create_simple_summation_model_by_df) as model:
+            self.assertNotIn('prediction_cache', model.application.config)
+
+            response = model.client.get(pyserve.SERVE_CACHE.format(model_id=self.MODEL_ID))
+            self.assertDictEqual(self._parse_json_response(response), {'enabled': False})
+
+    def test_model_invoke_binary(self):
+        with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                 create_simple_summation_model_by_df) as model:
+            data = legion.encoding.encode_columns({'a': numpy.int64(10), 'b': numpy.array([20], dtype=numpy.int32)})
+
+            response = model.client.post(pyserve.SERVE_INVOKE.format(model_id=self.MODEL_ID),
+                                         data=data, content_type=legion.encoding.COLUMNS_MIME_TYPE)
+            result = self._parse_json_response(response)
+
+            self.assertDictEqual(result, {'x': 30})
+
+    def test_model_batch_binary(self):
+        with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                 create_simple_summation_model_by_df_vectorized) as model:
+            data = legion.encoding.encode_columns({'a': numpy.array([1, 10, 100]), 'b': numpy.array([2, 20, 200])})
+
+            response = model.client.post(pyserve.SERVE_BATCH.format(model_id=self.MODEL_ID),
+                                         data=data, content_type=legion.encoding.COLUMNS_MIME_TYPE)
+            result = self._parse_json_response(response)
+
+            self.assertDictEqual(result, {'x': [3, 30, 300]})
+
+    def test_model_batch_rows(self):
+        with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                 create_simple_summation_model_by_df) as model:
+            rows = [{'a': 1, 'b': 2}, {'a': '10', 'b': '20'}]
+
+            response = model.client.post(pyserve.SERVE_BATCH.format(model_id=self.MODEL_ID),
+                                         data=json.dumps(rows), content_type='application/json')
+            result = self._parse_json_response(response)
+
+            self.assertListEqual(result, [{'x': 3}, {'x': 30}])
+
+    def test_model_batch_columns_vectorized(self):
+        with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                 create_simple_summation_model_by_df_vectorized) as model:
+            columns = {'a': [1, 10, 100], 'b': [2, 20, 200]}
+
+            response = model.client.post(pyserve.SERVE_BATCH.format(model_id=self.MODEL_ID),
+                                         data=json.dumps(columns), content_type='application/json')
+            result = self._parse_json_response(response)
+
+            self.assertDictEqual(result, {'x': [3, 30, 300]})
+
+    def test_model_batch_binary_response(self):
+        with ModelServeTestBuild(self.MODEL_ID, self.MODEL_VERSION,
+                                 create_simple_summation_model_by_df_vectorized) as model:
+            columns = {'a': [1, 10, 100], 'b': [2, 20, 200]}
+
+            response = model.client.post(pyserve.SERVE_BATCH.format(model_id=self.MODEL_ID),
+                                         data=json.dumps(columns), content_type='application/json',
+                                         headers={'Accept': legion.encoding.COLUMNS_MIME_TYPE})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, legion.encoding.COLUMNS_MIME_TYPE)
+
+            result = legion.encoding.decode_columns(response.data)
+            self.assertListEqual(result['x'].tolist(), [3, 30, 300])
+
 
 if __name__ == '__main__':
     unittest2.main()
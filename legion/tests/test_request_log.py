@@ -0,0 +1,111 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import print_function
+
+import json
+import logging
+import threading
+
+from legion.serving.request_log import PayloadRepr, RequestLogger
+import numpy
+import pandas
+import unittest2
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, blocker=None):
+        super(ListHandler, self).__init__()
+        self.records = []
+        self.threads = set()
+        self.blocker = blocker
+
+    def emit(self, record):
+        if self.blocker:
+            self.blocker.wait(5)
+        self.threads.add(threading.current_thread().name)
+        self.records.append(json.loads(record.getMessage()))
+
+
+def build_logger(handler, **kwargs):
+    logger = logging.Logger('test-requests', logging.INFO)
+    logger.addHandler(handler)
+    return RequestLogger(logger=logger, **kwargs)
+
+
+class TestRequestLog(unittest2.TestCase):
+    def test_records_are_written_in_background(self):
+        handler = ListHandler()
+        request_logger = build_logger(handler, sample_rate=1.0)
+        try:
+            self.assertTrue(request_logger.log('invoke', {'a': '1'}, {'x': 3}, 0.0015))
+            request_logger.flush()
+        finally:
+            request_logger.close(5)
+
+        self.assertEqual(len(handler.records), 1)
+        self.assertSetEqual(handler.threads, {'request-logger'})
+        record = handler.records[0]
+        self.assertEqual(record['endpoint'], 'invoke')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['duration_ms'], 1.5)
+        self.assertEqual(record['request'], "{'a': '1'}")
+        self.assertEqual(record['response'], "{'x': 3}")
+
+    def test_sampling(self):
+        handler = ListHandler()
+        disabled = build_logger(handler, sample_rate=0.0)
+        self.assertFalse(any(disabled.log('invoke', {}, {}, 0.0) for _ in range(100)))
+        self.assertIsNone(disabled._thread)
+
+        sampled = build_logger(handler, sample_rate=0.25)
+        try:
+            count = sum(sampled.log('invoke', {}, {}, 0.0) for _ in range(4000))
+        finally:
+            sampled.close(5)
+        self.assertGreater(count, 800)
+        self.assertLess(count, 1200)
+
+    def test_full_queue_does_not_block(self):
+        blocker = threading.Event()
+        handler = ListHandler(blocker)
+        request_logger = build_logger(handler, sample_rate=1.0, queue_size=2)
+        try:
+            results = [request_logger.log('invoke', {}, {}, 0.0) for _ in range(10)]
+            self.assertFalse(all(results))
+            self.assertGreater(request_logger.dropped, 0)
+        finally:
+            blocker.set()
+            request_logger.close(5)
+
+    def test_payload_truncation(self):
+        payload_repr = PayloadRepr(64)
+
+        self.assertLessEqual(len(payload_repr.truncate('x' * 10000)), 64)
+        self.assertEqual(payload_repr.truncate(b'\x00' * 100), '<100 bytes>')
+
+        array = payload_repr.truncate(numpy.zeros((1000, 1000)))
+        self.assertLessEqual(len(array), 64)
+        self.assertTrue(array.startswith('array(dtype=float64, shape=(1000, 1000)'))
+
+        data_frame = PayloadRepr(1024).truncate(pandas.DataFrame({'a': range(100000), 'b': range(100000)}))
+        self.assertEqual(data_frame, "DataFrame(shape=(100000, 2), columns=['a', 'b'])")
+
+        series = PayloadRepr(1024).truncate({'x': pandas.Series(range(100000), name='x')})
+        self.assertTrue(series.startswith("{'x': Series(name='x', length=100000, values=[0, 1, 2"))
+
+
+if __name__ == '__main__':
+    unittest2.main()
@@ -0,0 +1,75 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import print_function
+
+import concurrent.futures
+import threading
+
+from legion.serving.executors import ModelExecutor
+from legion.serving.metrics import Histogram, ServingMetrics
+import unittest2
+
+
+class TestServingMetrics(unittest2.TestCase):
+    def test_histogram(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        cumulative, total, count = histogram.snapshot()
+        self.assertListEqual(cumulative, [2, 3, 4])
+        self.assertAlmostEqual(total, 2.65)
+        self.assertEqual(count, 4)
+
+    def test_render(self):
+        metrics = ServingMetrics({'model_id': 'm'}, buckets=(0.1, 1.0))
+        metrics.observe_stage('apply', 0.5)
+        with metrics.track_request('invoke'):
+            self.assertEqual(metrics.in_flight, 1)
+        metrics.add_gauge('legion_model_queue_depth', 'Queue depth', lambda: 7, {'queue': 'test'})
+
+        lines = metrics.render().splitlines()
+        self.assertIn('# TYPE legion_model_stage_duration_seconds histogram', lines)
+        self.assertIn('legion_model_stage_duration_seconds_bucket{le="0.1",model_id="m",stage="apply"} 0', lines)
+        self.assertIn('legion_model_stage_duration_seconds_bucket{le="1.0",model_id="m",stage="apply"} 1', lines)
+        self.assertIn('legion_model_stage_duration_seconds_bucket{le="+Inf",model_id="m",stage="apply"} 1', lines)
+        self.assertIn('legion_model_stage_duration_seconds_sum{model_id="m",stage="apply"} 0.5', lines)
+        self.assertIn('legion_model_stage_duration_seconds_count{model_id="m",stage="prepare"} 0', lines)
+        self.assertIn('legion_model_request_duration_seconds_count{endpoint="invoke",model_id="m"} 1', lines)
+        self.assertIn('legion_model_requests_in_flight{model_id="m"} 0', lines)
+        self.assertIn('legion_model_queue_depth{model_id="m",queue="test"} 7', lines)
+
+    def test_executor_queue_depth(self):
+        release = threading.Event()
+
+        class BlockedModel:
+            def apply(self, input_vector):
+                release.wait(5)
+                return input_vector
+
+        executor = ModelExecutor(BlockedModel(), 2)
+        try:
+            futures = [executor.submit({'a': index}) for index in range(5)]
+            self.assertEqual(executor.queue_depth, 3)
+            release.set()
+            concurrent.futures.wait(futures, 5)
+            self.assertEqual(executor.queue_depth, 0)
+        finally:
+            executor.shutdown()
+
+
+if __name__ == '__main__':
+    unittest2.main()
@@ -20,6 +20,7 @@ import unittest2
 import legion.model.types as types
 from PIL import Image as PYTHON_Image
 import base64
+import numpy as np
 import pandas as pd
 
 
@@ -118,6 +119,103 @@ class TestTypes(unittest2.TestCase):
         self.assertEqual(deducted_types['a'].representation_type, types.Integer)
         self.assertEqual(deducted_types['s'].representation_type, types.String)
 
+    def test_batch_df_building(self):
+        columns_map = {
+            'a': types.ColumnInformation(types.Integer),
+            'b': types.ColumnInformation(types.Float),
+            'c': types.ColumnInformation(types.Bool),
+        }
+
+        df = types.build_batch_df(columns_map, {'a': ['1', 2], 'b': ['1.5', 3], 'c': ['yes', False]})
+
+        self.assertEqual(len(df), 2)
+        self.assertListEqual(list(df['a']), [1, 2])
+        self.assertListEqual(list(df['b']), [1.5, 3.0])
+        self.assertListEqual(list(df['c']), [True, False])
+
+        rows = types.build_batch_df(columns_map, {'a': ['1'], 'b': ['1.5'], 'c': ['no']}, return_dict=True)
+        self.assertListEqual(rows, [{'a': 1, 'b': 1.5, 'c': False}])
+
+        with self.assertRaises(Exception):
+            types.build_batch_df(columns_map, {'a': ['1', '2'], 'b': ['1.5'], 'c': ['no']})
+
+        with self.assertRaises(Exception):
+            types.build_batch_df(columns_map, {'a': ['1'], 'b': ['1.5']})
+
+    def test_input_schema_parsing(self):
+        columns_map = {
+            'a': types.ColumnInformation(types.Integer, np.int32),
+            'b': types.ColumnInformation(types.Float, np.float32),
+            'c': types.ColumnInformation(types.Bool),
+            'd': types.ColumnInformation(types.String),
+        }
+        schema = types.InputSchema(columns_map)
+
+        df = schema.build_df({'a': '-025', 'b': '2.5', 'c': 'Yes', 'd': 'Hello'})
+
+        self.assertListEqual(list(df.columns), ['a', 'b', 'c', 'd'])
+        self.assertEqual(df['a'].dtype, np.int32)
+        self.assertEqual(df['b'].dtype, np.float32)
+        self.assertEqual(df['c'].dtype, np.bool_)
+        self.assertEqual(df['d'].dtype, np.object)
+        self.assertListEqual(df.iloc[0].tolist(), [-25, 2.5, True, 'Hello'])
+
+        self.assertDictEqual(schema.build_df({'a': '1', 'b': '2', 'c': 'f', 'd': 'x'}, return_dict=True),
+                             {'a': 1, 'b': 2.0, 'c': False, 'd': 'x'})
+
+        with self.assertRaises(ValueError):
+            schema.build_df({'a': '12.0', 'b': '2.5', 'c': 'yes', 'd': ''})
+
+        with self.assertRaises(ValueError):
+            schema.build_df({'a': '12', 'b': '2,5', 'c': 'yes', 'd': ''})
+
+        with self.assertRaises(ValueError):
+            schema.build_batch_df({'a': ['1', '2'], 'b': ['1', '2'], 'c': ['yes', 'wrongValue'], 'd': ['', '']})
+
+    def test_input_schema_large_integers(self):
+        big_integer = 2 ** 70
+        for numpy_type, expected in ((np.object, big_integer), (np.float64, float(big_integer))):
+            schema = types.InputSchema({'a': types.ColumnInformation(types.Integer, numpy_type)})
+            self.assertEqual(schema.build_batch_df({'a': [str(big_integer), '1']})['a'][0], expected)
+
+        schema = types.InputSchema({'a': types.ColumnInformation(types.Integer, np.int64)})
+        with self.assertRaises(ValueError):
+            schema.build_df({'a': str(big_integer)})
+
+    def test_input_schema_typed_values(self):
+        columns_map = {
+            'a': types.ColumnInformation(types.Integer, np.int32),
+            'b': types.ColumnInformation(types.Float, np.float32),
+            'c': types.ColumnInformation(types.Bool),
+        }
+        schema = types.InputSchema(columns_map)
+
+        df = schema.build_batch_df({'a': np.array([1, 2], dtype=np.int64),
+                                    'b': np.array([0.5, 1.5]),
+                                    'c': np.array([True, False])})
+        self.assertEqual(df['a'].dtype, np.int32)
+        self.assertEqual(df['b'].dtype, np.float32)
+        self.assertListEqual(df['c'].tolist(), [True, False])
+
+        df = schema.build_df({'a': np.int64(3), 'b': np.int8(2), 'c': np.bool_(True)})
+        self.assertListEqual(df.iloc[0].tolist(), [3, 2.0, True])
+
+        self.assertDictEqual(schema.build_df({'a': np.int64(3), 'b': np.float64(2.5), 'c': np.bool_(False)}, True),
+                             {'a': 3, 'b': 2.5, 'c': False})
+
+        with self.assertRaises(Exception):
+            schema.build_batch_df({'a': np.array([1.5]), 'b': np.array([1.5]), 'c': np.array([True])})
+
+        with self.assertRaises(Exception):
+            schema.build_batch_df({'a': np.array([1]), 'b': np.array([1.5]), 'c': np.array([1])})
+
+        # Typed values are checked for plain dicts (models without DataFrames) too
+        with self.assertRaises(Exception):
+            schema.build_df({'a': np.float64(1.5), 'b': np.float64(2.5), 'c': np.bool_(False)}, True)
+
+        with self.assertRaises(Exception):
+            schema.build_batch_df({'a': np.array([1.5]), 'b': np.array([1.5]), 'c': np.array([True])}, True)
+
 
 if __name__ == '__main__':
     unittest2.main()
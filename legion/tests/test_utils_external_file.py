@@ -17,9 +17,16 @@ from __future__ import print_function
 
 import os
 import random
+import subprocess
+import sys
 import tempfile
 from unittest.mock import patch
 
+try:
+    from .legion_test_utils import LocalFileServer
+except ImportError:
+    from legion_test_utils import LocalFileServer
+
 import legion.config
 import legion.io
 import legion.utils as utils
@@ -177,5 +184,196 @@ class TestUtilsExternalFile(unittest2.TestCase):
             self.assertIsNone(auth)
 
 
+class TestUtilsDownload(unittest2.TestCase):
+    def setUp(self):
+        self._work_directory = tempfile.mkdtemp()
+        self._cache_directory = os.path.join(self._work_directory, 'cache')
+        self._server_directory = os.path.join(self._work_directory, 'server')
+        os.makedirs(self._server_directory)
+
+        self._content = os.urandom(1000 * 1024)
+        for name in 'a.model', 'b.model':
+            with open(os.path.join(self._server_directory, name), 'wb') as file:
+                file.write(self._content)
+
+    def tearDown(self):
+        utils.remove_directory(self._work_directory)
+
+    def _patch_download_env(self, cache_directory='', cache_size=10 * 1024 ** 2):
+        return patch.dict('os.environ', {
+            legion.config.EXTERNAL_RESOURCE_CACHE_DIR[0]: cache_directory,
+            legion.config.EXTERNAL_RESOURCE_CACHE_SIZE[0]: str(cache_size),
+            legion.config.EXTERNAL_RESOURCE_DOWNLOAD_CHUNK_SIZE[0]: str(100 * 1024),
+            legion.config.EXTERNAL_RESOURCE_DOWNLOAD_THREADS[0]: '4',
+            legion.config.EXTERNAL_RESOURCE_DOWNLOAD_RETRIES[0]: '2'
+        })
+
+    def _get_ranges(self, server):
+        return [header_range for method, _, header_range in server.requests if method == 'GET']
+
+    def _read(self, path):
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def test_parallel_download_with_retries(self):
+        with self._patch_download_env(), LocalFileServer(self._server_directory) as server:
+            server.failing_requests = 3
+
+            with utils.ExternalFileReader(server.url('a.model')) as reader:
+                self.assertEqual(self._read(reader.path), self._content)
+                local_path = reader.path
+
+            self.assertFalse(os.path.exists(local_path))
+            self.assertEqual(len(self._get_ranges(server)), 10 + 3)
+            self.assertTrue(all(self._get_ranges(server)))
+
+    def test_download_cache(self):
+        with self._patch_download_env(self._cache_directory), LocalFileServer(self._server_directory) as server:
+            with utils.ExternalFileReader(server.url('a.model')) as reader:
+                self.assertEqual(self._read(reader.path), self._content)
+                cached_path = reader.path
+
+            self.assertTrue(os.path.exists(cached_path))
+            self.assertEqual(len(self._get_ranges(server)), 10)
+
+            with utils.ExternalFileReader(server.url('a.model')) as reader:
+                self.assertEqual(reader.path, cached_path)
+            self.assertEqual(len(self._get_ranges(server)), 10)
+
+    def test_download_cache_eviction(self):
+        with self._patch_download_env(self._cache_directory, int(len(self._content) * 1.5)), \
+                LocalFileServer(self._server_directory) as server:
+            first_path = utils.download_file(server.url('a.model'))
+            second_path = utils.download_file(server.url('b.model'))
+
+            self.assertFalse(os.path.exists(first_path))
+            self.assertEqual(self._read(second_path), self._content)
+            self.assertListEqual(os.listdir(self._cache_directory), [os.path.basename(second_path)])
+
+    def test_download_resume(self):
+        with self._patch_download_env(self._cache_directory), LocalFileServer(self._server_directory) as server:
+            server.failing_requests = 100
+
+            with self.assertRaises(Exception):
+                utils.download_file(server.url('a.model'))
+
+            failed_ranges = len(self._get_ranges(server))
+            partial_files = [name for name in os.listdir(self._cache_directory)
+                             if name.endswith(utils.DownloadCache.PARTIAL_SUFFIX)]
+            self.assertEqual(len(partial_files), 1)
+
+            # Mark first chunks as downloaded (with correct data) before resuming
+            partial_path = os.path.join(self._cache_directory, partial_files[0])
+            with open(partial_path, 'r+b') as file:
+                file.write(self._content[:400 * 1024])
+            with open(partial_path + utils.DownloadCache.CHUNKS_SUFFIX, 'w') as file:
+                file.write('0\n1\n2\n3\n')
+
+            server.failing_requests = 0
+            path = utils.download_file(server.url('a.model'))
+
+            self.assertEqual(self._read(path), self._content)
+            self.assertEqual(len(self._get_ranges(server)) - failed_ranges, 6)
+            self.assertListEqual(os.listdir(self._cache_directory), [os.path.basename(path)])
+
+    def test_download_without_head_request(self):
+        with self._patch_download_env(self._cache_directory), LocalFileServer(self._server_directory) as server:
+            server.head_status = 403
+
+            path = utils.download_file(server.url('a.model'))
+            self.assertEqual(self._read(path), self._content)
+            self.assertListEqual(self._get_ranges(server), [None])
+
+            self.assertEqual(utils.download_file(server.url('a.model')), path)
+
+    def test_changed_resource_range(self):
+        with LocalFileServer(self._server_directory) as server:
+            self.assertEqual(utils.download_file_range(server.url('a.model'), 0, 9), self._content[:10])
+            with self.assertRaises(Exception):
+                utils.download_file_range(server.url('a.model'), 0, 9, validator='"old"')
+
+    def test_partial_file_of_finished_process_is_taken_over(self):
+        cache = utils.DownloadCache(self._cache_directory, 10 * 1024 ** 2)
+        own_path = cache.partial_path('key')
+        self.assertIn(str(os.getpid()), own_path)
+
+        finished_process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        finished_process.wait()
+        orphan_path = own_path.replace('-%d.' % os.getpid(), '-%d.' % finished_process.pid)
+        open(orphan_path, 'w').close()
+        open(orphan_path + utils.DownloadCache.CHUNKS_SUFFIX, 'w').close()
+
+        self.assertEqual(cache.partial_path('key'), own_path)
+        self.assertTrue(os.path.exists(own_path + utils.DownloadCache.CHUNKS_SUFFIX))
+        self.assertFalse(os.path.exists(orphan_path))
+
+
+class TestUtilsUpload(unittest2.TestCase):
+    def setUp(self):
+        self._work_directory = tempfile.mkdtemp()
+        self._server_directory = os.path.join(self._work_directory, 'server')
+        os.makedirs(self._server_directory)
+
+        self._content = os.urandom(1000 * 1024)
+        self._local_path = os.path.join(self._work_directory, 'local.model')
+        with open(self._local_path, 'wb') as file:
+            file.write(self._content)
+
+    def tearDown(self):
+        utils.remove_directory(self._work_directory)
+
+    def _read_uploaded(self, name):
+        with open(os.path.join(self._server_directory, name), 'rb') as file:
+            return file.read()
+
+    def _get_puts(self, server):
+        return [header_range for method, _, header_range in server.requests if method == 'PUT']
+
+    def test_streaming_upload_with_retries(self):
+        with LocalFileServer(self._server_directory) as server:
+            server.failing_requests = 1
+
+            with patch.dict('os.environ', {legion.config.EXTERNAL_RESOURCE_UPLOAD_PART_SIZE[0]: '0'}):
+                result_path = utils.save_file(self._local_path, server.url('a.model'))
+
+            self.assertEqual(result_path, server.url('a.model'))
+            self.assertEqual(self._read_uploaded('a.model'), self._content)
+            self.assertListEqual(self._get_puts(server), [None, None])
+
+    def test_parallel_parts_upload(self):
+        with LocalFileServer(self._server_directory) as server:
+            server.failing_requests = 2
+
+            statistics = utils.upload_file(self._local_path, server.url('a.model'), part_size=100 * 1024, threads=4)
+
+            self.assertEqual(self._read_uploaded('a.model'), self._content)
+            self.assertEqual(len(self._get_puts(server)), 10 + 2)
+            self.assertTrue(all(self._get_puts(server)))
+
+            self.assertEqual(statistics.size, len(self._content))
+            self.assertEqual(statistics.parts, 10)
+            self.assertEqual(statistics.retries, 2)
+            self.assertGreater(statistics.throughput, 0)
+
+    def test_parts_upload_without_content_range_support(self):
+        with LocalFileServer(self._server_directory) as server:
+            server.content_range_puts = False
+
+            statistics = utils.upload_file(self._local_path, server.url('a.model'), part_size=100 * 1024, threads=4)
+
+            self.assertEqual(self._read_uploaded('a.model'), self._content)
+            self.assertEqual(self._get_puts(server)[-1], None)
+            self.assertEqual(statistics.parts, 1)
+
+    def test_upload_failure(self):
+        with LocalFileServer(self._server_directory) as server:
+            server.failing_requests = 10
+
+            with self.assertRaises(Exception):
+                utils.upload_file(self._local_path, server.url('a.model'), part_size=0, retries=2)
+
+            self.assertEqual(len(self._get_puts(server)), 3)
+
+
 if __name__ == '__main__':
     unittest2.main()
@@ -0,0 +1,105 @@
+#
+#    Copyright 2017 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from __future__ import print_function
+
+import time
+
+import legion.model.types as types
+from legion.model.model import ScipyModel
+from legion.serving.warmup import ModelWarmUp, build_synthetic_input, is_warming_up
+import numpy
+import unittest2
+
+
+def build_model(apply, column_types=None):
+    if column_types is None:
+        column_types = {
+            'a': types.ColumnInformation(types.Integer, numpy.int64),
+            'b': types.ColumnInformation(types.Float, numpy.float64),
+        }
+
+    return ScipyModel(apply_func=apply, prepare_func=lambda x: x, column_types=column_types,
+                      version='1.0', use_df=False)
+
+
+class TestWarmUp(unittest2.TestCase):
+    def test_synthetic_input(self):
+        column_types = {
+            'i': types.ColumnInformation(types.Integer, numpy.int64),
+            'f': types.ColumnInformation(types.Float, numpy.float64),
+            'b': types.ColumnInformation(types.Bool, numpy.bool_),
+            's': types.ColumnInformation(types.String),
+            'img': types.ColumnInformation(types.Image),
+        }
+
+        input_vector = build_synthetic_input(column_types)
+        self.assertSetEqual(set(input_vector.keys()), set(column_types.keys()))
+
+        data_frame = build_model(lambda x: x, column_types).input_schema.build_df(input_vector)
+        self.assertEqual(data_frame['i'][0], 1)
+        self.assertEqual(data_frame['b'][0], True)
+        self.assertEqual(data_frame['img'][0].size, (1, 1))
+
+        unknown_type = types.ColumnInformation(types.BaseType('Custom'))
+        self.assertIsNone(build_synthetic_input({'c': unknown_type}))
+
+    def test_warm_up_until_latencies_settle(self):
+        calls = []
+
+        def apply(x):
+            calls.append(x)
+            time.sleep(0.1 if len(calls) <= 2 else 0.01)
+            return {'x': x['a'] + x['b']}
+
+        warm_up = ModelWarmUp(build_model(apply), min_iterations=3, max_iterations=20, settle_ratio=3)
+        self.assertFalse(warm_up.ready)
+
+        warm_up.start()
+        self.assertTrue(warm_up.wait(10))
+        self.assertEqual(len(calls), 5)
+        self.assertEqual(len(warm_up.latencies), 5)
+
+    def test_warm_up_limits(self):
+        def apply(x):
+            time.sleep(0.001 * len(warm_up.latencies) ** 2)
+
+        warm_up = ModelWarmUp(build_model(apply), min_iterations=3, max_iterations=6, settle_ratio=1.01)
+        warm_up.run()
+        self.assertTrue(warm_up.ready)
+        self.assertEqual(len(warm_up.latencies), 6)
+
+    def test_warm_up_calls_are_marked(self):
+        flags = []
+
+        def apply(x):
+            flags.append(is_warming_up())
+
+        ModelWarmUp(build_model(apply), min_iterations=2, max_iterations=2).run()
+        self.assertListEqual(flags, [True, True])
+        self.assertFalse(is_warming_up())
+
+    def test_failed_warm_up(self):
+        def apply(x):
+            raise ValueError('Unexpected input')
+
+        warm_up = ModelWarmUp(build_model(apply))
+        warm_up.run()
+        self.assertTrue(warm_up.ready)
+        self.assertListEqual(warm_up.latencies, [])
+
+
+if __name__ == '__main__':
+    unittest2.main()